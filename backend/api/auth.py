@@ -4,6 +4,7 @@ from firebase_admin import db
 import datetime
 import traceback
 from backend.utils.auth_helper import generate_token, hash_password, check_password
+from backend.utils.user_directory import user_directory
 
 auth_blueprint = Blueprint("auth", __name__)
 
@@ -23,15 +24,14 @@ def login():
         if not email or not password:
             return jsonify({"error": "Email dan password diperlukan."}), 400
 
-        ref = db.reference("/users")
-        user_data = ref.order_by_child("email").equal_to(email).get()
+        # Lookup dari index email di memori (tanpa query /users per login)
+        found = user_directory.find_by_email(email)
 
-        if not user_data:
+        if not found:
             print("❌ User tidak ditemukan di Firebase.")
             return jsonify({"error": "Email atau password salah."}), 401
 
-        user_key = list(user_data.keys())[0]
-        user_info = user_data[user_key]
+        user_key, user_info = found
 
         stored_hash = user_info.get("password", "")
         print(f"🔒 Stored hash (awal): {stored_hash[:15]}...")
@@ -76,7 +76,7 @@ def register():
             return jsonify({"error": "Username, email, dan password wajib diisi."}), 400
 
         ref = db.reference("/users")
-        existing_user = ref.order_by_child("email").equal_to(email).get()
+        existing_user = user_directory.find_by_email(email)
 
         if existing_user:
             print("⚠️ Email sudah terdaftar:", email)
@@ -85,8 +85,7 @@ def register():
         hashed_password = hash_password(password)
         hashed_str = hashed_password.decode("utf-8")
 
-        new_user_ref = ref.push()
-        new_user_ref.set({
+        new_user = {
             "username": username,
             "email": email,
             "password": hashed_str,
@@ -94,7 +93,10 @@ def register():
             "role": role,
             "department": department,
             "created_at": datetime.datetime.now().isoformat()
-        })
+        }
+        new_user_ref = ref.push()
+        new_user_ref.set(new_user)
+        user_directory.put(new_user_ref.key, new_user)
 
         print(f"✅ User {email} berhasil diregister.")
         return jsonify({
@@ -1,66 +1,57 @@
 # backend/api/fire_detection_sync.py
 from flask import Blueprint, jsonify
-from firebase_admin import firestore, db
-from datetime import datetime
+from backend.utils.sensor_ingest import get_latest_sensor_doc
+from backend.utils.fire_pipeline import fire_pipeline
+from backend.utils.cluster import ingest_only
 
 fire_sync_blueprint = Blueprint("fire_sync", __name__)
 
 @fire_sync_blueprint.route("/sync/fire-detection", methods=["GET"])
+@ingest_only
 def sync_fire_detection():
     """
     Mengambil data terbaru dari Firestore (sensors_thermal + sensors_env)
-    dan jika fire_detected == True, maka simpan laporan ke Realtime Database.
+    dan jika fire_detected == True, maka simpan/perbarui incident di Realtime Database.
     """
     try:
-        fs = firestore.client()
-        rtdb = db.reference("/fire_reports")
+        # Ambil data terbaru dari sensors_thermal (event bus / cache TTL bersama)
+        thermal_latest = get_latest_sensor_doc("sensors_thermal")
 
-        # Ambil data terbaru dari sensors_thermal
-        thermal_ref = fs.collection("sensors_thermal").order_by("timestamp", direction=firestore.Query.DESCENDING).limit(1)
-        thermal_docs = list(thermal_ref.stream())
-
-        if not thermal_docs:
+        if not thermal_latest:
             return jsonify({"message": "Tidak ada data thermal ditemukan."}), 404
 
-        thermal_data = thermal_docs[0].to_dict()
+        thermal_id, thermal_data = thermal_latest
         print("🔥 Thermal Data:", thermal_data)
 
         # Ambil data terbaru dari sensors_env
-        env_ref = fs.collection("sensors_env").order_by("timestamp", direction=firestore.Query.DESCENDING).limit(1)
-        env_docs = list(env_ref.stream())
+        env_latest = get_latest_sensor_doc("sensors_env")
+
+        env_data = env_latest[1] if env_latest else {}
 
-        env_data = env_docs[0].to_dict() if env_docs else {}
+        # Pipeline incident (analisis thermal → idempotent, merge deteksi beruntun)
+        result = fire_pipeline.process(thermal_id, thermal_data, env_data)
 
-        # Jika tidak ada deteksi api
-        if not thermal_data.get("fire_detected", False):
+        # Jika tidak ada deteksi api (dari perangkat maupun analisis hotspot)
+        if result is None:
             return jsonify({
                 "message": "Tidak ada api terdeteksi.",
                 "max_temp": thermal_data.get("max_temp"),
                 "timestamp": thermal_data.get("timestamp")
             }), 200
 
-        # Jika terdeteksi api, siapkan laporan untuk disimpan ke Realtime Database
-        fire_report = {
-            "timestamp": thermal_data.get("timestamp", datetime.utcnow().isoformat()),
-            "severity": "high" if thermal_data.get("max_temp", 0) > 60 else "medium",
-            "temperature": thermal_data.get("max_temp"),
-            "humidity": env_data.get("humidity"),
-            "sensor_type": thermal_data.get("sensor_type", "unknown"),
-            "image_url": thermal_data.get("image_url"),
-            "fire_bbox": thermal_data.get("fire_bbox"),
-            "location": {
-                "latitude": env_data.get("latitude"),
-                "longitude": env_data.get("longitude"),
-            }
-        }
+        if result["status"] == "created":
+            return jsonify({
+                "message": "🔥 Fire detected, laporan disimpan ke Realtime Database!",
+                "report_id": result["incident_id"],
+                "data": result["report"]
+            }), 201
 
-        # Simpan laporan ke Realtime Database
-        new_ref = rtdb.push(fire_report)
         return jsonify({
-            "message": "🔥 Fire detected, laporan disimpan ke Realtime Database!",
-            "report_id": new_ref.key,
-            "data": fire_report
-        }), 201
+            "message": "🔥 Fire detected, laporan incident yang sama diperbarui.",
+            "report_id": result["incident_id"],
+            "status": result["status"],
+            "data": result["report"]
+        }), 200
 
     except Exception as e:
         print("❌ Error:", e)
@@ -0,0 +1,73 @@
+# backend/api/flight_logs.py
+from flask import Blueprint, jsonify, request
+from backend.utils.flight_summary import flight_summarizer
+from backend.api.telemetry import flight_log
+from backend.utils.cluster import ingest_only
+from backend.utils.auth_helper import token_required
+
+flight_logs_blueprint = Blueprint("flight_logs", __name__)
+
+DEFAULT_LIMIT = 50
+MAX_LIMIT = 500
+
+
+@flight_logs_blueprint.route("/flight-logs", methods=["GET"])
+def get_flight_logs():
+    """
+    Ringkasan penerbangan (terbaru lebih dulu) dari tabel yang sudah dihitung.
+    Query: limit (default 50), include_current (default 1).
+    totals dihitung atas seluruh penerbangan, bukan hanya halaman ini.
+    """
+    try:
+        limit = max(1, min(int(request.args.get("limit", DEFAULT_LIMIT)), MAX_LIMIT))
+    except ValueError:
+        return jsonify({"error": "limit harus berupa angka"}), 400
+    include_current = request.args.get("include_current", "1") != "0"
+
+    try:
+        logs = flight_summarizer.list_flights(limit=limit, include_current=include_current)
+        return jsonify({
+            "count": len(logs),
+            "logs": logs,
+            "totals": flight_summarizer.totals(include_current=include_current),
+        }), 200
+    except Exception as e:
+        print(f"⚠️ Gagal mengambil flight logs: {e}")
+        return jsonify({"error": str(e)}), 500
+
+
+@flight_logs_blueprint.route("/flight-logs/<flight_id>", methods=["GET"])
+def get_flight_log(flight_id):
+    summary = flight_summarizer.get(flight_id)
+    if summary is None:
+        return jsonify({"error": "Penerbangan tidak ditemukan."}), 404
+    return jsonify(summary), 200
+
+
+@flight_logs_blueprint.route("/flight-logs/rebuild", methods=["POST"])
+@token_required
+@ingest_only
+def rebuild_flight_logs(current_user):
+    """
+    Hitung ulang ringkasan dari flight log lokal (mis. setelah update atau
+    untuk penerbangan sebelum summarizer aktif). Body opsional: {"from", "to"} epoch detik.
+    Penerbangan yang sudah berjalan pada 'from' dilewati (ringkasannya dari rebuild penuh).
+    """
+    body = request.get_json(silent=True) or {}
+    try:
+        start = float(body["from"]) if body.get("from") is not None else None
+        end = float(body["to"]) if body.get("to") is not None else None
+    except (TypeError, ValueError):
+        return jsonify({"error": "'from'/'to' harus epoch detik"}), 400
+
+    try:
+        flights = flight_summarizer.backfill(
+            flight_log.query(start, end), skip_leading_partial=start is not None
+        )
+        return jsonify({
+            "message": f"✅ {len(flights)} penerbangan dihitung ulang dari flight log lokal.",
+            "flights": [f["id"] for f in flights],
+        }), 200
+    except Exception as e:
+        print(f"⚠️ Gagal rebuild flight logs: {e}")
+        return jsonify({"error": str(e)}), 500
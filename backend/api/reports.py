@@ -1,23 +1,195 @@
-from flask import Blueprint, jsonify, request
-from firebase_admin import db
+from flask import Blueprint, jsonify, request, make_response
 from backend.utils.auth_helper import token_required
+from backend.utils.event_bus import event_bus
+from backend.utils.fire_pipeline import parse_timestamp
+from backend.utils.reports_cache import reports_cache
+from backend.utils.spatial_index import get_lat_lon
 
 reports_blueprint = Blueprint('reports', __name__)
 
+# Laporan baru/merge dari fire pipeline langsung masuk cache (tanpa reload tree)
+event_bus.subscribe("fire_report", reports_cache.on_fire_report)
+
+DEFAULT_LIMIT = 100
+MAX_LIMIT = 500
+DEFAULT_RADIUS = 500        # meter
+MAX_RADIUS = 50000
+
+
+def parse_epoch(value):
+    """Parameter waktu: epoch detik/milidetik atau ISO 8601 → epoch detik."""
+    if value is None or value == "":
+        return None
+    try:
+        t = float(value)
+        return t / 1000.0 if t > 1e11 else t
+    except ValueError:
+        dt = parse_timestamp(value)
+        if dt is None:
+            raise ValueError(f"format waktu tidak valid: {value}")
+        return dt.timestamp()
+
+
+def parse_cursor(value):
+    """Cursor halaman 'timestamp|report_id' (dari X-Next-Before) atau waktu saja."""
+    if value is None or value == "":
+        return None
+    if "|" in value:
+        ts, report_id = value.split("|", 1)
+        return parse_epoch(ts), report_id
+    return parse_epoch(value)
+
+
+def format_cursor(cursor):
+    ts, report_id = cursor
+    return f"{ts!r}|{report_id}"
+
+
+def latest_reports(limit=DEFAULT_LIMIT):
+    """{report_id: report} terbaru dari cache (bentuk sama dengan GET /reports)."""
+    items, _, _ = reports_cache.query(limit=limit)
+    return {report_id: report for report_id, report in items}
+
+
+def report_event(result):
+    """Hasil fire pipeline → pesan channel fire_report (duplikat tidak dikirim)."""
+    if result.get("status") == "duplicate" or result.get("report") is None:
+        return None
+    return {
+        "id": result["incident_id"],
+        "status": result["status"],
+        "report": result["report"],
+    }
+
+
+def centroid(reports):
+    points = [get_lat_lon(r) for r in reports]
+    points = [p for p in points if p]
+    if not points:
+        return None
+    return {
+        "latitude": round(sum(p[0] for p in points) / len(points), 7),
+        "longitude": round(sum(p[1] for p in points) / len(points), 7),
+    }
+
+
 @reports_blueprint.route('/reports', methods=['GET'])
 @token_required
 def get_reports(current_user):
     """
-    API untuk mengambil daftar semua laporan kebakaran dari database.
+    API untuk mengambil daftar laporan kebakaran (terbaru lebih dulu) dari cache server.
+    Query: limit, before/after (cursor 'timestamp|report_id' dari X-Next-Before,
+    atau timestamp saja), from/to (jendela waktu),
+    severity (mis. 'high' atau 'high,medium'). Mendukung If-None-Match (ETag).
     Memerlukan token JWT untuk otentikasi.
     """
     try:
-        ref = db.reference('/fire_reports')
-        reports = ref.get()
-        if not reports:
+        try:
+            limit = max(1, min(int(request.args.get('limit', DEFAULT_LIMIT)), MAX_LIMIT))
+            before = parse_cursor(request.args.get('before'))
+            after = parse_cursor(request.args.get('after'))
+            since = parse_epoch(request.args.get('from'))
+            until = parse_epoch(request.args.get('to'))
+        except ValueError as e:
+            return jsonify({"error": f"Parameter tidak valid: {e}"}), 400
+
+        severity = request.args.get('severity')
+        severities = set(severity.split(',')) if severity else None
+
+        # ETag dari versi cache + parameter → klien yang sudah up to date dapat 304
+        reports_cache.ensure_loaded()
+        query_args = (limit, before, after, since, until, severity)
+        etag = reports_cache.etag(*query_args)
+        if request.if_none_match.contains(etag):
+            response = make_response("", 304)
+            response.set_etag(etag)
+            return response
+
+        items, next_cursor, total = reports_cache.query(
+            limit=limit, before=before, after=after,
+            since=since, until=until, severities=severities,
+        )
+        if not items:
             return jsonify({"message": "Tidak ada laporan ditemukan."}), 404
-        
-        return jsonify(reports), 200
+
+        response = jsonify({report_id: report for report_id, report in items})
+        response.set_etag(etag)
+        response.headers["Cache-Control"] = "private, no-cache"
+        response.headers["X-Total-Count"] = str(total)
+        if next_cursor is not None:
+            response.headers["X-Next-Before"] = format_cursor(next_cursor)
+        return response, 200
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+
+@reports_blueprint.route('/reports/nearby', methods=['GET'])
+@token_required
+def get_nearby_reports(current_user):
+    """
+    Laporan dalam radius tertentu dari sebuah titik (terdekat lebih dulu).
+    Query: lat, lon, radius (meter, default 500), limit, from, severity.
+    """
+    try:
+        lat = float(request.args['lat'])
+        lon = float(request.args['lon'])
+        radius = min(float(request.args.get('radius', DEFAULT_RADIUS)), MAX_RADIUS)
+        limit = max(1, min(int(request.args.get('limit', DEFAULT_LIMIT)), MAX_LIMIT))
+        since = parse_epoch(request.args.get('from'))
+    except KeyError as e:
+        return jsonify({"error": f"Parameter {e} wajib diisi"}), 400
+    except ValueError as e:
+        return jsonify({"error": f"Parameter tidak valid: {e}"}), 400
+
+    severity = request.args.get('severity')
+    severities = set(severity.split(',')) if severity else None
+
+    try:
+        items = reports_cache.nearby(
+            lat, lon, radius, limit=limit, since=since, severities=severities,
+        )
+        return jsonify({
+            "center": {"latitude": lat, "longitude": lon},
+            "radius": radius,
+            "count": len(items),
+            "reports": [
+                dict(report, id=report_id, distance_m=round(dist, 1))
+                for report_id, report, dist in items
+            ],
+        }), 200
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+
+@reports_blueprint.route('/reports/clusters', methods=['GET'])
+@token_required
+def get_report_clusters(current_user):
+    """
+    Kelompokkan laporan yang berdekatan (mis. penampakan berulang hotspot yang sama).
+    Query: radius (meter, default 100), min_size (default 2).
+    """
+    try:
+        radius = min(float(request.args.get('radius', 100)), MAX_RADIUS)
+        min_size = max(1, int(request.args.get('min_size', 2)))
+    except ValueError as e:
+        return jsonify({"error": f"Parameter tidak valid: {e}"}), 400
+
+    try:
+        clusters = []
+        for ids in reports_cache.clusters(radius):
+            if len(ids) < min_size:
+                break
+            reports = [reports_cache.get(report_id) for report_id in ids]
+            reports = [r for r in reports if r]
+            temps = [r.get("max_temperature", r.get("temperature")) for r in reports]
+            temps = [t for t in temps if isinstance(t, (int, float))]
+            clusters.append({
+                "size": len(ids),
+                "report_ids": ids,
+                "severity": "high" if any(r.get("severity") == "high" for r in reports) else "medium",
+                "max_temperature": max(temps) if temps else None,
+                "centroid": centroid(reports),
+            })
+        return jsonify({"radius": radius, "count": len(clusters), "clusters": clusters}), 200
     except Exception as e:
         return jsonify({"error": str(e)}), 500
-    
@@ -1,34 +1,42 @@
 from flask import Blueprint, jsonify
-from firebase_admin import firestore
+from backend.utils.sensor_ingest import get_latest_sensor_doc
 
 sensor_env_api = Blueprint("sensor_env_api", __name__)
 
+
+def sensor_env_payload(data):
+    """Bentuk respons sensors_env (dipakai endpoint HTTP & channel Socket.IO)."""
+    return {
+        "humidity": data.get("humidity"),
+        "temperature": data.get("temperature"),
+        "timestamp": data.get("timestamp"),
+        "source": "firestore"
+    }
+
+
+def latest_sensor_env():
+    """Payload sensors_env terbaru, atau None."""
+    latest = get_latest_sensor_doc("sensors_env")
+    if not latest:
+        return None
+    _, data = latest
+    return sensor_env_payload(data)
+
+
 @sensor_env_api.route("/sensors-env/latest", methods=["GET"])
 def get_latest_sensor_env():
     try:
-        fs = firestore.client()
-
-        docs = (
-            fs.collection("sensors_env")
-            .order_by("timestamp", direction=firestore.Query.DESCENDING)
-            .limit(1)
-            .stream()
-        )
+        # Event bus (listener) atau cache TTL bersama → polling client tidak menambah query
+        payload = latest_sensor_env()
 
-        docs = list(docs)
-
-        if not docs:
+        if payload is None:
             return jsonify({"message": "Tidak ada data sensors_env ditemukan."}), 404
 
-        data = docs[0].to_dict()
-
-        return jsonify({
-            "humidity": data.get("humidity"),
-            "temperature": data.get("temperature"),
-            "timestamp": data.get("timestamp"),
-            "source": "firestore"
-        }), 200
+        return jsonify(payload), 200
 
+    except TimeoutError as e:
+        # Query Firestore sedang lambat dan belum ada nilai cache
+        return jsonify({"error": str(e)}), 503
     except Exception as e:
         print("❌ Error sensors-env:", e)
         return jsonify({"error": str(e)}), 500
@@ -1,8 +1,19 @@
 from flask import Blueprint, jsonify, request
 from firebase_admin import db
 from backend.utils.pixhawk_helper import PixhawkHelper
+from backend.utils.telemetry_recorder import TelemetryRecorder
+from backend.utils.flight_log_store import FlightLogStore
+from backend.utils.downsample import downsample_indices
+from backend.utils.georef import (
+    TelemetryHistory, georeferencer, location_at, parse_bbox, parse_frame_shape,
+    telemetry_history,
+)
+from backend.utils.cluster import CLUSTERED, ingest_only
+from backend.utils.event_bus import event_bus
 from backend.database.models import DroneData
-from datetime import datetime
+from datetime import datetime, timezone
+import numpy as np
+import os
 import time
 
 telemetry_blueprint = Blueprint("telemetry", __name__)
@@ -10,7 +21,52 @@ telemetry_blueprint = Blueprint("telemetry", __name__)
 # Gunakan koneksi UDP dari MAVProxy
 # MAVProxy command:
 # mavproxy.py --master=COM3 --baudrate 57600 --out=udp:127.0.0.1:14550 --out=udp:127.0.0.1:14551
-pixhawk = PixhawkHelper(device="udp:127.0.0.1:14551", baud=57600)
+# Koneksi dibuka oleh start_telemetry_ingest() hanya di proses pemilik link
+# (WORKER_ROLE=all, atau leader ingest) → port UDP tidak diperebutkan worker lain
+# Koneksi berjalan di background dengan exponential backoff → startup server
+# tidak menunggu heartbeat (hingga PIXHAWK_HEARTBEAT_TIMEOUT detik per percobaan)
+PIXHAWK_DEVICE = os.getenv("PIXHAWK_DEVICE", "udp:127.0.0.1:14551")
+PIXHAWK_HEARTBEAT_TIMEOUT = float(os.getenv("PIXHAWK_HEARTBEAT_TIMEOUT", "30"))
+PIXHAWK_RETRY_MAX = float(os.getenv("PIXHAWK_RETRY_MAX", "60"))
+pixhawk = PixhawkHelper(
+    device=PIXHAWK_DEVICE, baud=57600, autoconnect=False,
+    heartbeat_timeout=PIXHAWK_HEARTBEAT_TIMEOUT,
+)
+
+# Satu thread penerima MAVLink; semua pembaca memakai snapshot terbaru
+# Setiap snapshot baru juga masuk riwayat untuk geo-referencing deteksi
+pixhawk.add_snapshot_listener(
+    lambda snapshot: telemetry_history.append(snapshot.timestamp, snapshot.data)
+)
+
+# Write-behind recorder: sampel di-buffer lalu di-flush sebagai satu update()
+TELEMETRY_FLUSH_INTERVAL = float(os.getenv("TELEMETRY_FLUSH_INTERVAL", "10"))
+TELEMETRY_FLUSH_BATCH = int(os.getenv("TELEMETRY_FLUSH_BATCH", "50"))
+
+recorder = TelemetryRecorder(
+    path="/drone_data",
+    max_batch=TELEMETRY_FLUSH_BATCH,
+    flush_interval=TELEMETRY_FLUSH_INTERVAL,
+)
+recorder.start()
+
+# Flight log lokal (append-only) → histori tetap tersedia saat uplink mati
+FLIGHT_LOG_DIR = os.getenv(
+    "FLIGHT_LOG_DIR",
+    os.path.join(os.path.dirname(__file__), "..", "flight_logs"),
+)
+# Sampel relay dari leader lebih tua dari ini dianggap basi (leader mati/link putus)
+RELAYED_TELEMETRY_MAX_AGE = 5.0
+
+# Worker non-leader hanya membaca (mengikuti) log yang ditulis leader ingest.
+# Segmen dimuat lazy (take_over di proses ingest, atau query pertama di worker web)
+flight_log = FlightLogStore(FLIGHT_LOG_DIR, read_only=CLUSTERED)
+
+
+def start_telemetry_ingest():
+    """Buka link MAVLink & thread ingest di background (hanya di proses pemilik link)."""
+    flight_log.take_over()
+    pixhawk.connect_in_background(max_backoff=PIXHAWK_RETRY_MAX)
 
 
 def get_sonar_range(telemetry):
@@ -30,6 +86,8 @@ def create_drone_data_from_pixhawk(telemetry):
         battery=telemetry.get("battery"),
         altitude=gps_altitude,
         sonar_range=sonar_altitude,
+        armed=telemetry.get("armed"),
+        mode=telemetry.get("mode"),
         heading=telemetry.get("heading"),
         airspeed=telemetry.get("airspeed"),
         groundspeed=telemetry.get("groundspeed"),
@@ -83,9 +141,28 @@ def get_latest_telemetry():
         raise Exception("Pixhawk tidak merespons.") 
 
     except Exception as e:
-        print(f"⚠️ Gagal ambil data Pixhawk: {e}. Mengambil data terakhir dari Firebase.")
-        
-        # 2. Jika Pixhawk gagal/offline, ambil data terbaru dari Firebase (Fallback)
+        print(f"⚠️ Gagal ambil data Pixhawk: {e}. Mengambil data terakhir dari flight log lokal.")
+
+        # 2. Worker tanpa link MAVLink: sampel terakhir dari leader ingest (event bus)
+        relayed = event_bus.last("telemetry")
+        relayed_at = event_bus.last_published_at("telemetry")
+        if relayed and time.time() - relayed_at <= RELAYED_TELEMETRY_MAX_AGE:
+            return jsonify({
+                "message": "✅ Data terbaru dari Pixhawk (worker ingest).",
+                "source": "pixhawk",
+                "data": relayed
+            }), 200
+
+        # 3. Fallback: record terakhir di flight log lokal (tanpa jaringan)
+        latest = flight_log.latest()
+        if latest:
+            return jsonify({
+                "message": "⚠️ Pixhawk offline. Menampilkan data terakhir dari flight log lokal.",
+                "source": "local",
+                "data": latest[1]
+            }), 200
+
+        # 4. Jika log lokal kosong, ambil data terbaru dari Firebase
         try:
             telemetry = get_latest_from_firebase()
             
@@ -107,7 +184,163 @@ def get_latest_telemetry():
                 "error": f"Gagal mengambil dari Firebase: {db_err}"
             }), 500
 
+# =====================================================
+# Time-range query + downsampling
+# =====================================================
+RANGE_DEFAULT_WINDOW = 3600     # detik, jika 'from' tidak diberikan
+RANGE_MAX_POINTS = 5000
+RANGE_MIN_POINTS = 3            # minimum LTTB: titik pertama, tengah, terakhir
+
+
+def parse_time_param(value):
+    """Terima epoch detik/milidetik atau ISO 8601 (UTC jika tanpa zona)."""
+    if value is None or value == "":
+        return None
+    try:
+        t = float(value)
+        return t / 1000.0 if t > 1e11 else t
+    except ValueError:
+        pass
+
+    dt = datetime.fromisoformat(value.replace("Z", "+00:00"))
+    if dt.tzinfo is None:
+        dt = dt.replace(tzinfo=timezone.utc)
+    return dt.timestamp()
+
+
+def get_field(data, path):
+    """Ambil field bertingkat, mis. 'gps.latitude' atau 'attitude.roll'."""
+    value = data
+    for part in path.split("."):
+        if not isinstance(value, dict):
+            return None
+        value = value.get(part)
+    return value if isinstance(value, (int, float)) and not isinstance(value, bool) else None
+
+
+@telemetry_blueprint.route("/telemetry/range", methods=["GET"])
+def get_telemetry_range():
+    """
+    Track telemetry dalam rentang waktu, di-downsample di server.
+    Query: from, to (epoch/ISO), max_points, method (lttb|minmax), field (default altitude).
+    """
+    try:
+        end = parse_time_param(request.args.get("to")) or time.time()
+        start = parse_time_param(request.args.get("from"))
+        if start is None:
+            start = end - RANGE_DEFAULT_WINDOW
+        max_points = min(
+            max(int(request.args.get("max_points", 1000)), RANGE_MIN_POINTS),
+            RANGE_MAX_POINTS,
+        )
+        method = request.args.get("method", "lttb")
+        field = request.args.get("field", "altitude")
+    except ValueError as e:
+        return jsonify({"error": f"Parameter tidak valid: {e}"}), 400
+
+    if start > end:
+        return jsonify({"error": "'from' harus lebih kecil dari 'to'."}), 400
+    if method not in ("lttb", "minmax"):
+        return jsonify({"error": "method harus 'lttb' atau 'minmax'."}), 400
+
+    records = list(flight_log.query(start, end))
+    total = len(records)
+
+    if total > max_points:
+        x = np.fromiter((t for t, _ in records), dtype=float, count=total)
+        y = np.array([get_field(d, field) for _, d in records], dtype=float)
+        indices = downsample_indices(x, y, max_points, method)
+        records = [records[i] for i in indices]
+
+    points = [dict(data, t=t) for t, data in records]
+
+    return jsonify({
+        "from": start,
+        "to": end,
+        "method": method,
+        "field": field,
+        "total_points": total,
+        "returned_points": len(points),
+        "points": points,
+    }), 200
+
+
+# =====================================================
+# Geo-referencing deteksi (replay dari flight log)
+# =====================================================
+GEOREF_MAX_DETECTIONS = 10000
+
+
+@telemetry_blueprint.route("/telemetry/georeference", methods=["POST"])
+def georeference_detections():
+    """
+    Proyeksikan banyak deteksi ke koordinat tanah sekaligus.
+    Body: {"detections": [{"timestamp", "fire_bbox": [x, y, w, h], "frame_shape": [h, w]}]}
+    Telemetry diambil dari flight log lokal pada rentang waktu deteksi.
+    """
+    body = request.get_json(silent=True) or {}
+    detections = body.get("detections")
+    if not isinstance(detections, list) or not detections:
+        return jsonify({"error": "Body harus berisi list 'detections'."}), 400
+    if len(detections) > GEOREF_MAX_DETECTIONS:
+        return jsonify({"error": f"Maksimal {GEOREF_MAX_DETECTIONS} deteksi per request."}), 400
+
+    times, boxes, sizes, rows = [], [], [], []
+    for i, det in enumerate(detections):
+        try:
+            t = parse_time_param(str(det.get("timestamp")))
+        except (AttributeError, ValueError):
+            t = None
+        box = parse_bbox(det.get("fire_bbox")) if isinstance(det, dict) else None
+        if t is None or box is None:
+            continue
+        shape = det.get("frame_shape")
+        size = parse_frame_shape(shape) if shape is not None else georeferencer.image_size
+        if size is None:
+            return jsonify({"error": f"detections[{i}].frame_shape harus [tinggi, lebar]."}), 400
+        times.append(t)
+        boxes.append(box)
+        sizes.append(size)
+        rows.append(i)
+
+    results = [None] * len(detections)
+    if rows:
+        gap = georeferencer.history.max_gap
+        history = TelemetryHistory.from_records(
+            flight_log.query(min(times) - gap, max(times) + gap), max_gap=gap
+        )
+        replay = georeferencer.with_history(history) if len(history) else georeferencer
+        located = replay.locate_many(times, boxes, sizes)
+        for j, i in enumerate(rows):
+            results[i] = location_at(located, j)
+
+    return jsonify({
+        "total": len(detections),
+        "located": sum(1 for r in results if r),
+        "locations": results,
+    }), 200
+
+
+@telemetry_blueprint.route("/telemetry/link-stats", methods=["GET"])
+def get_link_stats():
+    """Statistik link MAVLink (message rate, packet loss, heartbeat delay)."""
+    if pixhawk.fallback_mode or not pixhawk.vehicle:
+        return jsonify({"error": "Pixhawk tidak terhubung."}), 503
+
+    return jsonify(pixhawk.get_link_stats()), 200
+
+
+@telemetry_blueprint.route("/telemetry/recorder-stats", methods=["GET"])
+def get_recorder_stats():
+    """Statistik antrean & flush telemetry recorder."""
+    return jsonify({
+        "recorder": recorder.get_stats(),
+        "flight_log": flight_log.get_stats(),
+    }), 200
+
+
 @telemetry_blueprint.route("/telemetry/push_pixhawk_data", methods=["POST"])
+@ingest_only
 def post_pixhawk_data_manually():
     """
     Endpoint POST untuk pendorongan data Pixhawk secara manual ke Firebase.
@@ -128,12 +361,14 @@ def post_pixhawk_data_manually():
         if "source" not in manual_data:
              manual_data["source"] = "manual"
         
-        # Simpan langsung dictionary dari request body
-        ref = db.reference("/drone_data")
-        ref.push().set(manual_data)
-        
+        # Masukkan dictionary dari request body ke antrean recorder
+        key = recorder.record(manual_data)
+        if not key:
+            return jsonify({"error": "Antrean telemetry penuh, coba lagi."}), 503
+
         return jsonify({
-            "message": "✅ Data manual berhasil didorong ke Firebase.",
+            "message": "✅ Data manual masuk antrean penyimpanan Firebase.",
+            "key": key,
             "data": manual_data
         }), 200
 
@@ -144,14 +379,17 @@ def post_pixhawk_data_manually():
         if not telemetry or telemetry.get("source") != "pixhawk":
             raise Exception("Pixhawk tidak terhubung atau tidak merespons.")
 
-        # 3. Konversi dan simpan ke Firebase
+        # 3. Konversi dan masukkan ke antrean recorder
         drone_data = create_drone_data_from_pixhawk(telemetry)
+        flight_log.append(drone_data.to_dict())
 
-        ref = db.reference("/drone_data")
-        ref.push().set(drone_data.to_dict())
+        key = recorder.record(drone_data)
+        if not key:
+            return jsonify({"error": "Antrean telemetry penuh, coba lagi."}), 503
 
         return jsonify({
-            "message": "✅ Data Pixhawk berhasil didorong ke Firebase secara manual.",
+            "message": "✅ Data Pixhawk masuk antrean penyimpanan Firebase.",
+            "key": key,
             "data": drone_data.to_dict()
         }), 200
 
@@ -1,13 +1,40 @@
 # backend/api/user.py
-from flask import Blueprint, request, jsonify
+from flask import Blueprint, request, jsonify, make_response, url_for
 from firebase_admin import db, storage
 from backend.utils.auth_helper import token_required
+from backend.utils.user_directory import user_directory
+from backend.utils.profile_images import (
+    IMMUTABLE_CACHE_CONTROL, InvalidImageError, decode_data_url, profile_images,
+)
 import datetime
-import base64
 import uuid
 
 user_blueprint = Blueprint('user', __name__)
 
+
+def profile_image_url(image_id, size="256"):
+    """URL absolut foto profil (immutable, bisa di-cache browser)."""
+    if not image_id:
+        return None
+    return url_for("user.get_profile_image", image_id=image_id, size=size, _external=True)
+
+
+def migrate_legacy_image(user_id, user_data):
+    """Pindahkan profileImage base64 lama ke profile image store (sekali per user)."""
+    data = decode_data_url(user_data.get("profileImage"))
+    if data is None:
+        return user_data.get("profileImageId")
+    try:
+        image_id = profile_images.save(data)
+    except Exception as e:
+        print(f"⚠️ Gagal migrasi foto profil {user_id}: {e}")
+        return None
+
+    changes = {"profileImageId": image_id, "profileImage": None}
+    db.reference(f'/users/{user_id}').update(changes)
+    user_directory.update(user_id, changes)
+    return image_id
+
 # =========================================================
 # 🔹 GET USER PROFILE
 # =========================================================
@@ -16,15 +43,18 @@ user_blueprint = Blueprint('user', __name__)
 def get_profile(current_user):
     """Mendapatkan data profil user yang sedang login."""
     try:
-        ref = db.reference(f'/users/{current_user}')
-        user_data = ref.get()
-        
+        # Record ringan dari user directory; RTDB hanya untuk record lama
+        # yang masih menyimpan foto base64 (langsung dimigrasi)
+        user_data = user_directory.get(current_user)
+        if user_data is None or (user_data.get('has_profile_image')
+                                 and not user_data.get('profileImageId')):
+            user_data = db.reference(f'/users/{current_user}').get()
+            if user_data:
+                user_data['profileImageId'] = migrate_legacy_image(current_user, user_data)
+
         if not user_data:
             return jsonify({"error": "User tidak ditemukan."}), 404
 
-        # Jangan kirim password ke frontend
-        user_data.pop('password', None)
-        
         return jsonify({
             "data": {
                 "name": user_data.get('username', ''),
@@ -32,7 +62,8 @@ def get_profile(current_user):
                 "phone": user_data.get('phone', ''),
                 "role": user_data.get('role', 'User'),
                 "department": user_data.get('department', ''),
-                "profileImage": user_data.get('profileImage', None)
+                "profileImage": profile_image_url(user_data.get('profileImageId')),
+                "profileImageThumb": profile_image_url(user_data.get('profileImageId'), "64")
             }
         }), 200
 
@@ -46,7 +77,7 @@ def get_profile(current_user):
 @user_blueprint.route('/profile', methods=['PUT'])
 @token_required
 def update_profile(current_user):
-    """Update data profil user (termasuk upload foto base64)."""
+    """Update data profil user (termasuk upload foto profil)."""
     try:
         # Cek tipe request
         if request.content_type and 'multipart/form-data' in request.content_type:
@@ -80,17 +111,17 @@ def update_profile(current_user):
             "updated_at": datetime.datetime.now().isoformat()
         }
 
-        # 🖼️ Upload profile image as base64
+        # 🖼️ Upload profile image ke store (content-hash + thumbnail);
+        # record user hanya menyimpan referensi, base64 lama dihapus
         if profile_image:
             try:
-                image_data = profile_image.read()
-                image_base64 = base64.b64encode(image_data).decode('utf-8')
-                image_type = profile_image.content_type or 'image/jpeg'
-                update_data['profileImage'] = f"data:{image_type};base64,{image_base64}"
-            except Exception as img_error:
-                print(f"Error uploading image: {img_error}")
+                update_data['profileImageId'] = profile_images.save(profile_image.read())
+                update_data['profileImage'] = None
+            except InvalidImageError as img_error:
+                return jsonify({"error": str(img_error)}), 400
 
         ref.update(update_data)
+        user_directory.update(current_user, update_data)
 
         return jsonify({
             "message": "Profil berhasil diupdate.",
@@ -100,7 +131,9 @@ def update_profile(current_user):
                 "phone": update_data["phone"],
                 "role": update_data["role"],
                 "department": update_data["department"],
-                "profileImage": update_data.get("profileImage")
+                "profileImage": profile_image_url(
+                    update_data.get("profileImageId") or user_data.get("profileImageId")
+                )
             }
         }), 200
 
@@ -116,21 +149,16 @@ def update_profile(current_user):
 def get_all_users(current_user):
     """Mendapatkan semua data user (untuk admin)."""
     try:
-        ref = db.reference('/users')
-        users_data = ref.get()
-
-        if not users_data:
-            return jsonify({"data": []}), 200
-
+        # Record ringan dari user directory (tanpa unduh /users + foto base64)
         users_list = []
-        for user_id, user_info in users_data.items():
-            user_info.pop('password', None)
+        for user_id, user_info in user_directory.list_users():
             users_list.append({
                 "id": user_id,
                 "name": user_info.get('username'),
                 "email": user_info.get('email'),
                 "role": user_info.get('role', 'User'),
                 "department": user_info.get('department', ''),
+                "profileImage": profile_image_url(user_info.get('profileImageId'), "64"),
                 "created_at": user_info.get('created_at')
             })
 
@@ -140,6 +168,28 @@ def get_all_users(current_user):
         return jsonify({"error": str(e)}), 500
 
 
+# =========================================================
+# 🖼️ PROFILE IMAGE (publik, immutable)
+# =========================================================
+@user_blueprint.route('/profile-image/<image_id>', methods=['GET'])
+def get_profile_image(image_id):
+    """Sajikan foto profil; ?size=64|256|full. ID = hash konten → cache selamanya."""
+    size = request.args.get('size', '256')
+    etag = f"{image_id}-{size}"
+    if request.if_none_match.contains(etag):
+        response = make_response("", 304)
+    else:
+        data = profile_images.get_bytes(image_id, size)
+        if data is None:
+            return jsonify({"error": "Foto profil tidak ditemukan."}), 404
+        response = make_response(data)
+        response.headers["Content-Type"] = "image/jpeg"
+
+    response.set_etag(etag)
+    response.headers["Cache-Control"] = IMMUTABLE_CACHE_CONTROL
+    return response
+
+
 # =========================================================
 # ⚙️ SYSTEM PREFERENCES
 # =========================================================
@@ -1,24 +1,24 @@
-from flask import Blueprint, jsonify, Response
+from flask import Blueprint, jsonify, Response, request
 import cv2
 import numpy as np
 import time
 import json
-from firebase_admin import storage
+from backend.database.db import default_bucket
+from backend.utils.storage_index import blob_index
+from backend.utils.frame_broadcaster import get_stream, get_streams_stats
+from backend.utils.frame_cache import frame_cache
+from backend.utils.signed_url_cache import signed_urls, public_url
+from backend.utils.thermal_analysis import thermal_analyzer
 
 video_blueprint = Blueprint("video", __name__)
 
 
 # ============================================================
 # 1. Ambil blob terbaru APA SAJA (.jpg / .png / .json)
+#    Index diperbarui inkremental di background → O(1) per request
 # ============================================================
 def get_latest_blob(folder_name: str):
-    bucket = storage.bucket()
-    blobs = list(bucket.list_blobs(prefix=f"{folder_name}/"))
-
-    if not blobs:
-        return None
-
-    return max(blobs, key=lambda b: b.updated)
+    return blob_index.latest(folder_name)
 
 
 # ============================================================
@@ -26,84 +26,232 @@ def get_latest_blob(folder_name: str):
 #    - Jika file = JPG → langsung pakai
 #    - Jika file = JSON → baca JSON → ambil remote_path → ambil JPG
 # ============================================================
-def get_latest_image_from_storage(folder_name: str):
-    try:
-        bucket = storage.bucket()
+def resolve_image_blob(latest_blob):
+    """Blob gambar untuk blob terbaru (langsung, atau lewat metadata JSON)."""
+    bucket = default_bucket()
+    name = latest_blob.name.lower()
+
+    # CASE A → File = gambar
+    if name.endswith((".jpg", ".jpeg", ".png")):
+        return latest_blob
+
+    # CASE B → File = JSON metadata
+    if name.endswith(".json"):
+        json_bytes = frame_cache.get_bytes(latest_blob)
+        meta = json.loads(json_bytes.decode("utf-8"))
+
+        # Ambil path gambar dari JSON
+        remote_path = meta.get("image", {}).get("remote_path")
+        if not remote_path:
+            print("[WARN] JSON tidak memiliki remote_path image.")
+            return None
+
+        # Ambil file JPG sesuai remote_path (get_blob → metadata generation ikut terisi)
+        img_blob = bucket.get_blob(remote_path)
+        if img_blob is None:
+            print(f"[ERROR] File image '{remote_path}' tidak ditemukan di storage.")
+            return None
+        return img_blob
+
+    # Tidak dikenal
+    return None
+
+
+# ============================================================
+# 3. MJPEG STREAM → DETECTED FIRE VIEW
+#    Satu producer bersama: frame diambil sekali lalu dibagikan ke
+#    semua viewer lewat ring buffer. JPEG dari storage diteruskan apa
+#    adanya (passthrough); decode hanya jika perlu transformasi/PNG.
+# ============================================================
+STREAM_INTERVAL = 1.2  # detik
+
+JPEG_MAGIC = b"\xff\xd8\xff"
+
+
+def is_jpeg(data) -> bool:
+    return bytes(memoryview(data)[:3]) == JPEG_MAGIC
+
+
+def encode_frame(data, transform=None, quality=None):
+    """
+    Byte JPEG siap kirim. Passthrough tanpa decode jika sumber sudah JPEG
+    dan tidak ada transformasi (overlay/resize) atau kualitas khusus.
+    """
+    if transform is None and quality is None and is_jpeg(data):
+        return bytes(data)
+
+    frame = cv2.imdecode(np.frombuffer(data, np.uint8), cv2.IMREAD_COLOR)
+    if frame is None:
+        return None
+    if transform is not None:
+        frame = transform(frame)
 
-        # Ambil file terbaru
+    params = [cv2.IMWRITE_JPEG_QUALITY, int(quality)] if quality else []
+    ret, buffer = cv2.imencode(".jpg", frame, params)
+    return buffer.tobytes() if ret else None
+
+
+def make_resize(width):
+    """Transformasi resize ke lebar tertentu (aspect ratio dipertahankan)."""
+    def resize(frame):
+        h, w = frame.shape[:2]
+        if w <= width:
+            return frame
+        height = max(int(round(h * width / w)), 1)
+        return cv2.resize(frame, (width, height), interpolation=cv2.INTER_AREA)
+    return resize
+
+
+def make_frame_fetcher(folder_name: str, transform=None, quality=None):
+    def fetch_frame(last_key):
         latest_blob = get_latest_blob(folder_name)
         if not latest_blob:
             return None
 
-        name = latest_blob.name.lower()
+        # Blob sumber belum berubah → tidak perlu download ulang
+        key = (latest_blob.name, latest_blob.generation)
+        if key == last_key:
+            return None
 
-        # CASE A → File = gambar
-        if name.endswith((".jpg", ".jpeg", ".png")):
-            img_bytes = latest_blob.download_as_bytes()
-            img_array = np.frombuffer(img_bytes, np.uint8)
-            return cv2.imdecode(img_array, cv2.IMREAD_COLOR)
+        img_blob = resolve_image_blob(latest_blob)
+        if not img_blob:
+            return None
 
-        # CASE B → File = JSON metadata
-        if name.endswith(".json"):
-            json_bytes = latest_blob.download_as_bytes()
-            meta = json.loads(json_bytes.decode("utf-8"))
+        jpeg_bytes = encode_frame(frame_cache.get_bytes(img_blob), transform, quality)
+        if jpeg_bytes is None:
+            return None
+        return key, jpeg_bytes
 
-            # Ambil path gambar dari JSON
-            remote_path = meta.get("image", {}).get("remote_path")
-            if not remote_path:
-                print("[WARN] JSON tidak memiliki remote_path image.")
-                return None
+    return fetch_frame
 
-            # Ambil file JPG sesuai remote_path
-            img_blob = bucket.blob(remote_path)
-            if not img_blob.exists():
-                print(f"[ERROR] File image '{remote_path}' tidak ditemukan di storage.")
-                return None
 
-            img_bytes = img_blob.download_as_bytes()
-            img_array = np.frombuffer(img_bytes, np.uint8)
-            return cv2.imdecode(img_array, cv2.IMREAD_COLOR)
+def mjpeg_parts(jpeg_bytes):
+    """Header, isi frame (tanpa disalin/digabung), dan trailer multipart."""
+    yield (
+        b"--frame\r\n"
+        b"Content-Type: image/jpeg\r\n"
+        b"Content-Length: " + str(len(jpeg_bytes)).encode() + b"\r\n\r\n"
+    )
+    yield jpeg_bytes
+    yield b"\r\n"
 
-        # Tidak dikenal
-        return None
 
-    except Exception as e:
-        print(f"[ERROR] get_latest_image_from_storage: {e}")
+# ------------------------------------------------------------
+# Varian stream (?width=, ?quality=, ?fps=, ?adaptive=1)
+# Parameter di-snap ke "rung" tetap sehingga jumlah varian terbatas;
+# setiap varian punya satu producer yang me-render frame sekali untuk
+# semua viewer di varian itu.
+# ------------------------------------------------------------
+WIDTH_RUNGS = (320, 480, 640, 960, 1280)
+QUALITY_RUNGS = (40, 60, 75, 90)
+FPS_RUNGS = (0.5, 1, 2, 5)
+
+# Urutan turun kualitas untuk mode adaptive (None = resolusi asli/passthrough)
+ADAPTIVE_LADDER = ((None, None), (960, 75), (640, 60), (320, 40))
+SLOW_WRITE_FACTOR = 2.0     # write > factor × interval dianggap lambat
+SLOW_WRITE_LIMIT = 3        # jumlah write lambat berturut-turut sebelum turun rung
+
+
+def snap(value, rungs):
+    """Rung terbesar yang <= value (atau rung terkecil)."""
+    if value is None:
         return None
+    candidates = [r for r in rungs if r <= value]
+    return max(candidates) if candidates else min(rungs)
+
+
+def parse_variant(args):
+    def number(name, cast):
+        raw = args.get(name)
+        return cast(raw) if raw not in (None, "") else None
+
+    width = snap(number("width", int), WIDTH_RUNGS)
+    quality = snap(number("quality", int), QUALITY_RUNGS)
+    fps = snap(number("fps", float), FPS_RUNGS)
+    return width, quality, fps
+
+
+def get_variant_stream(folder_name, width=None, quality=None, fps=None):
+    name = f"{folder_name}:w={width or 'orig'}:q={quality or 'orig'}:fps={fps or 'default'}"
+    transform = make_resize(width) if width else None
+    return get_stream(
+        name,
+        make_frame_fetcher(folder_name, transform=transform, quality=quality),
+        interval=(1.0 / fps) if fps else STREAM_INTERVAL,
+    )
+
+
+def lower_rung(width):
+    """Rung adaptive berikutnya yang lebih kecil dari lebar saat ini."""
+    current = width or float("inf")
+    for rung_width, rung_quality in ADAPTIVE_LADDER:
+        if rung_width is not None and rung_width < current:
+            return rung_width, rung_quality
+    return None
+
+
+def stream_variant_frames(folder_name, width, quality, fps, adaptive=False):
+    """Generator multipart MJPEG; mode adaptive turun rung jika write ke socket lambat."""
+    interval = (1.0 / fps) if fps else STREAM_INTERVAL
+    subscription = get_variant_stream(folder_name, width, quality, fps).subscribe()
+    slow_writes = 0
+
+    try:
+        while True:
+            frame = next(subscription)
+            started = time.time()
+            yield from mjpeg_parts(frame)
+
+            if not adaptive:
+                continue
+
+            # Generator baru dilanjutkan setelah chunk ditulis → durasi ≈ waktu write
+            if time.time() - started > SLOW_WRITE_FACTOR * interval:
+                slow_writes += 1
+            else:
+                slow_writes = 0
+
+            if slow_writes >= SLOW_WRITE_LIMIT:
+                rung = lower_rung(width)
+                slow_writes = 0
+                if rung:
+                    width, quality = rung
+                    print(f"📉 Viewer {folder_name} turun ke rung width={width}, quality={quality}")
+                    subscription.close()
+                    subscription = get_variant_stream(folder_name, width, quality, fps).subscribe()
+    finally:
+        subscription.close()
 
 
-# ============================================================
-# 3. MJPEG STREAM → DETECTED FIRE VIEW
-# ============================================================
 @video_blueprint.route("/detected-fire")
 def video_detected_fire():
-    def generate():
-        while True:
-            frame = get_latest_image_from_storage("detected_fire")
-            if frame is not None:
-                ret, buffer = cv2.imencode(".jpg", frame)
-                if ret:
-                    yield (
-                        b"--frame\r\n"
-                        b"Content-Type: image/jpeg\r\n\r\n" +
-                        buffer.tobytes() + b"\r\n"
-                    )
-            time.sleep(1.2)
+    try:
+        width, quality, fps = parse_variant(request.args)
+    except ValueError:
+        return jsonify({"error": "width/quality/fps harus berupa angka."}), 400
+    adaptive = request.args.get("adaptive") == "1"
 
     return Response(
-        generate(),
+        stream_variant_frames("detected_fire", width, quality, fps, adaptive),
         mimetype="multipart/x-mixed-replace; boundary=frame",
     )
 
 
+@video_blueprint.route("/streams/stats")
+def video_streams_stats():
+    return jsonify({
+        "streams": get_streams_stats(),
+        "frame_cache": frame_cache.get_stats(),
+        "signed_urls": signed_urls.get_stats(),
+    }), 200
+
+
 # ============================================================
 # 4. Endpoint untuk FRONTEND → ambil JSON info file TERBARU
 # ============================================================
 @video_blueprint.route("/latest/detected_fire")
 def latest_detected_fire():
     try:
-        bucket = storage.bucket()
-
         latest_blob = get_latest_blob("detected_fire")
         if not latest_blob:
             return jsonify({"message": "No files"}), 404
@@ -112,23 +260,21 @@ def latest_detected_fire():
 
         # CASE A: Jika file terbaru = JSON → ambil image.remote_path
         if name.endswith(".json"):
-            meta = json.loads(latest_blob.download_as_bytes().decode())
+            meta = json.loads(frame_cache.get_bytes(latest_blob).decode())
             remote_path = meta.get("image", {}).get("remote_path")
 
             if remote_path:
-                url = f"https://storage.googleapis.com/{bucket.name}/{remote_path}"
                 return jsonify({
                     "name": remote_path,
-                    "url": url,
+                    "url": signed_urls.get_url_or_public(remote_path),
                     "updated": latest_blob.updated.isoformat()
                 }), 200
 
         # CASE B: Jika file terbaru = JPG/JPEG/PNG
         if name.endswith((".jpg", ".jpeg", ".png")):
-            url = f"https://storage.googleapis.com/{bucket.name}/{latest_blob.name}"
             return jsonify({
                 "name": latest_blob.name,
-                "url": url,
+                "url": signed_urls.get_url_or_public(latest_blob.name),
                 "updated": latest_blob.updated.isoformat()
             }), 200
 
@@ -137,3 +283,80 @@ def latest_detected_fire():
     except Exception as e:
         print("[ERROR] latest_detected_fire:", e)
         return jsonify({"error": str(e)}), 500
+
+
+# ============================================================
+# 5. Daftar gambar per halaman (signed URL di-sign sekaligus)
+# ============================================================
+IMAGE_EXTENSIONS = (".jpg", ".jpeg", ".png")
+IMAGE_FOLDERS = ("detected_fire", "thermal_images")
+MAX_PAGE_SIZE = 100
+
+
+@video_blueprint.route("/images/<folder>")
+def list_images(folder):
+    """
+    GET /api/video/images/detected_fire?limit=20&offset=0
+    Gambar terbaru lebih dulu, diambil dari blob index (tanpa listing bucket).
+    """
+    if folder not in IMAGE_FOLDERS:
+        return jsonify({"error": f"Folder tidak dikenal: {folder}"}), 404
+
+    try:
+        limit = min(max(int(request.args.get("limit", 20)), 1), MAX_PAGE_SIZE)
+        offset = max(int(request.args.get("offset", 0)), 0)
+    except ValueError:
+        return jsonify({"error": "limit/offset harus berupa angka"}), 400
+
+    try:
+        images = [
+            blob for blob in blob_index.recent(folder, limit=blob_index.recent_limit)
+            if blob.name.lower().endswith(IMAGE_EXTENSIONS)
+        ]
+        page = images[offset:offset + limit]
+        urls = signed_urls.sign_many([blob.name for blob in page])
+
+        items = [
+            {
+                "name": blob.name,
+                "size": blob.size,
+                "url": urls.get(blob.name) or public_url(signed_urls.bucket_name, blob.name),
+                "updated": blob.updated.isoformat() if blob.updated else None,
+            }
+            for blob in page
+        ]
+        next_offset = offset + limit if offset + limit < len(images) else None
+        return jsonify({"items": items, "next_offset": next_offset}), 200
+
+    except Exception as e:
+        print("[ERROR] list_images:", e)
+        return jsonify({"error": str(e)}), 500
+
+
+# ============================================================
+# 6. Analisis hotspot gambar thermal terbaru di Storage
+#    Hasil di-cache per (nama, generation) → hanya dihitung sekali per frame
+# ============================================================
+@video_blueprint.route("/thermal/latest-analysis")
+def latest_thermal_analysis():
+    try:
+        latest_blob = get_latest_blob("thermal_images")
+        if not latest_blob:
+            return jsonify({"message": "No files"}), 404
+
+        img_blob = resolve_image_blob(latest_blob)
+        if img_blob is None:
+            return jsonify({"error": "Unknown file type"}), 400
+
+        analysis = thermal_analyzer.analyze_blob(img_blob)
+        if analysis is None:
+            return jsonify({"error": "Image is not radiometric", "name": img_blob.name}), 422
+        return jsonify(dict(
+            analysis,
+            name=img_blob.name,
+            updated=latest_blob.updated.isoformat() if latest_blob.updated else None,
+        )), 200
+
+    except Exception as e:
+        print("[ERROR] latest_thermal_analysis:", e)
+        return jsonify({"error": str(e)}), 500
@@ -1,8 +1,6 @@
 # backend/app.py
 import os
 import atexit
-import time
-from datetime import datetime
 from flask import Flask, jsonify
 from flask_cors import CORS
 from flask_socketio import SocketIO
@@ -15,18 +13,22 @@ load_dotenv()
 print("🔐 JWT_SECRET_KEY loaded:", bool(os.getenv("JWT_SECRET_KEY")))
 
 # =====================================================
-# Firebase Initialization
+# Firebase Initialization (lazy, lihat backend/database/db.py)
 # =====================================================
-from backend.database.db import initialize_firebase
-from firebase_admin import db, firestore, storage
-
-try:
-    initialize_firebase()
-    # Coba koneksi ke bucket
-    bucket = storage.bucket()
-    print(f"✅ Firebase berhasil diinisialisasi ({bucket.name})")
-except Exception as e:
-    print(f"❌ Gagal inisialisasi Firebase: {e}")
+from backend.database.db import ensure_firebase, check_storage, firebase_state, storage_state
+from backend.utils.firestore_cache import latest_docs
+from backend.utils.storage_index import blob_index
+from backend.utils.thermal_analysis import thermal_analyzer
+from backend.utils.georef import georeferencer
+from backend.utils.user_directory import user_directory
+from backend.utils.profile_images import profile_images
+from backend.utils.flight_summary import flight_summarizer
+from backend.utils.async_runtime import ASYNC_MODE, is_patched, blocking_io
+from backend.utils.cluster import (
+    WORKER_ROLE, CLUSTERED, CLUSTER_BUS_URL, BRIDGED_TOPICS,
+    EventBridge, LeaderElection, mark_ingest_owner, socketio_queue_options,
+)
+from backend.utils.readiness import readiness, READY, STARTING, DEGRADED, PENDING, DISABLED
 
 # =====================================================
 # Flask App Setup
@@ -37,21 +39,35 @@ CORS(
     resources={r"/api/*": {"origins": "*"}},
     allow_headers=["Content-Type", "Authorization"],
     methods=["GET", "POST", "PUT", "DELETE", "OPTIONS"],
+    expose_headers=["ETag", "X-Total-Count", "X-Next-Before"],
     supports_credentials=True,
 )
 
-socketio = SocketIO(app, cors_allowed_origins="*", async_mode="threading")
+# SOCKETIO_ASYNC_MODE: threading (dev, default) | gevent | eventlet (lihat backend/server.py)
+# WORKER_ROLE != all → emit Socket.IO lewat bus bersama agar sampai ke client di worker mana pun
+socketio = SocketIO(
+    app,
+    cors_allowed_origins="*",
+    async_mode=ASYNC_MODE,
+    **(socketio_queue_options(CLUSTER_BUS_URL) if CLUSTERED else {}),
+)
+if not is_patched(ASYNC_MODE):
+    print(f"⚠️ Mode {ASYNC_MODE} tanpa monkey patch, jalankan lewat: python -m backend.server")
 
 # =====================================================
 # Import Blueprints
 # =====================================================
-from backend.api.telemetry import telemetry_blueprint, pixhawk, create_drone_data_from_pixhawk
+from backend.api.telemetry import (
+    telemetry_blueprint, pixhawk, recorder, flight_log, create_drone_data_from_pixhawk,
+    start_telemetry_ingest,
+)
 from backend.api.reports import reports_blueprint
 from backend.api.auth import auth_blueprint
 from backend.api.user import user_blueprint
 from backend.api.video import video_blueprint
 from backend.api.fire_detection_sync import fire_sync_blueprint
 from backend.api.sensors_environment import sensor_env_api
+from backend.api.flight_logs import flight_logs_blueprint
 
 # Register semua blueprint
 app.register_blueprint(telemetry_blueprint, url_prefix="/api")
@@ -61,80 +77,111 @@ app.register_blueprint(user_blueprint, url_prefix="/api/user")
 app.register_blueprint(video_blueprint, url_prefix="/api/video")
 app.register_blueprint(fire_sync_blueprint, url_prefix="/api")
 app.register_blueprint(sensor_env_api, url_prefix="/api")
+app.register_blueprint(flight_logs_blueprint, url_prefix="/api")
+
 # =====================================================
-# Routes Utama
+# Startup non-blocking
 # =====================================================
-@app.route("/")
-def home():
-    return jsonify({"message": "🔥 Fire Quad System backend is running!"})
+# Import modul ini tidak melakukan I/O jaringan: Firebase diinisialisasi saat
+# pertama dipakai (request pertama, client Firestore/Storage) dan di-warm-up
+# di background bersama tes koneksi GCS. Status tiap subsystem: GET /api/ready.
+@app.before_request
+def ensure_services():
+    ensure_firebase()
 
 
-@app.route("/api/health")
-def health():
-    return jsonify({"status": "ok", "message": "Server is running"}), 200
+def warm_up_services():
+    ensure_firebase()
+    blocking_io.run(check_storage)
+
+
+socketio.start_background_task(warm_up_services)
 
 # =====================================================
-# Pixhawk Telemetry Listener
+# Routes Utama
 # =====================================================
-def telemetry_callback(vehicle, attr_name, value):
-    """Callback saat atribut Pixhawk berubah"""
-    try:
-        telemetry = pixhawk.get_telemetry()
-        if telemetry and telemetry.get("source") == "pixhawk":
-            socketio.emit("telemetry", telemetry)
-    except Exception as e:
-        print(f"⚠️ Error callback [{attr_name}]: {e}")
+@app.route("/")
+def home():
+    return jsonify({"message": "🔥 Fire Quad System backend is running!"})
 
 
-attributes_to_listen = [
-    "location", "attitude", "battery",
-    "airspeed", "groundspeed", "heading",
-    "gps_0", "rangefinder", "velocity"
-]
+@app.route("/api/ready")
+def ready():
+    """Readiness probe: 200 jika subsystem wajib siap, 503 selama masih startup."""
+    status = readiness.get_status()
+    return jsonify(status), 200 if status["ready"] else 503
 
-if pixhawk and pixhawk.vehicle:
-    try:
-        for attr in attributes_to_listen:
-            pixhawk.vehicle.add_attribute_listener(attr, telemetry_callback)
-        print("✅ Pixhawk listeners aktif")
-    except Exception as e:
-        print(f"⚠️ Gagal pasang listener Pixhawk: {e}")
-else:
-    print("⚠️ Pixhawk belum terkoneksi")
+
+@app.route("/api/health")
+def health():
+    return jsonify({
+        "status": "ok",
+        "message": "Server is running",
+        "firestore_cache": latest_docs.get_stats(),
+        "event_bus": event_bus.get_stats(),
+        "fire_pipeline": fire_pipeline.get_stats(),
+        "blob_index": blob_index.get_stats(),
+        "thermal_analysis": thermal_analyzer.get_stats(),
+        "georef": georeferencer.get_stats(),
+        "user_directory": user_directory.get_stats(),
+        "profile_images": profile_images.get_stats(),
+        "flight_summary": flight_summarizer.get_stats(),
+        "channels": channel_hub.get_stats(),
+        "blocking_io": blocking_io.get_stats(),
+        "cluster": {
+            "role": WORKER_ROLE,
+            "ingest_owner": ingest_started,
+            "leader": leader_election.get_stats() if leader_election else None,
+            "bridge": event_bridge.get_stats() if event_bridge else None,
+        },
+    }), 200
 
 # =====================================================
 # Background Task 1 → Kirim Telemetry ke Frontend
 # =====================================================
-def telemetry_background_task():
-    """Mengambil data Pixhawk tiap 0.5s dan kirim via Socket.IO."""
-    while True:
-        try:
-            if pixhawk and pixhawk.vehicle:
-                telemetry = pixhawk.get_telemetry()
-                if telemetry and telemetry.get("source") == "pixhawk":
-                    socketio.emit("telemetry", telemetry)
-            time.sleep(0.5)
-        except Exception as e:
-            print(f"⚠️ Error telemetry background: {e}")
-            time.sleep(1)
+# Broadcaster menggabungkan perubahan snapshot Pixhawk menjadi frame dengan
+# rate tetap (TELEMETRY_BROADCAST_HZ), skip jika tidak ada perubahan.
+from backend.utils.telemetry_broadcaster import TelemetryBroadcaster
+
+TELEMETRY_BROADCAST_HZ = float(os.getenv("TELEMETRY_BROADCAST_HZ", "10"))
+TELEMETRY_BROADCAST_DELTA = os.getenv("TELEMETRY_BROADCAST_DELTA", "0") == "1"
+
+telemetry_broadcaster = TelemetryBroadcaster(
+    socketio,
+    pixhawk,
+    rate_hz=TELEMETRY_BROADCAST_HZ,
+    delta=TELEMETRY_BROADCAST_DELTA,
+)
+telemetry_broadcaster.register_handlers()
 
-socketio.start_background_task(telemetry_background_task)
 
 # =====================================================
-# Background Task 2 → Auto-save Telemetry ke Firebase
+# Background Task 2 → Rekam Telemetry ke Firebase (write-behind)
 # =====================================================
-FIREBASE_SAVE_INTERVAL = 10  # detik
+# Sampel diambil TELEMETRY_RECORD_HZ kali per detik dan di-buffer oleh
+# recorder; round trip ke RTDB hanya terjadi saat flush (ukuran/waktu).
+TELEMETRY_RECORD_HZ = float(os.getenv("TELEMETRY_RECORD_HZ", "2"))
 
 def firebase_autosave_task():
-    """Simpan data Pixhawk ke Realtime Database tiap 10 detik."""
+    """Rekam data Pixhawk ke buffer recorder dengan rate TELEMETRY_RECORD_HZ."""
+    period = 1.0 / max(TELEMETRY_RECORD_HZ, 0.01)
+    last_version = None
+
     while True:
         try:
-            time.sleep(FIREBASE_SAVE_INTERVAL)
+            socketio.sleep(period)
+            # Link putus di tengah penerbangan → tutup ringkasan setelah FLIGHT_MAX_GAP
+            flight_summarizer.check_timeout()
 
             if pixhawk and pixhawk.vehicle:
-                telemetry = pixhawk.get_telemetry()
+                snapshot = pixhawk.get_snapshot()
+                telemetry = snapshot.data
 
                 if telemetry and telemetry.get("source") == "pixhawk":
+                    # Snapshot tidak berubah → tidak perlu sampel duplikat
+                    if snapshot.version == last_version:
+                        continue
+                    last_version = snapshot.version
 
                     # ⚙️ Buang field QoS supaya tidak error di DroneData()
                     telemetry_no_qos = {
@@ -144,71 +191,206 @@ def firebase_autosave_task():
 
                     # Buat objek DroneData tanpa qos
                     drone_data = create_drone_data_from_pixhawk(telemetry_no_qos)
+                    sample = drone_data.to_dict()
+                    flight_log.append(sample, t=snapshot.timestamp)
+                    flight_summarizer.ingest(snapshot.timestamp, sample)
+                    recorder.record(drone_data)
+                    # Worker lain (cluster) membaca sampel terakhir dari sini
+                    event_bus.publish("telemetry", sample)
 
-                    ref = db.reference("/drone_data")
-                    ref.push().set(drone_data.to_dict())
-
-                    print(f"✅ Auto-save Pixhawk data: {datetime.now().isoformat()}")
-
-                else:
-                    print("ⓘ Pixhawk tidak aktif, skip auto-save.")
         except Exception as e:
             print(f"⚠️ Error di background auto-save Firebase: {e}")
-            time.sleep(5)
+            socketio.sleep(5)
 
 # =====================================================
-# Background Task 3 → Sinkronisasi Fire Detection (Firestore -> RealtimeDB)
+# Sensor Ingest → Event Bus (Firestore -> RealtimeDB + Socket.IO)
 # =====================================================
-def fire_sync_background():
-    """Cek Firestore tiap 30 detik untuk update fire detection ke RealtimeDB."""
-    fs = firestore.client()
-    rtdb = db.reference("/fire_reports")
+# SENSOR_INGEST_MODE: listener (on_snapshot, default) | poll | fake
+from backend.utils.event_bus import event_bus
+from backend.utils.sensor_ingest import create_sensor_source, set_active_source
+from backend.utils.fire_pipeline import fire_pipeline
 
+
+def on_thermal_event(topic, event):
+    """Subscriber sensors_thermal: teruskan deteksi ke fire incident pipeline."""
+    env_event = event_bus.last("sensors_env")
+    env_data = env_event["data"] if env_event else None
+    fire_pipeline.process(event["id"], event["data"], env_data)
+
+
+FIRE_EXPIRY_INTERVAL = float(os.getenv("FIRE_EXPIRY_INTERVAL", "30"))
+
+
+def fire_incident_expiry_task():
+    """Tutup incident tanpa deteksi baru selama merge window."""
     while True:
+        socketio.sleep(FIRE_EXPIRY_INTERVAL)
         try:
-            thermal_ref = (
-                fs.collection("sensors_thermal")
-                .order_by("timestamp", direction=firestore.Query.DESCENDING)
-                .limit(1)
-            )
-            docs = list(thermal_ref.stream())
-            if not docs:
-                time.sleep(30)
-                continue
-
-            data = docs[0].to_dict()
-            fire_detected = data.get("fire_detected", False)
-            if fire_detected:
-                print("🔥 Fire detected — creating report...")
-                fire_report = {
-                    "timestamp": data.get("timestamp", datetime.utcnow().isoformat()),
-                    "severity": "high" if data.get("max_temp", 0) > 60 else "medium",
-                    "temperature": data.get("max_temp"),
-                    "sensor_type": data.get("sensor_type"),
-                    "image_url": data.get("image_url"),
-                    "fire_bbox": data.get("fire_bbox"),
-                }
-                rtdb.push(fire_report)
-                socketio.emit("fire_alert", fire_report)
-                print("🚨 Fire report saved and alert emitted.")
-            time.sleep(30)
+            fire_pipeline.expire()
         except Exception as e:
-            print(f"⚠️ Error di background fire sync: {e}")
-            time.sleep(10)
+            print(f"⚠️ Error expiry incident: {e}")
+
+
+def on_fire_report(topic, result):
+    """Subscriber fire_report: alert hanya untuk incident baru, update untuk merge."""
+    if result["status"] == "created":
+        print(f"🚨 Fire incident baru: {result['incident_id']}")
+        socketio.emit("fire_alert", result["report"])
+    elif result["status"] == "merged":
+        socketio.emit("fire_incident_update", result["report"])
 
-socketio.start_background_task(fire_sync_background)
+
+# =====================================================
+# Channel Socket.IO per data (pengganti polling dashboard)
+# =====================================================
+# Client emit("subscribe", {"channels": [...], "token": ...}) → join room,
+# terima '<channel>_snapshot' sekali lalu '<channel>' setiap ada perubahan.
+from backend.utils.channel_hub import ChannelHub
+from backend.api.sensors_environment import sensor_env_payload, latest_sensor_env
+from backend.api.reports import latest_reports, report_event
+from backend.utils.reports_cache import reports_cache
+
+# Deteksi di lokasi incident yang sudah ada digabung lewat spatial index cache;
+# incident aktif & ID yang sudah ada dibaca dari cache laporan (tanpa query RTDB berindeks)
+fire_pipeline.cluster_lookup = reports_cache.nearby
+fire_pipeline.recent_lookup = reports_cache.recent
+fire_pipeline.report_lookup = reports_cache.get
+
+channel_hub = ChannelHub(socketio, event_bus, clustered=CLUSTERED)
+channel_hub.add_channel(
+    "sensors_env",
+    transform=lambda event: sensor_env_payload(event["data"]),
+    snapshot=latest_sensor_env,
+)
+channel_hub.add_channel(
+    "fire_report",
+    transform=report_event,
+    snapshot=latest_reports,
+    auth_required=True,
+)
+channel_hub.register_handlers()
+
+# =====================================================
+# Layanan ingest (hanya di satu proses)
+# =====================================================
+# Link MAVLink, autosave telemetry, sensor ingest + fire pipeline, dan emit
+# perubahan channel. WORKER_ROLE=all → langsung dijalankan; WORKER_ROLE=ingest
+# → dijalankan oleh worker yang memenangkan leader election.
+sensor_source = None
+ingest_started = False
+leader_election = None
+event_bridge = None
+
+
+def start_sensor_source(mode=None):
+    global sensor_source
+    if sensor_source:
+        sensor_source.stop()
+    try:
+        sensor_source = create_sensor_source(mode)
+        sensor_source.start()
+        set_active_source(sensor_source)
+    except Exception as e:
+        print(f"⚠️ Gagal memulai sensor ingest: {e}")
+        sensor_source = None
+
+
+def start_ingest_services():
+    global ingest_started
+    if ingest_started:
+        return
+    ingest_started = True
+    mark_ingest_owner()
+
+    ensure_firebase()
+    # Link MAVLink dibuka di background; broadcaster & autosave menunggu snapshot
+    start_telemetry_ingest()
+
+    socketio.start_background_task(telemetry_broadcaster.run)
+    socketio.start_background_task(firebase_autosave_task)
+    socketio.start_background_task(fire_incident_expiry_task)
+
+    event_bus.subscribe("sensors_thermal", on_thermal_event)
+    event_bus.subscribe("fire_report", on_fire_report)
+    channel_hub.publish_updates = True
+    if event_bridge:
+        event_bridge.start_forwarding()
+    start_sensor_source()
+
+
+def on_leadership_lost():
+    # Fencing: lebih aman mati lalu di-restart supervisor daripada dua proses
+    # sama-sama memegang link MAVLink & menulis ke Firebase
+    print("❌ Kehilangan status leader ingest, proses dihentikan")
+    os._exit(1)
+
+
+if CLUSTERED:
+    event_bridge = EventBridge(CLUSTER_BUS_URL, BRIDGED_TOPICS, event_bus)
+    socketio.start_background_task(event_bridge.mirror)
+    # Sampai terpilih (atau selamanya untuk worker web), data sensor datang dari leader
+    start_sensor_source("relay")
+
+if WORKER_ROLE == "all":
+    # Listener Firestore dll. disiapkan di background → import tetap cepat
+    socketio.start_background_task(start_ingest_services)
+elif WORKER_ROLE == "ingest":
+    leader_election = LeaderElection(CLUSTER_BUS_URL)
+    socketio.start_background_task(
+        leader_election.run, start_ingest_services, on_leadership_lost, socketio.sleep
+    )
+print(f"🧩 Worker role: {WORKER_ROLE}" + (f" (bus {CLUSTER_BUS_URL})" if CLUSTERED else ""))
+
+
+# =====================================================
+# Readiness probe per subsystem
+# =====================================================
+def mavlink_readiness():
+    if not ingest_started:
+        # Worker web / kandidat standby tidak memegang link MAVLink
+        return {"state": DISABLED if CLUSTERED else PENDING}
+    status = pixhawk.get_connection_state()
+    status["state"] = {
+        "connected": READY,
+        "connecting": STARTING,
+        "idle": PENDING,
+    }.get(status["state"], DEGRADED)
+    return status
+
+
+def sensor_ingest_readiness():
+    if sensor_source is None:
+        return {"state": PENDING}
+    return {"state": READY if sensor_source.active else STARTING, "mode": sensor_source.mode}
+
+
+readiness.register("firebase", firebase_state)
+readiness.register("storage", storage_state, required=False)
+readiness.register("mavlink", mavlink_readiness, required=False)
+readiness.register("sensor_ingest", sensor_ingest_readiness, required=False)
+readiness.register("flight_log", flight_log.get_state, required=False)
 
 # =====================================================
 # Cleanup Handler
 # =====================================================
 def cleanup():
+    pixhawk.stop_connecting()
     if pixhawk and pixhawk.vehicle:
         try:
-            for attr in attributes_to_listen:
-                pixhawk.vehicle.remove_attribute_listener(attr, telemetry_callback)
-            print("✅ Pixhawk listeners dicabut")
+            pixhawk.stop_ingest()
+            print("✅ Thread ingest Pixhawk dihentikan")
         except Exception as e:
-            print(f"⚠️ Error saat unregister listener: {e}")
+            print(f"⚠️ Error saat menghentikan ingest: {e}")
+
+    if sensor_source:
+        sensor_source.stop()
+    if event_bridge:
+        event_bridge.transport.close()
+    user_directory.stop()
+
+    # Flush sisa sampel telemetry sebelum proses berhenti
+    recorder.stop()
+    flight_log.close()
 
 atexit.register(cleanup)
 
@@ -1,9 +1,13 @@
 import os
+import threading
+import time
 import firebase_admin
-from firebase_admin import credentials, db, firestore
+from firebase_admin import credentials, db, firestore, storage
 from google.cloud import storage as gcs_storage
 from dotenv import load_dotenv
 
+from backend.utils.readiness import PENDING, STARTING, READY, FAILED
+
 # =====================================================
 # Load .env secara eksplisit dari folder backend/
 # =====================================================
@@ -15,14 +19,35 @@ else:
     print("⚠️ File .env tidak ditemukan, pastikan ada di folder backend/")
 
 # =====================================================
-# Firebase Initialization
+# Firebase Initialization (lazy)
 # =====================================================
+# Firebase TIDAK diinisialisasi saat import: ensure_firebase() dipanggil saat
+# pemakaian pertama (client Firestore, bucket Storage, request HTTP) dan
+# sekali di background ketika server start. Blueprint bisa di-import (mis.
+# oleh test) tanpa kredensial maupun koneksi jaringan.
+FIREBASE_DATABASE_URL = (
+    "https://drone-monitoring-system-fef66-default-rtdb."
+    "asia-southeast1.firebasedatabase.app"
+)
+FIREBASE_STORAGE_BUCKET = "drone-monitoring-system-fef66.firebasestorage.app"
+
+# Jeda sebelum inisialisasi yang gagal (mis. kredensial belum ada) dicoba lagi
+FIREBASE_RETRY_INTERVAL = float(os.getenv("FIREBASE_RETRY_INTERVAL", "30"))
+
+_firebase_lock = threading.Lock()
+_firebase_state = {"state": PENDING, "error": None, "attempts": 0, "last_attempt": None}
+_storage_state = {"state": PENDING, "error": None, "bucket": None}
+
+
 def initialize_firebase():
     """
     Inisialisasi Firebase Admin SDK untuk:
     - Realtime Database
     - Cloud Firestore
     - Cloud Storage (GCS)
+
+    Hanya membaca file kredensial (tanpa round trip jaringan). Return True jika
+    app default siap.
     """
     try:
         cred_path = os.getenv("FIREBASE_CREDENTIALS_PATH")
@@ -37,35 +62,82 @@ def initialize_firebase():
         if not firebase_admin._apps:
             cred = credentials.Certificate(cred_path)
             firebase_admin.initialize_app(cred, {
-                "databaseURL": (
-                    "https://drone-monitoring-system-fef66-default-rtdb."
-                    "asia-southeast1.firebasedatabase.app"
-                ),
-                "storageBucket": "drone-monitoring-system-fef66.firebasestorage.app"
+                "databaseURL": FIREBASE_DATABASE_URL,
+                "storageBucket": FIREBASE_STORAGE_BUCKET,
             })
             print("✅ Firebase berhasil diinisialisasi (RealtimeDB + Firestore + Storage)")
         else:
             print("ℹ️ Firebase sudah diinisialisasi sebelumnya, skip re-init.")
-
-        # =====================================================
-        # Tes koneksi ke Google Cloud Storage (pakai .firebasestorage.app)
-        # =====================================================
-        try:
-            bucket_name = "drone-monitoring-system-fef66.firebasestorage.app"
-            client = gcs_storage.Client.from_service_account_json(cred_path)
-            bucket = client.bucket(bucket_name)
-            print(f"📦 GCS bucket aktif: {bucket.name}")
-
-            blobs = list(bucket.list_blobs(max_results=3))
-            if blobs:
-                print(f"📸 Contoh file di bucket: {[b.name for b in blobs[:3]]}")
-            else:
-                print("ℹ️ Bucket aktif tetapi kosong.")
-        except Exception as e:
-            print(f"⚠️ Gagal memverifikasi koneksi GCS: {e}")
+        return True
 
     except Exception as e:
         print(f"❌ Error saat inisialisasi Firebase: {e}")
+        _firebase_state["error"] = str(e)
+        return False
+
+
+def ensure_firebase():
+    """
+    Pastikan app Firebase default ada (lazy, thread-safe). Murah setelah
+    sukses; setelah gagal baru dicoba lagi setiap FIREBASE_RETRY_INTERVAL.
+    """
+    if _firebase_state["state"] == READY:
+        return True
+    with _firebase_lock:
+        if _firebase_state["state"] == READY:
+            return True
+        last = _firebase_state["last_attempt"]
+        if last is not None and time.time() - last < FIREBASE_RETRY_INTERVAL:
+            return False
+
+        _firebase_state["state"] = STARTING
+        _firebase_state["attempts"] += 1
+        _firebase_state["last_attempt"] = time.time()
+        if initialize_firebase():
+            _firebase_state.update(state=READY, error=None)
+            return True
+        _firebase_state["state"] = FAILED
+        return False
+
+
+def firebase_state():
+    """Probe readiness Firebase (tanpa I/O)."""
+    return dict(_firebase_state)
+
+
+def default_bucket():
+    """Bucket Storage default (Firebase diinisialisasi saat pertama dipakai)."""
+    ensure_firebase()
+    return storage.bucket()
+
+
+def check_storage():
+    """
+    Verifikasi koneksi GCS (list beberapa blob). Memblokir → jalankan di
+    background, jangan di jalur import/startup.
+    """
+    _storage_state["state"] = STARTING
+    try:
+        if not ensure_firebase():
+            raise RuntimeError("Firebase belum terinisialisasi")
+        bucket = default_bucket()
+        blobs = list(bucket.list_blobs(max_results=3))
+        print(f"📦 GCS bucket aktif: {bucket.name}")
+        if blobs:
+            print(f"📸 Contoh file di bucket: {[b.name for b in blobs[:3]]}")
+        else:
+            print("ℹ️ Bucket aktif tetapi kosong.")
+        _storage_state.update(state=READY, error=None, bucket=bucket.name)
+        return True
+    except Exception as e:
+        print(f"⚠️ Gagal memverifikasi koneksi GCS: {e}")
+        _storage_state.update(state=FAILED, error=str(e))
+        return False
+
+
+def storage_state():
+    """Probe readiness Storage (hasil check_storage terakhir)."""
+    return dict(_storage_state)
 
 
 # =====================================================
@@ -103,9 +175,8 @@ def get_storage_bucket():
         if not cred_path or not os.path.exists(cred_path):
             raise FileNotFoundError("File kredensial tidak ditemukan atau path kosong.")
 
-        bucket_name = "drone-monitoring-system-fef66.firebasestorage.app"
         client = gcs_storage.Client.from_service_account_json(cred_path)
-        bucket = client.bucket(bucket_name)
+        bucket = client.bucket(FIREBASE_STORAGE_BUCKET)
         print(f"📦 Storage bucket aktif (GCS): {bucket.name}")
         return bucket
     except Exception as e:
@@ -11,7 +11,10 @@ class DroneData:
         fire_detected,
         temperature,
         wind_direction,
-        timestamp
+        timestamp,
+        sonar_range=None,
+        armed=None,
+        mode=None
     ):
         self.battery = battery
         self.altitude = altitude
@@ -24,6 +27,9 @@ class DroneData:
         self.temperature = temperature
         self.wind_direction = wind_direction
         self.timestamp = timestamp
+        self.sonar_range = sonar_range
+        self.armed = armed
+        self.mode = mode
 
     def to_dict(self):
         return {
@@ -37,5 +43,8 @@ class DroneData:
             "fire_detected": self.fire_detected,
             "temperature": self.temperature,
             "wind_direction": self.wind_direction,
-            "timestamp": self.timestamp
+            "timestamp": self.timestamp,
+            "sonar_range": self.sonar_range,
+            "armed": self.armed,
+            "mode": self.mode
         }
@@ -0,0 +1,236 @@
+# backend/load_test.py
+# =====================================================
+# Load test: banyak viewer MJPEG + client Socket.IO sekaligus
+# =====================================================
+# Bandingkan mode server dengan menjalankan skrip yang sama terhadap:
+#   python -m backend.app                          (threading)
+#   python -m backend.server                       (gevent)
+#
+#   python backend/load_test.py --streams 300 --sockets 200 --duration 60
+#
+# Yang diukur:
+#   - stream MJPEG yang berhasil terhubung & frame/detik per viewer
+#   - client Socket.IO yang terhubung & jumlah event yang diterima
+#   - latensi /api/health selama beban berjalan (responsif atau tidak)
+import argparse
+import asyncio
+import statistics
+import threading
+import time
+from urllib.parse import urlsplit
+
+BOUNDARY = b"--frame"
+
+
+def percentile(values, p):
+    if not values:
+        return None
+    values = sorted(values)
+    k = min(len(values) - 1, max(0, round(p / 100.0 * (len(values) - 1))))
+    return values[k]
+
+
+async def http_request(host, port, path):
+    reader, writer = await asyncio.open_connection(host, port)
+    writer.write(
+        f"GET {path} HTTP/1.1\r\nHost: {host}:{port}\r\nConnection: close\r\n\r\n".encode()
+    )
+    await writer.drain()
+    status_line = await reader.readline()
+    await reader.readuntil(b"\r\n\r\n")
+    return reader, writer, status_line
+
+
+# ------------------------------------------------------------
+# Viewer MJPEG
+# ------------------------------------------------------------
+async def mjpeg_viewer(host, port, path, deadline, result):
+    try:
+        reader, writer, status = await asyncio.wait_for(
+            http_request(host, port, path), timeout=30
+        )
+    except Exception:
+        result["failed"] += 1
+        return
+    if b" 200 " not in status:
+        result["failed"] += 1
+        writer.close()
+        return
+
+    result["connected"] += 1
+    frames = 0
+    first_frame = None
+    tail = b""
+    try:
+        while time.time() < deadline:
+            chunk = await asyncio.wait_for(reader.read(65536), timeout=max(deadline - time.time(), 0.1))
+            if not chunk:
+                break
+            data = tail + chunk
+            count = data.count(BOUNDARY)
+            if count and first_frame is None:
+                first_frame = time.time()
+            frames += count
+            tail = data[-(len(BOUNDARY) - 1):]
+    except asyncio.TimeoutError:
+        pass
+    except Exception:
+        result["dropped"] += 1
+    finally:
+        writer.close()
+
+    result["frames"].append(frames)
+    if first_frame is not None:
+        result["first_frame"].append(first_frame - result["started"])
+
+
+# ------------------------------------------------------------
+# Probe latensi HTTP
+# ------------------------------------------------------------
+async def latency_probe(host, port, path, deadline, interval, result):
+    while time.time() < deadline:
+        started = time.time()
+        try:
+            reader, writer, status = await asyncio.wait_for(
+                http_request(host, port, path), timeout=30
+            )
+            await reader.read()
+            writer.close()
+            if b" 200 " in status:
+                result["latency"].append(time.time() - started)
+            else:
+                result["probe_errors"] += 1
+        except Exception:
+            result["probe_errors"] += 1
+        await asyncio.sleep(interval)
+
+
+# ------------------------------------------------------------
+# Client Socket.IO (python-socketio, thread per client)
+# ------------------------------------------------------------
+def socket_clients(url, count, deadline, channels, token, result):
+    try:
+        import socketio
+    except ImportError:
+        print("⚠️ python-socketio tidak terpasang, client Socket.IO dilewati")
+        return []
+
+    lock = threading.Lock()
+
+    def run_client():
+        client = socketio.Client(reconnection=False)
+
+        @client.on("*")
+        def on_any(event, *args):
+            with lock:
+                result["events"] += 1
+
+        try:
+            started = time.time()
+            client.connect(url, transports=["websocket"], wait_timeout=30)
+            with lock:
+                result["sockets_connected"] += 1
+                result["socket_connect"].append(time.time() - started)
+            if channels:
+                client.emit("subscribe", {"channels": channels, "token": token})
+            client.sleep(max(deadline - time.time(), 0))
+        except Exception:
+            with lock:
+                result["sockets_failed"] += 1
+        finally:
+            try:
+                client.disconnect()
+            except Exception:
+                pass
+
+    threads = [threading.Thread(target=run_client, daemon=True) for _ in range(count)]
+    for t in threads:
+        t.start()
+    return threads
+
+
+# ------------------------------------------------------------
+
+def report(args, result, elapsed):
+    frames = result["frames"]
+    fps = [f / elapsed for f in frames]
+    latency_ms = [x * 1000 for x in result["latency"]]
+
+    print("\n📊 Hasil load test")
+    print(f"   durasi            : {elapsed:.1f} s")
+    print(f"   MJPEG             : {result['connected']}/{args.streams} terhubung, "
+          f"{result['failed']} gagal, {result['dropped']} putus")
+    if fps:
+        print(f"   frame/detik/viewer: rata-rata {statistics.mean(fps):.2f}, "
+              f"min {min(fps):.2f} (target {1.0 / args.expected_interval:.2f})")
+        print(f"   total frame       : {sum(frames)}")
+    if result["first_frame"]:
+        print(f"   frame pertama     : p50 {percentile(result['first_frame'], 50):.2f} s, "
+              f"p95 {percentile(result['first_frame'], 95):.2f} s")
+    if args.sockets:
+        connect_ms = [x * 1000 for x in result["socket_connect"]]
+        print(f"   Socket.IO         : {result['sockets_connected']}/{args.sockets} terhubung, "
+              f"{result['sockets_failed']} gagal, {result['events']} event diterima")
+        if connect_ms:
+            print(f"   connect           : p50 {percentile(connect_ms, 50):.0f} ms, "
+                  f"p95 {percentile(connect_ms, 95):.0f} ms")
+    if latency_ms:
+        print(f"   {args.probe_path:<18}: p50 {percentile(latency_ms, 50):.0f} ms, "
+              f"p95 {percentile(latency_ms, 95):.0f} ms, max {max(latency_ms):.0f} ms "
+              f"({len(latency_ms)} probe, {result['probe_errors']} error)")
+    else:
+        print(f"   {args.probe_path:<18}: tidak ada probe yang berhasil "
+              f"({result['probe_errors']} error)")
+
+
+async def main(args):
+    parts = urlsplit(args.url)
+    host, port = parts.hostname, parts.port or 80
+
+    result = {
+        "started": time.time(),
+        "connected": 0, "failed": 0, "dropped": 0,
+        "frames": [], "first_frame": [],
+        "latency": [], "probe_errors": 0,
+        "sockets_connected": 0, "sockets_failed": 0,
+        "socket_connect": [], "events": 0,
+    }
+    deadline = result["started"] + args.duration
+
+    print(f"🚀 {args.streams} viewer MJPEG ({args.stream_path}) + {args.sockets} client "
+          f"Socket.IO selama {args.duration:g} s → {args.url}")
+
+    threads = socket_clients(
+        args.url, args.sockets, deadline,
+        [c for c in args.channels.split(",") if c], args.token, result,
+    )
+
+    tasks = [
+        asyncio.create_task(mjpeg_viewer(host, port, args.stream_path, deadline, result))
+        for _ in range(args.streams)
+    ]
+    tasks.append(asyncio.create_task(
+        latency_probe(host, port, args.probe_path, deadline, args.probe_interval, result)
+    ))
+    await asyncio.gather(*tasks)
+
+    for t in threads:
+        t.join(timeout=5)
+    report(args, result, time.time() - result["started"])
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Load test stream MJPEG & Socket.IO")
+    parser.add_argument("--url", default="http://127.0.0.1:5000")
+    parser.add_argument("--streams", type=int, default=200, help="jumlah viewer MJPEG")
+    parser.add_argument("--sockets", type=int, default=100, help="jumlah client Socket.IO")
+    parser.add_argument("--duration", type=float, default=30.0, help="detik")
+    parser.add_argument("--stream-path", default="/api/video/detected-fire")
+    parser.add_argument("--probe-path", default="/api/health")
+    parser.add_argument("--probe-interval", type=float, default=0.2)
+    parser.add_argument("--expected-interval", type=float, default=1.2,
+                        help="interval frame server (STREAM_INTERVAL)")
+    parser.add_argument("--channels", default="sensors_env",
+                        help="channel Socket.IO yang di-subscribe (pisahkan koma)")
+    parser.add_argument("--token", default=None, help="JWT untuk channel fire_report")
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,37 @@
+# backend/server.py
+# =====================================================
+# Entrypoint produksi (gevent / eventlet)
+# =====================================================
+# Monkey patching HARUS terjadi sebelum modul lain (firebase_admin, requests,
+# threading, dll.) di-import, sehingga file ini sengaja minimal.
+#
+#   python -m backend.server                       → gevent (default)
+#   SOCKETIO_ASYNC_MODE=eventlet python -m backend.server
+#   gunicorn -w 1 -k geventwebsocket.gunicorn.workers.GeventWebSocketWorker backend.server:app
+#
+# Satu worker per proses: state Socket.IO & cache berada di memori proses.
+import os
+
+ASYNC_MODE = os.environ.setdefault("SOCKETIO_ASYNC_MODE", "gevent")
+
+if ASYNC_MODE == "gevent":
+    from gevent import monkey
+    monkey.patch_all()
+    try:
+        # Client gRPC (Firestore) kooperatif dengan hub gevent
+        import grpc.experimental.gevent as grpc_gevent
+        grpc_gevent.init_gevent()
+    except ImportError:
+        pass
+elif ASYNC_MODE == "eventlet":
+    import eventlet
+    eventlet.monkey_patch()
+
+from backend.app import app, socketio  # noqa: E402
+
+HOST = os.getenv("HOST", "0.0.0.0")
+PORT = int(os.getenv("PORT", "5000"))
+
+if __name__ == "__main__":
+    print(f"🚀 Server Fire Quad System ({ASYNC_MODE}) berjalan di http://{HOST}:{PORT}")
+    socketio.run(app, host=HOST, port=PORT, debug=False)
@@ -0,0 +1,46 @@
+# backend/tests/test_channel_hub.py
+from flask import Flask
+from flask_socketio import SocketIO
+
+from backend.utils.channel_hub import ChannelHub
+from backend.utils.event_bus import EventBus
+
+
+def make_client(snapshot):
+    app = Flask(__name__)
+    socketio = SocketIO(app, async_mode="threading")
+    bus = EventBus()
+    hub = ChannelHub(socketio, bus)
+    hub.add_channel("sensors_env", snapshot=lambda: snapshot(bus))
+    hub.register_handlers()
+    return socketio.test_client(app), bus
+
+
+def test_snapshot_then_updates():
+    client, bus = make_client(lambda bus: {"temperature": 26})
+    client.emit("subscribe", {"channels": ["sensors_env"]})
+    bus.publish("sensors_env", {"temperature": 27})
+
+    received = [(m["name"], m["args"][0]) for m in client.get_received()]
+    assert received == [
+        ("sensors_env_snapshot", {"temperature": 26}),
+        ("sensors_env", {"temperature": 27}),
+    ]
+
+
+def test_update_between_read_and_join_rereads_snapshot():
+    reads = []
+
+    def snapshot(bus):
+        reads.append(1)
+        if len(reads) == 1:
+            # Update datang saat snapshot dibaca, sebelum client masuk room
+            bus.publish("sensors_env", {"temperature": 27})
+            return {"temperature": 26}
+        return {"temperature": 27}
+
+    client, _ = make_client(snapshot)
+    client.emit("subscribe", {"channels": ["sensors_env"]})
+
+    received = [(m["name"], m["args"][0]) for m in client.get_received()]
+    assert received == [("sensors_env_snapshot", {"temperature": 27})]
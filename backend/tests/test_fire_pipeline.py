@@ -0,0 +1,142 @@
+# backend/tests/test_fire_pipeline.py
+import pytest
+
+from backend.utils import fire_pipeline as fire_pipeline_module
+from backend.utils.fire_pipeline import FireIncidentPipeline
+
+THERMAL_DOC = {
+    "timestamp": "2025-01-12T08:30:00Z",
+    "fire_detected": True,
+    "max_temp": 78.4,
+    "sensor_type": "thermal",
+    "image_url": "https://storage.googleapis.com/bucket/thermal/frame_0001.jpg",
+    "fire_bbox": None,
+}
+
+
+class FakeRef:
+    def __init__(self, db, path):
+        self.db = db
+        self.path = path
+
+    def child(self, key):
+        return FakeRef(self.db, f"{self.path}/{key}")
+
+    def get(self):
+        if self.path == "/fire_reports":
+            return dict(self.db.reports)
+        return self.db.reports.get(self.path.rsplit("/", 1)[1])
+
+    def set(self, data):
+        self.db.writes.append(("set", self.path, data))
+        self.db.reports[self.path.rsplit("/", 1)[1]] = dict(data)
+
+    def update(self, data):
+        self.db.writes.append(("update", self.path, data))
+        self.db.reports[self.path.rsplit("/", 1)[1]].update(data)
+
+
+class FakeDb:
+    def __init__(self):
+        self.reports = {}
+        self.writes = []
+
+    def reference(self, path):
+        return FakeRef(self, path)
+
+
+@pytest.fixture
+def fake_db(monkeypatch):
+    fake = FakeDb()
+    monkeypatch.setattr(fire_pipeline_module, "db", fake)
+    return fake
+
+
+def make_pipeline():
+    return FireIncidentPipeline(bus=None, analyzer=None, georef=None)
+
+
+def test_created_then_duplicate(fake_db):
+    pipeline = make_pipeline()
+
+    assert pipeline.process("doc-1", THERMAL_DOC)["status"] == "created"
+    assert pipeline.process("doc-1", THERMAL_DOC)["status"] == "duplicate"
+    assert [op for op, _, _ in fake_db.writes] == ["set"]
+
+
+def test_restart_redelivery_of_active_incident(fake_db):
+    make_pipeline().process("doc-1", THERMAL_DOC)
+    writes = len(fake_db.writes)
+
+    # Snapshot pertama listener setelah restart mengirim ulang dokumen terakhir
+    result = make_pipeline().process("doc-1", THERMAL_DOC)
+
+    assert result["status"] == "duplicate"
+    assert len(fake_db.writes) == writes
+    assert fake_db.reports["doc-1"]["detection_count"] == 1
+
+
+def test_restart_redelivery_of_closed_incident(fake_db):
+    first = make_pipeline()
+    first.process("doc-1", THERMAL_DOC)
+    assert first.expire(now=2e9) == 1
+    writes = len(fake_db.writes)
+
+    restarted = make_pipeline()
+    restarted.recent_lookup = lambda limit: []      # di luar jangkauan recovery
+    result = restarted.process("doc-1", THERMAL_DOC)
+
+    assert result["status"] == "duplicate"
+    assert len(fake_db.writes) == writes
+    report = fake_db.reports["doc-1"]
+    assert report["status"] == "closed"
+    assert report["first_seen"] == "2025-01-12T08:30:00+00:00"
+    assert report["detection_count"] == 1
+
+
+def test_restart_then_new_detection_merges(fake_db):
+    make_pipeline().process("doc-1", THERMAL_DOC)
+
+    later = dict(THERMAL_DOC, timestamp="2025-01-12T08:31:00Z", max_temp=91.0)
+    result = make_pipeline().process("doc-2", later)
+
+    assert result["status"] == "merged"
+    assert result["incident_id"] == "doc-1"
+    report = fake_db.reports["doc-1"]
+    assert report["detection_count"] == 2
+    assert report["max_temperature"] == 91.0
+
+
+def test_duplicate_skips_thermal_analysis(fake_db):
+    class CountingAnalyzer:
+        calls = 0
+
+        def enrich(self, thermal):
+            self.calls += 1
+            return thermal
+
+    analyzer = CountingAnalyzer()
+    pipeline = FireIncidentPipeline(bus=None, analyzer=analyzer, georef=None)
+
+    pipeline.process("doc-1", THERMAL_DOC)
+    pipeline.process("doc-1", THERMAL_DOC)
+
+    assert analyzer.calls == 1
+
+
+def test_invalid_frame_shape_uses_default_image_size(fake_db):
+    class RecordingGeoref:
+        sizes = []
+
+        def locate(self, t, bbox, image_size):
+            self.sizes.append(image_size)
+            return None
+
+    georef = RecordingGeoref()
+    pipeline = FireIncidentPipeline(bus=None, analyzer=None, georef=georef)
+    doc = dict(THERMAL_DOC, fire_bbox=[10, 10, 4, 4])
+
+    assert pipeline.process("doc-1", dict(doc, frame_shape=512))["status"] == "created"
+    assert pipeline.process("doc-2", dict(doc, frame_shape={"h": 512}))["status"] == "merged"
+    assert pipeline.process("doc-3", dict(doc, frame_shape=[512, 640]))["status"] == "merged"
+    assert georef.sizes == [None, None, (640.0, 512.0)]
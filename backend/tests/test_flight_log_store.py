@@ -0,0 +1,102 @@
+# backend/tests/test_flight_log_store.py
+import os
+
+import pytest
+
+from backend.utils.flight_log_store import FlightLogStore
+
+
+def make_store(directory, **kwargs):
+    kwargs.setdefault("max_segment_bytes", 4096)
+    kwargs.setdefault("index_every", 8)
+    return FlightLogStore(str(directory), **kwargs)
+
+
+def fill(store, count, start=1000.0):
+    for k in range(count):
+        store.append({"altitude": float(k), "battery": 90}, t=start + k)
+
+
+def segment_files(directory, ext):
+    return sorted(n for n in os.listdir(directory) if n.endswith(ext))
+
+
+@pytest.fixture
+def log_dir(tmp_path):
+    store = make_store(tmp_path)
+    fill(store, 500)
+    store.close()
+    return tmp_path
+
+
+def test_store_opens_lazily(tmp_path):
+    directory = tmp_path / "flight_logs"
+    store = make_store(directory)
+
+    assert not directory.exists()
+    assert store.get_state()["state"] == "pending"
+    assert store.latest() is None
+    assert store.get_state()["state"] == "ready"
+
+
+def test_reopen_matches_written_log(log_dir):
+    store = make_store(log_dir)
+
+    stats = store.get_stats()
+    assert stats["segments"] > 1
+    assert stats["records"] == 500
+    assert store.latest() == (1499.0, {"altitude": 499.0, "battery": 90})
+    assert [t for t, _ in store.query(1100, 1103)] == [1100, 1101, 1102, 1103]
+
+
+def test_reopen_reads_only_segment_tails(log_dir, monkeypatch):
+    scanned = []
+    original = FlightLogStore._scan_segment
+
+    def spy(self, path, segment=None, index_on_disk=()):
+        start = segment.size if segment is not None else 0
+        scanned.append(start)
+        return original(self, path, segment, index_on_disk)
+
+    monkeypatch.setattr(FlightLogStore, "_scan_segment", spy)
+    make_store(log_dir).open()
+
+    # Setiap segmen dibaca mulai dari offset ter-index terakhir, bukan dari 0
+    assert scanned and all(start > 0 for start in scanned)
+
+
+def test_missing_sidecar_falls_back_to_full_scan(log_dir):
+    for name in segment_files(log_dir, ".idx"):
+        os.remove(os.path.join(log_dir, name))
+
+    store = make_store(log_dir)
+
+    assert store.get_stats()["records"] == 500
+    assert len(list(store.query(1200, 1299))) == 100
+    assert segment_files(log_dir, ".idx")
+
+
+def test_torn_tail_is_truncated(log_dir):
+    last = os.path.join(log_dir, segment_files(log_dir, ".mpk")[-1])
+    with open(last, "ab") as f:
+        f.write(b"\x92\xcb\x40")     # [t, ... record terpotong
+
+    store = make_store(log_dir)
+    store.append({"altitude": 1.0}, t=2000.0)
+
+    assert store.get_stats()["records"] == 501
+    assert store.latest() == (2000.0, {"altitude": 1.0})
+    assert [t for t, _ in store.query(1498)] == [1498.0, 1499.0, 2000.0]
+
+
+def test_rotation_with_clamped_time_gets_unique_segment(tmp_path):
+    store = make_store(tmp_path, max_segment_bytes=256)
+    # Jam mundur → t dipaksa sama dengan record terakhir di setiap rotasi
+    for _ in range(100):
+        store.append({"altitude": 5.0}, t=1000.0)
+    store.close()
+
+    assert len(segment_files(tmp_path, ".mpk")) == store.get_stats()["segments"] > 1
+    reopened = make_store(tmp_path, max_segment_bytes=256)
+    assert reopened.get_stats()["records"] == 100
+    assert len(list(reopened.query())) == 100
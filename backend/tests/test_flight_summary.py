@@ -0,0 +1,51 @@
+# backend/tests/test_flight_summary.py
+from backend.utils.flight_summary import FlightSummarizer
+
+
+def flight_samples(start, seconds, armed_for):
+    """Sampel 1 Hz: armed selama armed_for detik lalu disarm."""
+    return [
+        (start + k, {"armed": k < armed_for, "altitude": 20.0, "battery": 90 - k * 0.1})
+        for k in range(seconds)
+    ]
+
+
+def make_summarizer():
+    summarizer = FlightSummarizer(end_grace=5, max_gap=60, min_duration=10, bus=None, persist=False)
+    summarizer._loaded = True       # tanpa RTDB
+    return summarizer
+
+
+def test_backfill_skips_in_progress_flight():
+    summarizer = make_summarizer()
+    past = flight_samples(1000, 40, 30)
+    live = flight_samples(2000, 30, 30)
+    for t, sample in live:
+        summarizer.ingest(t, sample)
+
+    rebuilt = summarizer.backfill(past + live)
+
+    assert [f["id"] for f in rebuilt] == ["flight-1000000"]
+    flights = summarizer.list_flights()
+    assert [f["id"] for f in flights] == ["flight-2000000", "flight-1000000"]
+    assert flights[0]["in_progress"] is True
+
+
+def test_totals_cover_all_flights():
+    summarizer = make_summarizer()
+    summarizer.backfill(flight_samples(1000, 40, 30) + flight_samples(2000, 40, 30))
+
+    assert len(summarizer.list_flights(limit=1)) == 1
+    totals = summarizer.totals()
+    assert totals["flights"] == 2
+    assert totals["duration_s"] == 58.0
+
+
+def test_backfill_window_starting_mid_flight_skips_partial_flight():
+    summarizer = make_summarizer()
+    records = flight_samples(1000, 40, 30) + flight_samples(2000, 40, 30)
+    mid_flight = [(t, s) for t, s in records if t >= 1010]
+
+    rebuilt = summarizer.backfill(mid_flight, skip_leading_partial=True)
+
+    assert [f["id"] for f in rebuilt] == ["flight-2000000"]
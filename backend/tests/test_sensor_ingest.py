@@ -0,0 +1,98 @@
+# backend/tests/test_sensor_ingest.py
+import pytest
+
+from backend.utils.event_bus import EventBus
+from backend.utils.firestore_cache import latest_docs
+from backend.utils.sensor_ingest import (
+    FakeListenerSource, _BaseSource, create_sensor_source, get_latest_sensor_doc,
+    set_active_source,
+)
+
+THERMAL_DOC = {
+    "fire_detected": True,
+    "max_temp": 78.4,
+    "timestamp": "2025-01-12T08:30:00Z",
+    "image_url": "https://storage.googleapis.com/bucket/thermal/frame_0001.jpg",
+}
+
+
+@pytest.fixture
+def bus():
+    return EventBus()
+
+
+@pytest.fixture
+def source(bus):
+    source = create_sensor_source("fake", bus=bus)
+    source.start()
+    yield source
+    source.stop()
+    set_active_source(None)
+    latest_docs.invalidate()
+
+
+def collect(bus, topic):
+    received = []
+    bus.subscribe(topic, lambda _topic, payload: received.append(payload))
+    return received
+
+
+def test_base_source_is_abstract():
+    with pytest.raises(TypeError):
+        _BaseSource()
+
+
+def test_create_fake_source(source):
+    assert isinstance(source, FakeListenerSource)
+    assert source.mode == "fake"
+    assert source.active
+
+
+def test_push_publishes_to_event_bus(bus, source):
+    received = collect(bus, "sensors_thermal")
+
+    assert source.push("sensors_thermal", "doc-1", THERMAL_DOC)
+
+    assert received == [{"id": "doc-1", "data": THERMAL_DOC}]
+    assert bus.last("sensors_thermal") == {"id": "doc-1", "data": THERMAL_DOC}
+    # Cache TTL ikut diisi → endpoint HTTP tidak perlu query Firestore
+    assert latest_docs.get_latest("sensors_thermal") == ("doc-1", THERMAL_DOC)
+
+
+def test_unchanged_snapshot_is_not_republished(bus, source):
+    received = collect(bus, "sensors_thermal")
+
+    source.push("sensors_thermal", "doc-1", THERMAL_DOC)
+    assert not source.push("sensors_thermal", "doc-1", dict(THERMAL_DOC))
+    assert source.push("sensors_thermal", "doc-1", dict(THERMAL_DOC, max_temp=81.0))
+    assert not source.push("sensors_thermal", "doc-2", None)
+
+    assert [event["data"]["max_temp"] for event in received] == [78.4, 81.0]
+
+
+def test_topics_are_separate_per_collection(bus, source):
+    thermal = collect(bus, "sensors_thermal")
+    env = collect(bus, "sensors_env")
+
+    source.push("sensors_env", "env-1", {"humidity": 41, "temperature": 33.5})
+
+    assert thermal == []
+    assert env[0]["id"] == "env-1"
+
+
+def test_latest_sensor_doc_reads_active_source():
+    source = create_sensor_source("fake")     # event bus bersama
+    source.start()
+    set_active_source(source)
+    try:
+        source.push("sensors_env", "env-7", {"humidity": 50})
+        assert get_latest_sensor_doc("sensors_env") == ("env-7", {"humidity": 50})
+    finally:
+        source.stop()
+        set_active_source(None)
+        latest_docs.invalidate()
+
+
+def test_unknown_mode_rejected():
+    with pytest.raises(ValueError):
+        create_sensor_source("carrier-pigeon")
@@ -0,0 +1,52 @@
+# backend/tests/test_spatial_index.py
+import numpy as np
+
+from backend.utils.spatial_index import SpatialIndex, haversine_m
+
+
+def brute_force_clusters(points, radius_m):
+    ids = list(points)
+    parent = {k: k for k in ids}
+
+    def find(x):
+        while parent[x] != x:
+            x = parent[x]
+        return x
+
+    for a in ids:
+        for b in ids:
+            if haversine_m(*points[a], *points[b]) <= radius_m:
+                parent[find(b)] = find(a)
+    groups = {}
+    for k in ids:
+        groups.setdefault(find(k), set()).add(k)
+    return sorted(groups.values(), key=sorted)
+
+
+def test_clusters_match_brute_force():
+    rng = np.random.default_rng(7)
+    points = {
+        f"r{k}": (float(lat), float(lon))
+        for k, (lat, lon) in enumerate(zip(
+            -6.9 + rng.normal(0, 0.01, 300), 107.6 + rng.normal(0, 0.01, 300)
+        ))
+    }
+    index = SpatialIndex(cell_m=250.0)
+    index.rebuild((k, lat, lon) for k, (lat, lon) in points.items())
+
+    result = index.clusters(300.0)
+
+    assert sorted(map(set, result), key=sorted) == brute_force_clusters(points, 300.0)
+    assert [len(c) for c in result] == sorted((len(c) for c in result), reverse=True)
+
+
+def test_clusters_chain_and_isolated():
+    index = SpatialIndex()
+    # Rantai a-b-c berjarak ±80 m, d jauh
+    index.upsert("a", -6.9000, 107.6000)
+    index.upsert("b", -6.9007, 107.6000)
+    index.upsert("c", -6.9014, 107.6000)
+    index.upsert("d", -6.8000, 107.6000)
+
+    assert index.clusters(100.0) == [["a", "b", "c"], ["d"]]
+    assert SpatialIndex().clusters(100.0) == []
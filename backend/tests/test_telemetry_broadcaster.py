@@ -0,0 +1,64 @@
+# backend/tests/test_telemetry_broadcaster.py
+from types import SimpleNamespace
+
+from flask import Flask
+from flask_socketio import SocketIO
+
+from backend.utils.telemetry_broadcaster import TelemetryBroadcaster
+
+
+class FakePixhawk:
+    vehicle = object()
+
+    def __init__(self):
+        self.snapshot = None
+
+    def is_ingesting(self):
+        return True
+
+    def get_snapshot(self):
+        return self.snapshot
+
+    def publish(self, version, **fields):
+        data = dict({"source": "pixhawk", "altitude": 10.0, "battery": 90}, **fields)
+        self.snapshot = SimpleNamespace(version=version, data=data)
+
+
+def make_broadcaster():
+    app = Flask(__name__)
+    socketio = SocketIO(app, async_mode="threading")
+    pixhawk = FakePixhawk()
+    broadcaster = TelemetryBroadcaster(socketio, pixhawk, delta=True, keyframe_interval=60)
+    broadcaster.register_handlers()
+    return app, socketio, pixhawk, broadcaster
+
+
+def received(client):
+    return [(m["name"], m["args"][0]) for m in client.get_received()]
+
+
+def test_new_client_gets_full_frame_before_deltas():
+    app, socketio, pixhawk, broadcaster = make_broadcaster()
+    pixhawk.publish(1)
+    broadcaster.tick()
+    pixhawk.publish(2, altitude=12.0)
+    broadcaster.tick()
+
+    client = socketio.test_client(app)
+    pixhawk.publish(3, altitude=12.0, battery=89)
+    broadcaster.tick()
+
+    assert received(client) == [
+        ("telemetry", {"source": "pixhawk", "altitude": 12.0, "battery": 90}),
+        ("telemetry_delta", {"version": 3, "changes": {"battery": 89}}),
+    ]
+    assert broadcaster.get_stats()["initial_frames_sent"] == 1
+
+
+def test_no_initial_frame_before_first_broadcast():
+    app, socketio, _, broadcaster = make_broadcaster()
+
+    client = socketio.test_client(app)
+
+    assert received(client) == []
+    assert broadcaster.get_stats()["initial_frames_sent"] == 0
@@ -0,0 +1,142 @@
+# backend/tests/test_thermal_analysis.py
+import cv2
+import numpy as np
+import pytest
+
+from backend.utils.thermal_analysis import ThermalAnalyzer, storage_path_from_url
+
+BUCKET = "drone-monitoring-system-fef66.firebasestorage.app"
+
+# Bentuk dokumen sensors_thermal seperti yang ditulis perangkat
+THERMAL_DOC = {
+    "timestamp": "2025-01-12T08:30:00Z",
+    "fire_detected": False,
+    "max_temp": 41.2,
+    "sensor_type": "thermal",
+    "image_url": (
+        f"https://firebasestorage.googleapis.com/v0/b/{BUCKET}/o/"
+        "thermal_images%2Fframe_0001.png?alt=media&token=abc"
+    ),
+    "fire_bbox": None,
+}
+
+
+class FakeBlob:
+    def __init__(self, name, data):
+        self.name = name
+        self._data = data
+        self.generation = None
+        self.md5_hash = None
+
+    def download_as_bytes(self):
+        return self._data
+
+
+class FakeBucket:
+    name = BUCKET
+
+    def __init__(self, blobs):
+        self.blobs = blobs
+
+    def get_blob(self, path):
+        data = self.blobs.get(path)
+        return FakeBlob(path, data) if data is not None else None
+
+
+def celsius_to_png16(temps):
+    raw = np.round((temps + 273.15) * 100).astype(np.uint16)
+    ok, buf = cv2.imencode(".png", raw)
+    assert ok
+    return buf.tobytes()
+
+
+def make_analyzer(image_bytes):
+    bucket = FakeBucket({"thermal_images/frame_0001.png": image_bytes})
+    return ThermalAnalyzer(threshold=60.0, min_area=4, max_side=320, bucket_factory=lambda: bucket)
+
+
+@pytest.fixture
+def hot_frame():
+    temps = np.full((768, 1024), 30.0, dtype=np.float32)
+    temps[400:403, 700:703] = 90.0        # hotspot kecil 3x3 di frame besar
+    return temps
+
+
+def test_storage_path_from_url():
+    path = "thermal_images/frame_0001.png"
+    assert storage_path_from_url(THERMAL_DOC["image_url"], BUCKET) == path
+    assert storage_path_from_url(f"gs://{BUCKET}/{path}", BUCKET) == path
+    assert storage_path_from_url(
+        f"https://storage.googleapis.com/{BUCKET}/{path}?X-Goog-Signature=x", BUCKET
+    ) == path
+    assert storage_path_from_url(f"https://storage.googleapis.com/other/{path}", BUCKET) is None
+    assert storage_path_from_url("https://example.com/frame.png", BUCKET) is None
+    assert storage_path_from_url(None, BUCKET) is None
+
+
+def test_enrich_resolves_image_url(hot_frame):
+    analyzer = make_analyzer(celsius_to_png16(hot_frame))
+
+    enriched = analyzer.enrich(THERMAL_DOC)
+
+    assert enriched["fire_detected"] is True
+    assert enriched["max_temp"] == pytest.approx(90.0, abs=0.01)
+    assert enriched["fire_bbox"] == [700, 400, 3, 3]
+    assert enriched["frame_shape"] == [768, 1024]
+    assert enriched["hotspots"][0]["area"] == 9
+    assert THERMAL_DOC["fire_detected"] is False
+
+
+def test_small_hotspot_survives_large_frame(hot_frame):
+    analysis = make_analyzer(b"").analyze(hot_frame)
+
+    assert analysis["hotspot_count"] == 1
+    spot = analysis["hotspots"][0]
+    assert spot["max_temp"] == pytest.approx(90.0, abs=0.01)
+    assert spot["mean_temp"] == pytest.approx(90.0, abs=0.01)
+    assert spot["centroid"] == [701.0, 401.0]
+
+
+def test_8bit_image_is_not_radiometric():
+    gray = np.full((120, 160), 250, dtype=np.uint8)
+    ok, buf = cv2.imencode(".png", gray)
+    analyzer = make_analyzer(buf.tobytes())
+
+    enriched = analyzer.enrich(THERMAL_DOC)
+
+    assert enriched is THERMAL_DOC
+    assert enriched["fire_detected"] is False
+    assert analyzer.get_stats()["images_skipped"] == 1
+
+
+def test_image_url_outside_bucket_is_ignored(hot_frame):
+    analyzer = make_analyzer(celsius_to_png16(hot_frame))
+    doc = dict(THERMAL_DOC, image_url="https://example.com/thermal_images/frame_0001.png")
+
+    assert analyzer.enrich(doc) is doc
+
+
+def test_noise_pixels_do_not_raise_max_temp():
+    temps = np.full((120, 160), 30.0, dtype=np.float32)
+    temps[10, 10] = 150.0                 # satu piksel panas < min_area
+    analyzer = make_analyzer(celsius_to_png16(temps))
+
+    enriched = analyzer.enrich(dict(THERMAL_DOC, max_temp=None))
+
+    assert enriched["fire_detected"] is False
+    assert enriched["max_temp"] == pytest.approx(30.0, abs=0.01)
+    assert analyzer.enrich(THERMAL_DOC)["max_temp"] == THERMAL_DOC["max_temp"]
+
+
+def test_image_url_lookup_is_cached(hot_frame):
+    analyzer = make_analyzer(celsius_to_png16(hot_frame))
+    lookups = []
+    bucket = analyzer._get_bucket()
+    get_blob = bucket.get_blob
+    bucket.get_blob = lambda path: lookups.append(path) or get_blob(path)
+
+    analyzer.enrich(THERMAL_DOC)
+    analyzer.enrich(THERMAL_DOC)
+
+    assert len(lookups) == 1
+    assert analyzer.get_stats()["url_hits"] == 1
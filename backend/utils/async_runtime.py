@@ -0,0 +1,126 @@
+# backend/utils/async_runtime.py
+import os
+import threading
+
+# =====================================================
+# Async runtime (threading / eventlet / gevent)
+# =====================================================
+# SOCKETIO_ASYNC_MODE menentukan runtime Flask-SocketIO:
+#   - threading : default untuk development (python -m backend.app),
+#                 satu OS thread per koneksi/stream
+#   - gevent    : produksi (python -m backend.server), greenlet per koneksi;
+#                 ratusan client MJPEG/websocket dalam satu proses
+#   - eventlet  : alternatif gevent
+# Monkey patching dilakukan entrypoint backend/server.py sebelum modul lain
+# di-import.
+#
+# Pemanggilan Firebase/GCS yang memblokir (gRPC Firestore, decode JSON besar,
+# encode JPEG) dijalankan lewat blocking_io: pool OS thread asli berukuran
+# tetap, sehingga hub greenlet tidak pernah tertahan dan beban ke Firebase
+# dibatasi FIREBASE_EXECUTOR_WORKERS panggilan bersamaan.
+
+ASYNC_MODES = ("threading", "eventlet", "gevent")
+
+ASYNC_MODE = os.getenv("SOCKETIO_ASYNC_MODE", "threading")
+if ASYNC_MODE not in ASYNC_MODES:
+    raise ValueError(f"SOCKETIO_ASYNC_MODE tidak dikenal: {ASYNC_MODE}")
+
+
+def is_patched(mode=ASYNC_MODE):
+    """True jika modul socket sudah di-monkey patch oleh eventlet/gevent."""
+    try:
+        if mode == "eventlet":
+            import eventlet.patcher
+            return eventlet.patcher.is_monkey_patched("socket")
+        if mode == "gevent":
+            import gevent.monkey
+            return gevent.monkey.is_module_patched("socket")
+    except ImportError:
+        return False
+    return mode == "threading"
+
+
+class BlockingExecutor:
+    def __init__(self, max_workers=16, mode=ASYNC_MODE):
+        """
+        max_workers : jumlah maksimum panggilan blocking bersamaan
+        mode        : runtime aktif (menentukan jenis pool)
+        """
+        self.max_workers = max_workers
+        self.mode = mode
+
+        self._pool = None
+        self._pool_lock = threading.Lock()
+        self._local = threading.local()
+        self._stats_lock = threading.Lock()
+
+        # Statistik
+        self.calls = 0
+        self.errors = 0
+        self.in_flight = 0
+        self.peak_in_flight = 0
+
+    def _get_pool(self):
+        with self._pool_lock:
+            if self._pool is None:
+                if self.mode == "eventlet":
+                    from eventlet import tpool
+                    tpool.set_num_threads(self.max_workers)
+                    self._pool = tpool
+                elif self.mode == "gevent":
+                    from gevent.threadpool import ThreadPool
+                    self._pool = ThreadPool(self.max_workers)
+                else:
+                    # Pemanggil sudah berada di OS thread sendiri → cukup dibatasi
+                    self._pool = threading.BoundedSemaphore(self.max_workers)
+            return self._pool
+
+    def run(self, fn, *args, **kwargs):
+        """Jalankan fn di pool blocking dan tunggu hasilnya (greenlet lain tetap jalan)."""
+        # Panggilan bersarang dari dalam worker langsung dieksekusi (hindari deadlock)
+        if getattr(self._local, "inside", False):
+            return fn(*args, **kwargs)
+
+        def call():
+            self._local.inside = True
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                self._local.inside = False
+
+        pool = self._get_pool()
+        with self._stats_lock:
+            self.calls += 1
+            self.in_flight += 1
+            self.peak_in_flight = max(self.peak_in_flight, self.in_flight)
+        try:
+            if self.mode == "eventlet":
+                return pool.execute(call)
+            if self.mode == "gevent":
+                return pool.apply(call)
+            with pool:
+                return call()
+        except Exception:
+            with self._stats_lock:
+                self.errors += 1
+            raise
+        finally:
+            with self._stats_lock:
+                self.in_flight -= 1
+
+    def get_stats(self):
+        return {
+            "mode": self.mode,
+            "patched": is_patched(self.mode),
+            "max_workers": self.max_workers,
+            "calls": self.calls,
+            "errors": self.errors,
+            "in_flight": self.in_flight,
+            "peak_in_flight": self.peak_in_flight,
+        }
+
+
+FIREBASE_EXECUTOR_WORKERS = int(os.getenv("FIREBASE_EXECUTOR_WORKERS", "16"))
+
+# Instance bersama untuk semua pemanggilan Firebase/GCS yang memblokir
+blocking_io = BlockingExecutor(max_workers=FIREBASE_EXECUTOR_WORKERS)
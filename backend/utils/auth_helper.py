@@ -59,6 +59,20 @@ def check_password(password: str, hashed_password: str) -> bool:
         traceback.print_exc()
         return False
 
+# =====================================================
+# Validasi token di luar request HTTP (mis. event Socket.IO)
+# =====================================================
+def decode_token(token):
+    """user_id dari token JWT, atau None jika token kosong/tidak valid/kadaluarsa."""
+    if not token:
+        return None
+    if token.lower().startswith("bearer "):
+        token = token[7:]
+    try:
+        return jwt.decode(token, SECRET_KEY, algorithms=["HS256"])["sub"]
+    except (jwt.InvalidTokenError, KeyError):
+        return None
+
 # =====================================================
 # Decorator validasi JWT token
 # =====================================================
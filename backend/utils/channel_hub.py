@@ -0,0 +1,175 @@
+# backend/utils/channel_hub.py
+import threading
+import time
+
+from flask import request
+from flask_socketio import join_room, leave_room
+
+from backend.utils.auth_helper import decode_token
+from backend.utils.event_bus import event_bus
+
+# =====================================================
+# Channel Hub (Event Bus → Socket.IO rooms)
+# =====================================================
+# Setiap channel (mis. sensors_env, fire_report) adalah satu room Socket.IO.
+# Perubahan dari event bus di-emit SEKALI ke room tersebut, berapa pun jumlah
+# dashboard yang terbuka. Saat client subscribe, nilai terakhir (snapshot)
+# dikirim hanya ke client itu lewat event '<channel>_snapshot', diambil dari
+# cache server (bukan query database per client).
+#
+# Protokol client:
+#   emit("subscribe",   {"channels": ["sensors_env", "fire_report"], "token": "<jwt>"})
+#   emit("unsubscribe", {"channels": [...]})
+#   on("<channel>_snapshot", ...)  → snapshot awal
+#   on("<channel>", ...)           → perubahan berikutnya
+#   on("subscribe_error", {"channel", "error"})
+#
+# Snapshot dibaca SEBELUM join room: update yang lewat setelah itu pasti sampai
+# ke client sesudah snapshot. Jika topic sumber publish di antara baca & join,
+# snapshot dibaca ulang agar update di celah itu tidak hilang.
+
+
+class _Channel:
+    def __init__(self, name, topic, transform, snapshot, auth_required):
+        self.name = name
+        self.topic = topic
+        self.transform = transform
+        self.snapshot = snapshot
+        self.auth_required = auth_required
+        self.emitted = 0
+        self.snapshots_sent = 0
+
+
+class ChannelHub:
+    def __init__(self, socketio, bus=event_bus, clustered=False):
+        """
+        clustered : room tersebar di banyak worker (message bus). Hanya worker
+                    yang mengaktifkan publish_updates (leader ingest) yang meng-emit
+                    perubahan; worker lain cukup melayani subscribe & snapshot.
+        """
+        self.socketio = socketio
+        self.bus = bus
+        self.clustered = clustered
+        self.publish_updates = not clustered
+        self._channels = {}
+        self._lock = threading.Lock()
+        self._members = {}          # sid → {channel}
+        self._handlers_registered = False
+
+    def add_channel(self, name, topic=None, transform=None, snapshot=None, auth_required=False):
+        """
+        name          : nama room & event Socket.IO
+        topic         : topic event bus sumber (default = name)
+        transform     : payload bus → pesan client (None = lewati event ini)
+        snapshot      : fungsi tanpa argumen → nilai terakhir untuk subscriber baru
+        auth_required : subscribe wajib menyertakan token JWT valid
+        """
+        channel = _Channel(name, topic or name, transform, snapshot, auth_required)
+        self._channels[name] = channel
+        self.bus.subscribe(channel.topic, lambda _topic, payload: self._publish(channel, payload))
+        return channel
+
+    # ==============================================================
+    # Publish
+    # ==============================================================
+
+    def _publish(self, channel, payload):
+        if not self.publish_updates:
+            return
+        message = channel.transform(payload) if channel.transform else payload
+        if message is None:
+            return
+        # Room kosong → tidak ada yang perlu dikirimi (anggota room worker lain tidak terlihat)
+        if not self.clustered and not self.subscriber_count(channel.name):
+            return
+        self.socketio.emit(channel.name, message, to=channel.name)
+        channel.emitted += 1
+
+    def subscriber_count(self, name):
+        with self._lock:
+            return sum(1 for channels in self._members.values() if name in channels)
+
+    # ==============================================================
+    # Handler Socket.IO
+    # ==============================================================
+
+    def _requested_channels(self, data):
+        names = (data or {}).get("channels") if isinstance(data, dict) else data
+        if isinstance(names, str):
+            names = [names]
+        return [n for n in (names or []) if isinstance(n, str)]
+
+    def on_subscribe(self, data=None):
+        sid = request.sid
+        token = data.get("token") if isinstance(data, dict) else None
+        user_id = None
+
+        for name in self._requested_channels(data):
+            channel = self._channels.get(name)
+            if channel is None:
+                self.socketio.emit("subscribe_error", {"channel": name, "error": "Channel tidak dikenal"}, to=sid)
+                continue
+            if channel.auth_required:
+                user_id = user_id or decode_token(token)
+                if user_id is None:
+                    self.socketio.emit("subscribe_error", {"channel": name, "error": "Token tidak valid"}, to=sid)
+                    continue
+
+            read_at = time.time()
+            snapshot = self._read_snapshot(channel)
+
+            join_room(name)
+            with self._lock:
+                self._members.setdefault(sid, set()).add(name)
+
+            published_at = self.bus.last_published_at(channel.topic)
+            if published_at is not None and published_at >= read_at:
+                snapshot = self._read_snapshot(channel)
+            if snapshot is not None:
+                self.socketio.emit(f"{name}_snapshot", snapshot, to=sid)
+                channel.snapshots_sent += 1
+
+    def _read_snapshot(self, channel):
+        if channel.snapshot is None:
+            return None
+        try:
+            return channel.snapshot()
+        except Exception as e:
+            print(f"⚠️ Gagal mengambil snapshot channel {channel.name}: {e}")
+            return None
+
+    def on_unsubscribe(self, data=None):
+        sid = request.sid
+        for name in self._requested_channels(data):
+            leave_room(name)
+            with self._lock:
+                self._members.get(sid, set()).discard(name)
+
+    def on_disconnect(self, *args):
+        # Flask-SocketIO membersihkan room sendiri; cukup lupakan keanggotaan
+        with self._lock:
+            self._members.pop(request.sid, None)
+
+    def register_handlers(self):
+        if self._handlers_registered:
+            return
+        self.socketio.on_event("subscribe", self.on_subscribe)
+        self.socketio.on_event("unsubscribe", self.on_unsubscribe)
+        self.socketio.on_event("disconnect", self.on_disconnect)
+        self._handlers_registered = True
+
+    def get_stats(self):
+        with self._lock:
+            clients = len(self._members)
+        return {
+            "clients": clients,
+            "publish_updates": self.publish_updates,
+            "channels": {
+                name: {
+                    "subscribers": self.subscriber_count(name),
+                    "emitted": channel.emitted,
+                    "snapshots_sent": channel.snapshots_sent,
+                }
+                for name, channel in self._channels.items()
+            },
+        }
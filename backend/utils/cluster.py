@@ -0,0 +1,391 @@
+# backend/utils/cluster.py
+import json
+import os
+import socket
+import tempfile
+import threading
+import time
+import uuid
+from functools import wraps
+
+from flask import jsonify
+from socketio import PubSubManager
+
+from backend.utils.event_bus import event_bus
+
+# =====================================================
+# Scale-out: worker ingest terpilih + banyak worker web
+# =====================================================
+# WORKER_ROLE:
+#   - all    : default, satu proses menjalankan semuanya (tanpa message bus)
+#   - ingest : kandidat leader. Tepat satu yang terpilih (leader election)
+#              memegang link MAVLink & background job (autosave, sensor
+#              ingest, fire pipeline); kandidat lain standby sambil melayani
+#              HTTP/Socket.IO dan mengambil alih jika leader mati.
+#   - web    : hanya HTTP & Socket.IO fan-out, tidak pernah menjadi leader
+#
+# CLUSTER_BUS_URL menentukan message bus bersama:
+#   - redis://host:6379/0      : Redis pub/sub (antar host), election via lease Redis
+#   - local:///tmp/firequad-bus: stand-in satu host tanpa broker; Unix datagram
+#                                socket per worker, election via file lock
+#
+# Dua hal yang lewat bus:
+#   1. Emit Socket.IO (client manager pub/sub) → emit dari worker mana pun
+#      sampai ke client yang terhubung ke worker lain.
+#   2. Event bus (EventBridge) → topic dari leader (sensors_env, fire_report,
+#      telemetry, ...) dicerminkan ke event bus lokal setiap worker, sehingga
+#      snapshot & cache (reports_cache, channel hub) tetap hangat tanpa query.
+
+WORKER_ROLES = ("all", "ingest", "web")
+DEFAULT_LOCAL_BUS = "local://" + os.path.join(tempfile.gettempdir(), "firequad-bus")
+
+MAX_DATAGRAM = 256 * 1024
+
+
+# =====================================================
+# Transport bus
+# =====================================================
+class LocalBus:
+    """
+    Pub/sub satu host tanpa broker: setiap subscriber mengikat Unix datagram
+    socket di <directory>/<channel>/, publish = sendto ke semua socket di sana.
+    """
+
+    def __init__(self, directory, channel, send_timeout=0.05):
+        self.directory = os.path.join(directory, channel)
+        os.makedirs(self.directory, exist_ok=True)
+        self.path = os.path.join(self.directory, f"{os.getpid()}-{uuid.uuid4().hex[:8]}.sock")
+        self.send_timeout = send_timeout
+
+        self._sock = None
+        self._send_sock = socket.socket(socket.AF_UNIX, socket.SOCK_DGRAM)
+        self._send_sock.settimeout(send_timeout)
+        self._send_lock = threading.Lock()
+
+        # Statistik
+        self.sent = 0
+        self.dropped = 0
+        self.received = 0
+
+    def publish(self, data):
+        if len(data) > MAX_DATAGRAM:
+            self.dropped += 1
+            print(f"⚠️ Pesan bus terlalu besar ({len(data)} byte), dibuang")
+            return
+        with self._send_lock:
+            for name in os.listdir(self.directory):
+                peer = os.path.join(self.directory, name)
+                if peer == self.path or not name.endswith(".sock"):
+                    continue
+                try:
+                    self._send_sock.sendto(data, peer)
+                    self.sent += 1
+                except (ConnectionRefusedError, FileNotFoundError):
+                    # Worker sudah mati → socket file basi
+                    try:
+                        os.unlink(peer)
+                    except OSError:
+                        pass
+                except OSError:
+                    # Antrean subscriber penuh/lambat → jangan tahan publisher
+                    self.dropped += 1
+
+    def listen(self):
+        if self._sock is None:
+            self._sock = socket.socket(socket.AF_UNIX, socket.SOCK_DGRAM)
+            self._sock.bind(self.path)
+        while True:
+            data = self._sock.recv(MAX_DATAGRAM)
+            self.received += 1
+            yield data
+
+    def close(self):
+        for sock in (self._sock, self._send_sock):
+            if sock is not None:
+                sock.close()
+        try:
+            os.unlink(self.path)
+        except OSError:
+            pass
+
+    def get_stats(self):
+        return {"transport": "local", "sent": self.sent, "dropped": self.dropped,
+                "received": self.received}
+
+
+class RedisBus:
+    """Pub/sub lewat Redis (antar host)."""
+
+    def __init__(self, url, channel):
+        import redis
+        self.channel = channel
+        self._redis = redis.Redis.from_url(url)
+        self._pubsub = None
+        self.sent = 0
+        self.received = 0
+
+    def publish(self, data):
+        self._redis.publish(self.channel, data)
+        self.sent += 1
+
+    def listen(self):
+        if self._pubsub is None:
+            self._pubsub = self._redis.pubsub(ignore_subscribe_messages=True)
+            self._pubsub.subscribe(self.channel)
+        for message in self._pubsub.listen():
+            if message.get("type") == "message":
+                self.received += 1
+                yield message["data"]
+
+    def close(self):
+        if self._pubsub is not None:
+            self._pubsub.close()
+
+    def get_stats(self):
+        return {"transport": "redis", "sent": self.sent, "received": self.received}
+
+
+def create_bus(url, channel):
+    if url.startswith(("redis://", "rediss://")):
+        return RedisBus(url, channel)
+    if url.startswith("local://"):
+        return LocalBus(url[len("local://"):], channel)
+    raise ValueError(f"CLUSTER_BUS_URL tidak dikenal: {url}")
+
+
+# =====================================================
+# Socket.IO client manager di atas bus lokal
+# =====================================================
+class BusClientManager(PubSubManager):
+    """
+    Client manager pub/sub Socket.IO untuk transport local://
+    (Redis memakai message_queue bawaan Flask-SocketIO).
+    """
+    name = "firequad-bus"
+
+    def __init__(self, url, channel="socketio", write_only=False, logger=None):
+        super().__init__(channel=channel, write_only=write_only, logger=logger)
+        self.bus = create_bus(url, channel)
+
+    def _publish(self, data):
+        self.bus.publish(json.dumps(data, default=str).encode("utf-8"))
+
+    def _listen(self):
+        for raw in self.bus.listen():
+            try:
+                yield json.loads(raw)
+            except ValueError:
+                continue
+
+
+def socketio_queue_options(url):
+    """kwargs SocketIO(...) untuk memakai bus bersama."""
+    if url.startswith(("redis://", "rediss://")):
+        return {"message_queue": url}
+    return {"client_manager": BusClientManager(url)}
+
+
+# =====================================================
+# Leader election (file lock satu host / lease Redis)
+# =====================================================
+class LeaderElection:
+    def __init__(self, url, lock_path=None, key="firequad:ingest-leader",
+                 lease=10.0, retry_interval=2.0):
+        """
+        url            : CLUSTER_BUS_URL (redis:// → lease Redis, selain itu file lock)
+        lock_path      : file lock untuk mode satu host
+        lease          : detik; umur lease Redis (diperpanjang tiap lease/3)
+        retry_interval : detik antar percobaan standby menjadi leader
+        """
+        self.url = url
+        self.backend = "redis" if url.startswith(("redis://", "rediss://")) else "file"
+        self.lock_path = lock_path or os.path.join(tempfile.gettempdir(), "firequad-ingest.lock")
+        self.key = key
+        self.lease = lease
+        self.retry_interval = retry_interval
+        self.node_id = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:6]}"
+
+        self._lock_file = None
+        self._redis = None
+        self.is_leader = False
+        self.elected_at = None
+        self.attempts = 0
+
+    def _get_redis(self):
+        if self._redis is None:
+            import redis
+            self._redis = redis.Redis.from_url(self.url)
+        return self._redis
+
+    def try_acquire(self):
+        self.attempts += 1
+        if self.backend == "redis":
+            return bool(self._get_redis().set(
+                self.key, self.node_id, nx=True, px=int(self.lease * 1000)
+            ))
+
+        import fcntl
+        f = open(self.lock_path, "a+")
+        try:
+            fcntl.flock(f.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            f.close()
+            return False
+        # Lock dilepas otomatis oleh OS saat proses leader mati
+        f.seek(0)
+        f.truncate()
+        f.write(self.node_id)
+        f.flush()
+        self._lock_file = f
+        return True
+
+    _RENEW_SCRIPT = (
+        "if redis.call('get', KEYS[1]) == ARGV[1] then "
+        "return redis.call('pexpire', KEYS[1], ARGV[2]) else return 0 end"
+    )
+
+    def renew(self):
+        """Perpanjang lease Redis; False jika lease sudah dimiliki node lain."""
+        if self.backend != "redis":
+            return True
+        return bool(self._get_redis().eval(
+            self._RENEW_SCRIPT, 1, self.key, self.node_id, int(self.lease * 1000)
+        ))
+
+    def run(self, on_elected, on_lost, sleep=time.sleep):
+        """Loop kandidat: tunggu terpilih, lalu jaga lease (Redis) selama proses hidup."""
+        while True:
+            try:
+                if not self.is_leader:
+                    if self.try_acquire():
+                        self.is_leader = True
+                        self.elected_at = time.time()
+                        print(f"👑 Worker {self.node_id} terpilih sebagai leader ingest")
+                        on_elected()
+                        if self.backend == "file":
+                            return
+                elif not self.renew():
+                    self.is_leader = False
+                    print(f"⚠️ Lease leader ingest hilang ({self.node_id})")
+                    on_lost()
+                    return
+            except Exception as e:
+                print(f"⚠️ Error leader election: {e}")
+            sleep(self.lease / 3.0 if self.is_leader else self.retry_interval)
+
+    def get_stats(self):
+        return {
+            "backend": self.backend,
+            "node_id": self.node_id,
+            "is_leader": self.is_leader,
+            "elected_at": self.elected_at,
+            "attempts": self.attempts,
+        }
+
+
+# =====================================================
+# Event bridge (event bus leader → event bus semua worker)
+# =====================================================
+class EventBridge:
+    def __init__(self, url, topics, bus=event_bus, channel="firequad-events"):
+        """
+        url    : CLUSTER_BUS_URL
+        topics : topic event bus yang diteruskan leader ke worker lain
+        """
+        self.topics = tuple(topics)
+        self.local_bus = bus
+        self.transport = create_bus(url, channel)
+        self.origin = uuid.uuid4().hex
+        self._forwarding = False
+        self._mirroring = threading.local()
+
+        # Statistik
+        self.forwarded = 0
+        self.mirrored = 0
+
+    def start_forwarding(self):
+        """Dipanggil di leader: teruskan topic lokal ke bus bersama."""
+        if self._forwarding:
+            return
+        self._forwarding = True
+        for topic in self.topics:
+            self.local_bus.subscribe(topic, self._forward)
+
+    def _forward(self, topic, payload):
+        # Event yang baru saja dicerminkan dari bus tidak dikirim balik
+        if getattr(self._mirroring, "active", False):
+            return
+        message = json.dumps(
+            {"origin": self.origin, "topic": topic, "payload": payload}, default=str
+        ).encode("utf-8")
+        try:
+            self.transport.publish(message)
+            self.forwarded += 1
+        except Exception as e:
+            print(f"⚠️ Gagal meneruskan event {topic}: {e}")
+
+    def mirror(self):
+        """Loop background di setiap worker: publish ulang event leader ke event bus lokal."""
+        for raw in self.transport.listen():
+            try:
+                message = json.loads(raw)
+            except ValueError:
+                continue
+            if message.get("origin") == self.origin or message.get("topic") not in self.topics:
+                continue
+            self._mirroring.active = True
+            try:
+                self.local_bus.publish(message["topic"], message["payload"])
+                self.mirrored += 1
+            finally:
+                self._mirroring.active = False
+
+    def get_stats(self):
+        stats = {"forwarding": self._forwarding, "forwarded": self.forwarded,
+                 "mirrored": self.mirrored}
+        stats.update(self.transport.get_stats())
+        return stats
+
+
+WORKER_ROLE = os.getenv("WORKER_ROLE", "all")
+if WORKER_ROLE not in WORKER_ROLES:
+    raise ValueError(f"WORKER_ROLE tidak dikenal: {WORKER_ROLE}")
+
+CLUSTER_BUS_URL = os.getenv("CLUSTER_BUS_URL", DEFAULT_LOCAL_BUS)
+CLUSTERED = WORKER_ROLE != "all"
+
+# Topic yang dicerminkan dari leader ke semua worker
+BRIDGED_TOPICS = ("sensors_env", "sensors_thermal", "fire_report", "telemetry", "flight_closed")
+
+
+# =====================================================
+# Endpoint tulis milik proses ingest
+# =====================================================
+# Fire pipeline, flight summarizer & flight log menyimpan state dedup/segmentasi
+# di memori proses ingest; endpoint yang menulis lewat state itu hanya dilayani
+# di sana agar worker web tidak membuat incident/ringkasan ganda.
+_ingest_owner = threading.Event()
+
+
+def mark_ingest_owner():
+    """Dipanggil start_ingest_services di proses yang memegang ingest."""
+    _ingest_owner.set()
+
+
+def is_ingest_owner():
+    return _ingest_owner.is_set()
+
+
+def ingest_only(f):
+    """Decorator: 503 jika cluster aktif dan proses ini bukan pemilik ingest."""
+    @wraps(f)
+    def decorated(*args, **kwargs):
+        if CLUSTERED and not is_ingest_owner():
+            response = jsonify({
+                "error": "Endpoint ini hanya dilayani worker ingest (leader), coba lagi.",
+                "worker_role": WORKER_ROLE,
+            })
+            response.headers["Retry-After"] = "1"
+            return response, 503
+        return f(*args, **kwargs)
+    return decorated
@@ -0,0 +1,99 @@
+# backend/utils/downsample.py
+import numpy as np
+
+# =====================================================
+# Downsampling deret waktu (server-side)
+# =====================================================
+# Semua fungsi mengembalikan indeks sampel terpilih (urut naik), sehingga
+# pemanggil bisa mengambil record DroneData asli untuk indeks tersebut.
+
+
+def fill_gaps(values):
+    """Isi NaN dengan interpolasi linear antar sampel valid."""
+    y = np.asarray(values, dtype=float)
+    mask = np.isnan(y)
+    if not mask.any():
+        return y
+    if mask.all():
+        return np.zeros_like(y)
+
+    idx = np.arange(len(y))
+    y = y.copy()
+    y[mask] = np.interp(idx[mask], idx[~mask], y[~mask])
+    return y
+
+
+def lttb_indices(x, y, n_out):
+    """
+    Largest-Triangle-Three-Buckets: pilih n_out titik yang mempertahankan
+    bentuk visual kurva. x harus urut naik.
+    """
+    x = np.asarray(x, dtype=float)
+    y = fill_gaps(y)
+    n = len(x)
+
+    if n_out >= n:
+        return np.arange(n)
+    if n_out < 3:
+        return np.array([0, n - 1])
+
+    # Batas bucket untuk titik tengah (titik pertama & terakhir selalu dipakai)
+    edges = np.linspace(1, n - 1, n_out - 1).astype(int)
+    selected = np.empty(n_out, dtype=int)
+    selected[0] = 0
+    selected[-1] = n - 1
+
+    a = 0
+    for i in range(n_out - 2):
+        start, end = edges[i], edges[i + 1]
+
+        # Rata-rata bucket berikutnya sebagai titik ketiga segitiga
+        next_start = edges[i + 1]
+        next_end = edges[i + 2] if i + 2 < len(edges) else n
+        avg_x = x[next_start:next_end].mean()
+        avg_y = y[next_start:next_end].mean()
+
+        bx = x[start:end]
+        by = y[start:end]
+        area = np.abs(
+            (x[a] - avg_x) * (by - y[a]) - (x[a] - bx) * (avg_y - y[a])
+        )
+        a = start + int(np.argmax(area))
+        selected[i + 1] = a
+
+    return selected
+
+
+def minmax_indices(y, n_out):
+    """
+    Min/max bucketing: setiap bucket menyumbang sampel minimum & maksimum,
+    sehingga puncak (mis. ketinggian maksimum) tidak hilang.
+    """
+    y = fill_gaps(y)
+    n = len(y)
+    if n_out >= n:
+        return np.arange(n)
+
+    n_buckets = max((n_out - 2) // 2, 1)
+    edges = np.linspace(0, n, n_buckets + 1).astype(int)
+
+    # Argmin/argmax per bucket tanpa loop Python: urutkan (bucket, nilai)
+    bucket_id = np.repeat(np.arange(n_buckets), np.diff(edges))
+    order = np.lexsort((y, bucket_id))
+    counts = np.diff(edges)
+    first = np.concatenate(([0], np.cumsum(counts)[:-1]))
+    last = first + counts - 1
+
+    nonempty = counts > 0
+    mins = order[first[nonempty]]
+    maxs = order[last[nonempty]]
+
+    return np.unique(np.concatenate((mins, maxs, [0, n - 1])))
+
+
+def downsample_indices(x, y, max_points, method="lttb"):
+    if method == "minmax":
+        return minmax_indices(y, max_points)
+    if method == "lttb":
+        return lttb_indices(x, y, max_points)
+    raise ValueError(f"Metode downsampling tidak dikenal: {method}")
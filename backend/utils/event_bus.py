@@ -0,0 +1,66 @@
+# backend/utils/event_bus.py
+import threading
+import time
+
+# =====================================================
+# In-memory Event Bus (pub/sub per topic)
+# =====================================================
+# Publisher (listener Firestore, poller, dsb.) memanggil publish(); subscriber
+# dipanggil secara sinkron di thread publisher. Nilai terakhir per topic
+# disimpan sehingga pembaca HTTP bisa mengambilnya tanpa query ke database.
+
+
+class EventBus:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._subscribers = {}      # topic → [callback]
+        self._last = {}             # topic → (published_at, payload)
+        self.published = 0
+
+    def subscribe(self, topic, callback):
+        """Daftarkan callback(topic, payload). Return fungsi untuk unsubscribe."""
+        with self._lock:
+            self._subscribers.setdefault(topic, []).append(callback)
+
+        def unsubscribe():
+            with self._lock:
+                callbacks = self._subscribers.get(topic, [])
+                if callback in callbacks:
+                    callbacks.remove(callback)
+
+        return unsubscribe
+
+    def publish(self, topic, payload):
+        with self._lock:
+            self._last[topic] = (time.time(), payload)
+            callbacks = list(self._subscribers.get(topic, []))
+            self.published += 1
+
+        for callback in callbacks:
+            try:
+                callback(topic, payload)
+            except Exception as e:
+                print(f"⚠️ Error subscriber event bus [{topic}]: {e}")
+
+    def last(self, topic):
+        """Payload terakhir untuk topic, atau None."""
+        entry = self._last.get(topic)
+        return entry[1] if entry else None
+
+    def last_published_at(self, topic):
+        entry = self._last.get(topic)
+        return entry[0] if entry else None
+
+    def get_stats(self):
+        with self._lock:
+            return {
+                "published": self.published,
+                "topics": {
+                    topic: len(callbacks)
+                    for topic, callbacks in self._subscribers.items()
+                },
+            }
+
+
+# Instance bersama untuk seluruh proses
+event_bus = EventBus()
@@ -0,0 +1,442 @@
+# backend/utils/fire_pipeline.py
+import re
+import threading
+import time
+from collections import OrderedDict, deque
+from datetime import datetime, timezone
+
+from firebase_admin import db
+
+from backend.utils.event_bus import event_bus
+from backend.utils.georef import georeferencer, parse_frame_shape
+from backend.utils.spatial_index import get_lat_lon, haversine_m
+from backend.utils.thermal_analysis import thermal_analyzer
+
+# =====================================================
+# Fire Incident Pipeline (idempotent /fire_reports)
+# =====================================================
+# Deteksi dari dokumen sensors_thermal di-key dengan ID dokumen sumber
+# (atau timestamp-nya). Deteksi beruntun dalam MERGE_WINDOW digabung menjadi
+# satu incident; incident ditulis dengan key deterministik via set/update,
+# sehingga pemrosesan ulang dokumen yang sama tidak menambah entri baru.
+# Jika deteksi berlokasi, incident hanya digabung bila berjarak <= CLUSTER_RADIUS;
+# deteksi ulang di lokasi incident lain (dalam CLUSTER_WINDOW) digabung ke sana.
+# Incident tanpa deteksi baru selama MERGE_WINDOW ditutup (status "closed") oleh
+# expire(); deteksi ulang di lokasinya (dalam CLUSTER_WINDOW) membukanya kembali.
+#
+# Keputusan merge/create dibuat di bawah lock (murni memori); penulisan ke RTDB
+# diantrekan lalu dijalankan berurutan di luar lock.
+#
+# Restart-safe: key deteksi terakhir dari laporan tersimpan dimasukkan kembali ke
+# daftar "sudah dilihat", dan incident baru tidak pernah menimpa ID yang sudah ada
+# (snapshot pertama listener setelah restart mengirim ulang dokumen terakhir).
+
+HIGH_TEMP_THRESHOLD = 60
+HIGH_AREA_FRACTION = 0.05       # porsi frame di atas ambang hotspot
+SEVERITY_RANK = {"medium": 1, "high": 2}
+_INVALID_KEY_CHARS = re.compile(r"[.$#\[\]/:\s]")
+
+
+def to_rtdb_key(value):
+    """Key RTDB tidak boleh mengandung . $ # [ ] /"""
+    return _INVALID_KEY_CHARS.sub("_", str(value))
+
+
+def parse_timestamp(value):
+    """Timestamp Firestore/ISO/epoch → datetime UTC (None jika tidak valid)."""
+    if value is None:
+        return None
+    if isinstance(value, datetime):
+        return value if value.tzinfo else value.replace(tzinfo=timezone.utc)
+    if isinstance(value, (int, float)):
+        return datetime.fromtimestamp(value / 1000.0 if value > 1e11 else value, tz=timezone.utc)
+    try:
+        dt = datetime.fromisoformat(str(value).replace("Z", "+00:00"))
+    except ValueError:
+        return None
+    return dt if dt.tzinfo else dt.replace(tzinfo=timezone.utc)
+
+
+def detection_time(thermal):
+    """(timestamp laporan, datetime deteksi) dari dokumen thermal."""
+    timestamp = thermal.get("timestamp") or datetime.utcnow().isoformat()
+    detected_at = parse_timestamp(timestamp) or datetime.now(timezone.utc)
+    return (timestamp if isinstance(timestamp, str) else detected_at.isoformat()), detected_at
+
+
+def classify_severity(max_temp, hot_fraction=None):
+    if (max_temp or 0) > HIGH_TEMP_THRESHOLD or (hot_fraction or 0) >= HIGH_AREA_FRACTION:
+        return "high"
+    return "medium"
+
+
+class FireIncidentPipeline:
+    def __init__(self, path="/fire_reports", merge_window=120.0, seen_limit=2000,
+                 bus=event_bus, analyzer=thermal_analyzer, georef=georeferencer,
+                 cluster_radius=50.0, cluster_window=3600.0, cluster_lookup=None,
+                 recent_lookup=None, report_lookup=None, recover_limit=50):
+        """
+        path         : node RealtimeDB laporan kebakaran
+        merge_window : detik; deteksi dengan jeda <= nilai ini masuk incident yang sama
+        seen_limit   : jumlah key deteksi yang diingat untuk deduplikasi
+        analyzer     : ThermalAnalyzer untuk dokumen dengan frame/gambar thermal (opsional)
+        georef       : Georeferencer; lokasi api dari posisi & attitude drone saat frame
+        cluster_radius : meter; deteksi sejauh ini dari incident dianggap api yang sama
+        cluster_window : detik; incident lama yang masih bisa menerima deteksi di lokasinya
+        cluster_lookup : fungsi(lat, lon, radius_m, limit=, since=) → [(id, report, jarak)]
+        recent_lookup  : fungsi(limit) → [(id, report)] terbaru lebih dulu; sumber
+                         incident aktif saat restart (default: unduh /fire_reports)
+        report_lookup  : fungsi(incident_id) → laporan tersimpan atau None
+                         (default: baca /fire_reports/<id>)
+        recover_limit  : jumlah laporan terbaru yang diperiksa saat recovery
+        """
+        self.path = path
+        self.merge_window = merge_window
+        self.seen_limit = seen_limit
+        self.bus = bus
+        self.analyzer = analyzer
+        self.georef = georef
+        self.cluster_radius = cluster_radius
+        self.cluster_window = cluster_window
+        self.cluster_lookup = cluster_lookup
+        self.recent_lookup = recent_lookup
+        self.report_lookup = report_lookup
+        self.recover_limit = recover_limit
+
+        self._lock = threading.Lock()
+        self._seen = OrderedDict()      # detection_key → incident_id
+        self._open = None               # incident terakhir yang disentuh (dict)
+        self._active = {}               # incident_id → incident berstatus active
+        self._recovered = False
+        self._recover_lock = threading.Lock()
+
+        # Antrean penulisan RTDB (urutan = urutan keputusan di bawah _lock)
+        self._pending = deque()
+        self._write_lock = threading.Lock()
+
+        # Statistik
+        self.created = 0
+        self.merged = 0
+        self.clustered = 0
+        self.duplicates = 0
+        self.closed = 0
+        self.write_errors = 0
+
+    # ==============================================================
+
+    def _load_recent_incidents(self):
+        """Incident tersimpan (active/closed), last_seen terbaru lebih dulu."""
+        if self.recent_lookup:
+            items = self.recent_lookup(self.recover_limit)
+        else:
+            items = (db.reference(self.path).get() or {}).items()
+
+        incidents = [
+            (incident_id, dict(report)) for incident_id, report in items
+            if isinstance(report, dict) and report.get("incident_id") == incident_id
+        ]
+        epoch = datetime.min.replace(tzinfo=timezone.utc)
+        incidents.sort(key=lambda item: parse_timestamp(item[1].get("last_seen")) or epoch, reverse=True)
+        return incidents
+
+    def _existing_report(self, incident_id):
+        """Laporan tersimpan dengan ID ini (dipanggil di luar _lock), atau None."""
+        try:
+            if self.report_lookup:
+                return self.report_lookup(incident_id)
+            return db.reference(self.path).child(incident_id).get()
+        except Exception as e:
+            print(f"⚠️ Gagal memeriksa incident {incident_id}: {e}")
+            return None
+
+    def _ensure_recovered(self):
+        """Muat incident aktif sekali saat start (restart-safe), di luar _lock."""
+        if self._recovered:
+            return
+        with self._recover_lock:
+            if self._recovered:
+                return
+            try:
+                incidents = self._load_recent_incidents()
+            except Exception as e:
+                # Dicoba lagi pada deteksi berikutnya
+                print(f"⚠️ Gagal memuat incident aktif: {e}")
+                return
+            active = [item for item in incidents if item[1].get("status") == "active"]
+            with self._lock:
+                # Terlama dulu agar key terbaru yang bertahan di _seen
+                for incident_id, report in reversed(incidents):
+                    for key in (report.get("source_doc_id"), report.get("last_detection_id")):
+                        if key and key not in self._seen:
+                            self._remember(key, incident_id)
+                for incident_id, report in active:
+                    self._active.setdefault(incident_id, report)
+                if self._open is None and active:
+                    self._open = active[0][1]
+            self._recovered = True
+            if active:
+                print(f"♻️ {len(active)} incident aktif dipulihkan, terakhir: {active[0][0]}")
+
+    def _flush_writes(self):
+        """Jalankan antrean penulisan RTDB berurutan (dipanggil tanpa memegang _lock)."""
+        with self._write_lock:
+            while True:
+                with self._lock:
+                    if not self._pending:
+                        return
+                    incident_id, op, data = self._pending.popleft()
+                try:
+                    ref = db.reference(self.path).child(incident_id)
+                    if op == "set":
+                        ref.set(data)
+                    else:
+                        ref.update(data)
+                except Exception as e:
+                    self.write_errors += 1
+                    print(f"⚠️ Gagal menulis incident {incident_id}: {e}")
+
+    def _remember(self, key, incident_id):
+        self._seen[key] = incident_id
+        self._seen.move_to_end(key)
+        while len(self._seen) > self.seen_limit:
+            self._seen.popitem(last=False)
+
+    def _duplicate(self, key):
+        """Hasil 'duplicate' jika key deteksi sudah diproses (dipanggil di bawah _lock)."""
+        if key not in self._seen:
+            return None
+        self.duplicates += 1
+        incident_id = self._seen[key]
+        report = self._active.get(incident_id)
+        if report is None and self._open and self._open["incident_id"] == incident_id:
+            report = self._open
+        return {"incident_id": incident_id, "report": report, "status": "duplicate"}
+
+    def build_detection(self, doc_id, thermal, env=None, when=None):
+        """when: hasil detection_time(thermal) yang sudah dihitung (opsional)."""
+        env = env or {}
+        timestamp, detected_at = when or detection_time(thermal)
+        report = {
+            "timestamp": timestamp,
+            "severity": classify_severity(thermal.get("max_temp"), thermal.get("hot_fraction")),
+            "temperature": thermal.get("max_temp"),
+            "sensor_type": thermal.get("sensor_type", "unknown"),
+            "image_url": thermal.get("image_url"),
+            "fire_bbox": thermal.get("fire_bbox"),
+        }
+        if "hotspots" in thermal:
+            report["hotspots"] = thermal["hotspots"]
+            report["hot_fraction"] = thermal.get("hot_fraction")
+        if env:
+            report["humidity"] = env.get("humidity")
+            report["location"] = {
+                "latitude": env.get("latitude"),
+                "longitude": env.get("longitude"),
+            }
+
+        # Lokasi hasil proyeksi bbox lebih akurat dari posisi sensor env
+        location = self.locate(detected_at, thermal)
+        if location:
+            report["location"] = location
+        return to_rtdb_key(doc_id or report["timestamp"]), detected_at, report
+
+    def locate(self, detected_at, thermal):
+        """Geo-reference fire_bbox dengan telemetry pada waktu frame (None jika gagal)."""
+        if not self.georef or not thermal.get("fire_bbox"):
+            return None
+        # frame_shape tidak valid → ukuran gambar default georeferencer
+        image_size = parse_frame_shape(thermal.get("frame_shape"))
+        try:
+            return self.georef.locate(detected_at.timestamp(), thermal["fire_bbox"], image_size)
+        except Exception as e:
+            print(f"⚠️ Geo-referencing deteksi gagal: {e}")
+            return None
+
+    def _same_place(self, incident, detection):
+        """False hanya jika keduanya berlokasi dan berjarak > cluster_radius."""
+        a, b = get_lat_lon(incident), get_lat_lon(detection)
+        if not a or not b:
+            return True
+        return haversine_m(a[0], a[1], b[0], b[1]) <= self.cluster_radius
+
+    def _cluster_candidates(self, detection, detected_at):
+        """Incident di sekitar lokasi deteksi (lewat spatial index; dipanggil di luar _lock)."""
+        latlon = get_lat_lon(detection)
+        if not latlon or not self.cluster_lookup:
+            return []
+        try:
+            return self.cluster_lookup(
+                latlon[0], latlon[1], self.cluster_radius, limit=10,
+                since=detected_at.timestamp() - self.cluster_window,
+            )
+        except Exception as e:
+            print(f"⚠️ Gagal mencari incident terdekat: {e}")
+            return []
+
+    def _find_cluster(self, candidates, detected_at):
+        """Incident (active/closed) terdekat yang masih dalam cluster_window, atau None."""
+        for incident_id, report, _ in candidates:
+            # Versi di memori lebih baru dari salinan spatial index
+            report = self._active.get(incident_id, report)
+            last_seen = parse_timestamp(report.get("last_seen"))
+            if (report.get("incident_id") == incident_id
+                    and report.get("status") in ("active", "closed")
+                    and last_seen and 0 <= (detected_at - last_seen).total_seconds() <= self.cluster_window):
+                return dict(report)
+        return None
+
+    def process(self, doc_id, thermal, env=None):
+        """
+        Proses satu dokumen thermal. Return dict
+        {"incident_id", "report", "status": created|merged|duplicate} atau None
+        jika dokumen tidak berisi deteksi api.
+        """
+        if not thermal:
+            return None
+
+        # Dedup sebelum analisis thermal (tanpa unduh gambar untuk dokumen berulang)
+        when = detection_time(thermal)
+        self._ensure_recovered()
+        with self._lock:
+            duplicate = self._duplicate(to_rtdb_key(doc_id or when[0]))
+        if duplicate:
+            return duplicate
+
+        if self.analyzer:
+            thermal = self.analyzer.enrich(thermal)
+        if not thermal.get("fire_detected", False):
+            return None
+
+        key, detected_at, detection = self.build_detection(doc_id, thermal, env, when)
+        candidates = self._cluster_candidates(detection, detected_at)
+        with self._lock:
+            seen = key in self._seen
+        existing = None if seen else self._existing_report(key)
+
+        with self._lock:
+            duplicate = self._duplicate(key)
+            if duplicate:
+                return duplicate
+
+            incident, window = self._open, self.merge_window
+            if incident and not self._same_place(incident, detection):
+                incident = None
+            last_seen = parse_timestamp(incident.get("last_seen")) if incident else None
+
+            # Di luar jendela waktu incident aktif → cari incident di lokasi yang sama
+            if not last_seen or (detected_at - last_seen).total_seconds() > window:
+                cluster = self._find_cluster(candidates, detected_at)
+                if cluster:
+                    incident, window = cluster, self.cluster_window
+                    last_seen = parse_timestamp(incident.get("last_seen"))
+                    self.clustered += 1
+
+            if last_seen and 0 <= (detected_at - last_seen).total_seconds() <= window:
+                status = "merged"
+                severity = max(
+                    incident.get("severity", "medium"), detection["severity"],
+                    key=lambda s: SEVERITY_RANK.get(s, 0),
+                )
+                temps = [t for t in (incident.get("max_temperature"), detection["temperature"]) if t is not None]
+                changes = dict(
+                    detection,
+                    status="active",
+                    closed_at=None,     # None = hapus field (incident dibuka kembali)
+                    severity=severity,
+                    last_seen=detected_at.isoformat(),
+                    last_detection_id=key,
+                    detection_count=incident.get("detection_count", 1) + 1,
+                    max_temperature=max(temps) if temps else None,
+                )
+                # Pertahankan lokasi lama jika deteksi baru tanpa lokasi
+                if "location" not in detection and "location" in incident:
+                    changes.pop("location", None)
+
+                incident = dict(incident, **changes)
+                incident.pop("closed_at", None)
+                self._pending.append((incident["incident_id"], "update", changes))
+                self.merged += 1
+            elif last_seen and detected_at < last_seen:
+                # Deteksi lama yang datang terlambat → tidak membuka incident baru
+                self.duplicates += 1
+                self._remember(key, incident["incident_id"])
+                return {"incident_id": incident["incident_id"], "report": incident, "status": "duplicate"}
+            elif isinstance(existing, dict):
+                # Deteksi ini sudah pernah membuat incident (mis. sebelum restart) →
+                # jangan timpa first_seen/max_temperature/detection_count
+                self.duplicates += 1
+                self._remember(key, key)
+                return {"incident_id": key, "report": existing, "status": "duplicate"}
+            else:
+                status = "created"
+                incident = dict(
+                    detection,
+                    incident_id=key,
+                    status="active",
+                    first_seen=detected_at.isoformat(),
+                    last_seen=detected_at.isoformat(),
+                    source_doc_id=key,
+                    last_detection_id=key,
+                    detection_count=1,
+                    max_temperature=detection["temperature"],
+                )
+                self._pending.append((key, "set", incident))
+                self.created += 1
+
+            self._open = incident
+            self._active[incident["incident_id"]] = incident
+            self._remember(key, incident["incident_id"])
+
+        self._flush_writes()
+        result = {"incident_id": incident["incident_id"], "report": incident, "status": status}
+        if self.bus:
+            self.bus.publish("fire_report", result)
+        return result
+
+    def expire(self, now=None):
+        """
+        Tutup incident aktif tanpa deteksi baru selama merge_window.
+        Dipanggil berkala oleh background task; return jumlah incident yang ditutup.
+        """
+        now = now if now is not None else time.time()
+        closed = []
+        with self._lock:
+            for incident_id, incident in list(self._active.items()):
+                last_seen = parse_timestamp(incident.get("last_seen"))
+                if last_seen is None or now - last_seen.timestamp() <= self.merge_window:
+                    continue
+                changes = {
+                    "status": "closed",
+                    "closed_at": datetime.fromtimestamp(now, tz=timezone.utc).isoformat(),
+                }
+                incident = dict(incident, **changes)
+                del self._active[incident_id]
+                if self._open and self._open["incident_id"] == incident_id:
+                    self._open = incident
+                self._pending.append((incident_id, "update", changes))
+                closed.append(incident)
+            self.closed += len(closed)
+
+        self._flush_writes()
+        for incident in closed:
+            if self.bus:
+                self.bus.publish("fire_report", {
+                    "incident_id": incident["incident_id"], "report": incident, "status": "closed",
+                })
+        return len(closed)
+
+    def get_stats(self):
+        return {
+            "created": self.created,
+            "merged": self.merged,
+            "clustered": self.clustered,
+            "duplicates": self.duplicates,
+            "closed": self.closed,
+            "write_errors": self.write_errors,
+            "active_incidents": len(self._active),
+            "open_incident": self._open["incident_id"] if self._open else None,
+        }
+
+
+# Instance bersama untuk background ingest & endpoint sinkronisasi
+fire_pipeline = FireIncidentPipeline()
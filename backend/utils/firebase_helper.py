@@ -1,6 +1,7 @@
 import firebase_admin
 from firebase_admin import storage
-import datetime
+from backend.utils.storage_index import blob_index
+from backend.utils.signed_url_cache import signed_urls
 
 def get_latest_image(folder_name):
     """
@@ -8,21 +9,16 @@ def get_latest_image(folder_name):
     folder_name bisa 'detected_fire' atau 'thermal_images'.
     """
     try:
-        bucket = storage.bucket()
-        blobs = list(bucket.list_blobs(prefix=f"{folder_name}/"))
-        
-        if not blobs:
-            return None
+        # Blob terbaru dari index bersama (tanpa listing folder per request)
+        latest_blob = blob_index.latest(folder_name)
 
-        # Urutkan berdasarkan waktu pembuatan (descending)
-        blobs.sort(key=lambda b: b.time_created, reverse=True)
-        latest_blob = blobs[0]
+        if not latest_blob:
+            return None
 
-        # Buat signed URL agar bisa diakses frontend (berlaku 1 jam)
-        url = latest_blob.generate_signed_url(
-            expiration=datetime.timedelta(hours=1),
-            method="GET"
-        )
+        # Signed URL dari cache (ditandatangani ulang hanya menjelang kedaluwarsa)
+        url = signed_urls.get_url(latest_blob.name)
+        if url is None:
+            return None
 
         return {
             "name": latest_blob.name,
@@ -34,3 +30,4 @@ def get_latest_image(folder_name):
     except Exception as e:
         print(f"⚠️ Error ambil gambar dari Firebase Storage: {e}")
         return None
+
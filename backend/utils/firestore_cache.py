@@ -0,0 +1,165 @@
+# backend/utils/firestore_cache.py
+import os
+import threading
+import time
+
+from firebase_admin import firestore
+
+from backend.database.db import ensure_firebase
+from backend.utils.async_runtime import blocking_io
+
+# =====================================================
+# Shared Firestore client
+# =====================================================
+_fs_client = None
+_fs_lock = threading.Lock()
+
+
+def get_firestore():
+    """Client Firestore tunggal untuk seluruh proses (dibuat sekali)."""
+    global _fs_client
+    if _fs_client is None:
+        with _fs_lock:
+            if _fs_client is None:
+                ensure_firebase()
+                _fs_client = firestore.client()
+    return _fs_client
+
+
+def fetch_latest_doc(collection):
+    """Query 'dokumen terbaru' berdasarkan timestamp. Return (doc_id, data) atau None."""
+    docs = list(
+        get_firestore().collection(collection)
+        .order_by("timestamp", direction=firestore.Query.DESCENDING)
+        .limit(1)
+        .stream()
+    )
+    if not docs:
+        return None
+    return docs[0].id, docs[0].to_dict()
+
+
+# =====================================================
+# TTL Cache "latest document per collection"
+# =====================================================
+class _Flight:
+    def __init__(self):
+        self.event = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class LatestDocCache:
+    def __init__(self, ttl=2.0, fetcher=fetch_latest_doc, wait_timeout=10.0):
+        """
+        ttl          : detik, umur maksimum hasil cache
+        fetcher      : fungsi(collection) → (doc_id, data) | None
+        wait_timeout : detik, batas tunggu request yang menumpang fetch lain
+        """
+        self.ttl = ttl
+        self.fetcher = fetcher
+        self.wait_timeout = wait_timeout
+
+        self._lock = threading.Lock()
+        self._entries = {}      # collection → (fetched_at, value)
+        self._inflight = {}     # collection → _Flight
+
+        # Statistik
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+        self.errors = 0
+        self.stale_served = 0
+        self.wait_timeouts = 0
+
+    # ==============================================================
+
+    def get_latest(self, collection):
+        """(doc_id, data) terbaru untuk collection, atau None jika kosong."""
+        now = time.time()
+
+        with self._lock:
+            entry = self._entries.get(collection)
+            if entry and now - entry[0] < self.ttl:
+                self.hits += 1
+                return entry[1]
+
+            # Single-flight: hanya satu request yang benar-benar query Firestore
+            flight = self._inflight.get(collection)
+            leader = flight is None
+            if leader:
+                flight = _Flight()
+                self._inflight[collection] = flight
+                self.misses += 1
+            else:
+                self.coalesced += 1
+
+        if not leader:
+            if not flight.event.wait(self.wait_timeout):
+                # Fetch leader terlalu lama → nilai lama jika ada, bukan "kosong"
+                with self._lock:
+                    self.wait_timeouts += 1
+                    if entry:
+                        self.stale_served += 1
+                        return entry[1]
+                raise TimeoutError(
+                    f"Timeout menunggu query Firestore '{collection}' ({self.wait_timeout:g}s)"
+                )
+            if flight.error is not None:
+                raise flight.error
+            return flight.result
+
+        try:
+            flight.result = blocking_io.run(self.fetcher, collection)
+            with self._lock:
+                self._entries[collection] = (time.time(), flight.result)
+        except Exception as e:
+            with self._lock:
+                self.errors += 1
+                # Firestore gagal → sajikan nilai lama jika ada
+                if entry:
+                    self.stale_served += 1
+                    flight.result = entry[1]
+                else:
+                    flight.error = e
+        finally:
+            with self._lock:
+                self._inflight.pop(collection, None)
+            flight.event.set()
+
+        if flight.error is not None:
+            raise flight.error
+        return flight.result
+
+    def put(self, collection, doc_id, data):
+        """Isi cache secara langsung (mis. dari listener/push update)."""
+        with self._lock:
+            self._entries[collection] = (time.time(), (doc_id, data))
+
+    def invalidate(self, collection=None):
+        with self._lock:
+            if collection is None:
+                self._entries.clear()
+            else:
+                self._entries.pop(collection, None)
+
+    def get_stats(self):
+        with self._lock:
+            total = self.hits + self.misses + self.coalesced
+            return {
+                "ttl": self.ttl,
+                "hits": self.hits,
+                "misses": self.misses,
+                "coalesced": self.coalesced,
+                "errors": self.errors,
+                "stale_served": self.stale_served,
+                "wait_timeouts": self.wait_timeouts,
+                "hit_ratio": round((self.hits + self.coalesced) / total, 3) if total else None,
+                "collections": sorted(self._entries.keys()),
+            }
+
+
+FIRESTORE_CACHE_TTL = float(os.getenv("FIRESTORE_CACHE_TTL", "2"))
+
+# Instance bersama untuk semua blueprint & background task
+latest_docs = LatestDocCache(ttl=FIRESTORE_CACHE_TTL)
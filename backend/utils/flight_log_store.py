@@ -0,0 +1,424 @@
+# backend/utils/flight_log_store.py
+import bisect
+import os
+import threading
+import time
+
+import msgpack
+
+from backend.utils.readiness import PENDING, READY, STARTING
+
+# =====================================================
+# Local Flight Log Store (append-only segment files)
+# =====================================================
+# Setiap record = msgpack [t, data] (t = epoch detik). Record ditulis berurutan
+# ke file segmen "seg-<ms>.mpk"; setiap INDEX_EVERY record dicatat (t, offset)
+# ke sidecar "seg-<ms>.idx" sebagai sparse time index.
+#
+# Saat dibuka, metadata segmen diambil dari sidecar; hanya ekor segmen sejak
+# offset ter-index terakhir (<= INDEX_EVERY record) yang dibaca ulang untuk
+# record terakhir & membuang record yang terpotong. Sidecar yang hilang/tidak
+# konsisten → segmen itu di-scan penuh dan sidecar-nya ditulis ulang.
+#
+# Store dibuka lazy: konstruktor tidak menyentuh disk; segmen dimuat saat
+# take_over() (proses ingest) atau pemakaian pertama, sehingga import blueprint
+# tidak bergantung pada isi FLIGHT_LOG_DIR.
+
+SEGMENT_PREFIX = "seg-"
+SEGMENT_EXT = ".mpk"
+INDEX_EXT = ".idx"
+
+
+class _Segment:
+    def __init__(self, path, first_t):
+        self.path = path
+        self.index_path = path[:-len(SEGMENT_EXT)] + INDEX_EXT
+        self.first_t = first_t
+        self.last_t = first_t
+        self.size = 0
+        self.count = 0
+        self.index_t = []       # timestamp record ter-index
+        self.index_off = []     # offset byte record ter-index
+
+    def add_index(self, t, offset):
+        self.index_t.append(t)
+        self.index_off.append(offset)
+
+    def restore_index(self, entries, index_every):
+        """
+        Pakai sidecar: state seolah semua record sebelum entri terakhir sudah di-scan.
+        Entri terakhir dibuat ulang oleh scan ekor (jika record-nya memang ada).
+        """
+        self.index_t = [t for t, _ in entries[:-1]]
+        self.index_off = [off for _, off in entries[:-1]]
+        self.count = (len(entries) - 1) * index_every
+        self.size = entries[-1][1]
+        self.first_t = entries[0][0]
+        self.last_t = None      # diisi scan ekor
+
+    def offset_for(self, t):
+        """Offset awal scan untuk record dengan timestamp >= t."""
+        i = bisect.bisect_left(self.index_t, t) - 1
+        return self.index_off[i] if i >= 0 else 0
+
+
+class FlightLogStore:
+    def __init__(self, directory, max_segment_bytes=8 * 1024 * 1024,
+                 max_segments=200, index_every=64, read_only=False, follow_interval=1.0):
+        """
+        directory         : folder segmen log lokal
+        max_segment_bytes : rotasi ke segmen baru jika ukuran terlampaui
+        max_segments      : retensi; segmen tertua dihapus jika melebihi batas
+        index_every       : jarak (jumlah record) antar entri sparse index
+        read_only         : hanya membaca log yang ditulis proses lain (worker web)
+        follow_interval   : detik minimum antar pengecekan segmen baru (read_only)
+        """
+        self.directory = directory
+        self.max_segment_bytes = max_segment_bytes
+        self.max_segments = max_segments
+        self.index_every = index_every
+        self.read_only = read_only
+        self.follow_interval = follow_interval
+        self._followed_at = 0.0
+
+        self._lock = threading.Lock()
+        self._open_lock = threading.Lock()
+        self._opened = False
+        self._opening = False
+        self._load_seconds = None
+        self._segments = []
+        self._file = None
+        self._index_file = None
+        self._latest = None
+
+    # ==============================================================
+    # Open (lazy)
+    # ==============================================================
+
+    def open(self):
+        """Muat segmen dari disk sekali; dipanggil otomatis oleh append/query/latest."""
+        if self._opened:
+            return
+        with self._open_lock:
+            if self._opened:
+                return
+            self._opening = True
+            started = time.time()
+            try:
+                if self.read_only:
+                    self._follow()
+                else:
+                    os.makedirs(self.directory, exist_ok=True)
+                    self._load_segments()
+            finally:
+                self._opening = False
+            self._load_seconds = round(time.time() - started, 3)
+            self._opened = True
+
+    def get_state(self):
+        """Probe readiness (tanpa I/O)."""
+        if self._opened:
+            state = READY
+        else:
+            state = STARTING if self._opening else PENDING
+        return {
+            "state": state,
+            "read_only": self.read_only,
+            "segments": len(self._segments),
+            "load_seconds": self._load_seconds,
+        }
+
+    # ==============================================================
+    # Load & recovery
+    # ==============================================================
+
+    def _load_segments(self):
+        names = sorted(
+            n for n in os.listdir(self.directory)
+            if n.startswith(SEGMENT_PREFIX) and n.endswith(SEGMENT_EXT)
+        )
+        for name in names:
+            path = os.path.join(self.directory, name)
+            try:
+                segment = self._load_segment(path)
+            except Exception as e:
+                print(f"⚠️ Segmen flight log rusak, dilewati ({name}): {e}")
+                continue
+            if segment.count:
+                self._segments.append(segment)
+
+        if self._segments:
+            print(f"📂 Flight log lokal: {len(self._segments)} segmen dimuat dari {self.directory}")
+
+    @staticmethod
+    def _new_segment(path):
+        name = os.path.basename(path)
+        first_t = int(name[len(SEGMENT_PREFIX):-len(SEGMENT_EXT)]) / 1000.0
+        return _Segment(path, first_t)
+
+    def _read_index(self, segment):
+        """Entri (t, offset) sidecar, atau None jika hilang/tidak konsisten dengan file."""
+        try:
+            with open(segment.index_path, "rb") as f:
+                entries = [tuple(e) for e in msgpack.Unpacker(f, raw=False)]
+            size = os.path.getsize(segment.path)
+        except (OSError, ValueError, TypeError, msgpack.ExtraData):
+            return None
+        if not entries or entries[0][1] != 0 or entries[-1][1] > size:
+            return None
+        for (t0, off0), (t1, off1) in zip(entries, entries[1:]):
+            if off1 <= off0 or t1 < t0:
+                return None
+        return entries
+
+    def _load_segment(self, path):
+        """Segmen dari sidecar + scan ekor; scan penuh jika sidecar tidak bisa dipakai."""
+        segment = self._new_segment(path)
+        entries = self._read_index(segment)
+        if entries is None:
+            return self._scan_segment(path, segment, index_on_disk=None)
+
+        segment.restore_index(entries, self.index_every)
+        self._scan_segment(path, segment, index_on_disk=entries)
+        if segment.count and segment.last_t is None:
+            # Entri terakhir sidecar menunjuk record yang tidak pernah tertulis
+            return self._scan_segment(path, self._new_segment(path), index_on_disk=None)
+        return segment
+
+    def _scan_segment(self, path, segment=None, index_on_disk=()):
+        """
+        Baca segmen dari segment.size untuk melengkapi sparse index & record terakhir.
+        Segmen baru di-scan dari awal; mode read_only melanjutkan dari ukuran terakhir.
+        index_on_disk: isi sidecar saat ini (None = tidak valid) → ditulis ulang jika berbeda.
+        """
+        if segment is None:
+            segment = self._new_segment(path)
+        start = segment.size
+
+        with open(path, "rb") as f:
+            f.seek(start)
+            unpacker = msgpack.Unpacker(f, raw=False)
+            offset = start
+            for record in unpacker:
+                t = record[0]
+                if segment.count % self.index_every == 0:
+                    segment.add_index(t, offset)
+                if segment.count == 0:
+                    segment.first_t = t
+                segment.last_t = t
+                segment.count += 1
+                self._latest = record
+                offset = start + unpacker.tell()
+        segment.size = offset
+
+        # Pembaca (read_only) tidak boleh mengubah file milik proses penulis;
+        # ekor yang belum lengkap akan terbaca pada follow berikutnya
+        if self.read_only:
+            return segment
+
+        # Buang ekor record yang terpotong (crash saat menulis)
+        if os.path.getsize(path) != offset:
+            with open(path, "r+b") as f:
+                f.truncate(offset)
+
+        index = list(zip(segment.index_t, segment.index_off))
+        if index_on_disk is None or index != list(index_on_disk):
+            with open(segment.index_path, "wb") as f:
+                for t, off in index:
+                    f.write(msgpack.packb([t, off]))
+        return segment
+
+    def _follow(self):
+        """
+        Mode read_only: ikuti segmen yang ditulis proses lain (worker ingest),
+        yaitu segmen baru, ekor segmen yang bertambah, dan segmen yang dihapus retensi.
+        """
+        now = time.time()
+        if now - self._followed_at < self.follow_interval:
+            return
+        self._followed_at = now
+
+        try:
+            names = sorted(
+                n for n in os.listdir(self.directory)
+                if n.startswith(SEGMENT_PREFIX) and n.endswith(SEGMENT_EXT)
+            )
+        except FileNotFoundError:
+            return
+
+        with self._lock:
+            known = {s.path: s for s in self._segments}
+            segments = []
+            for name in names:
+                path = os.path.join(self.directory, name)
+                segment = known.get(path)
+                try:
+                    if segment is None:
+                        segment = self._load_segment(path)
+                    elif os.path.getsize(path) > segment.size:
+                        self._scan_segment(path, segment)
+                except (OSError, ValueError, msgpack.ExtraData) as e:
+                    print(f"⚠️ Gagal mengikuti segmen flight log ({name}): {e}")
+                    continue
+                if segment.count:
+                    segments.append(segment)
+            self._segments = segments
+
+    def take_over(self):
+        """Reader → writer (worker ini terpilih sebagai leader ingest); memuat segmen."""
+        with self._open_lock:
+            with self._lock:
+                if not self.read_only and self._opened:
+                    return
+                self._opening = True
+                started = time.time()
+                self.read_only = False
+                self._segments = []
+                self._latest = None
+                try:
+                    os.makedirs(self.directory, exist_ok=True)
+                    # Recovery: ekor segmen milik leader lama yang terpotong dibuang
+                    self._load_segments()
+                finally:
+                    self._opening = False
+            self._load_seconds = round(time.time() - started, 3)
+            self._opened = True
+
+    # ==============================================================
+    # Append
+    # ==============================================================
+
+    def _open_new_segment(self, t):
+        self._close_files()
+
+        # t tidak pernah mundur, sehingga nama bisa sama dengan segmen aktif →
+        # naikkan milidetik nama sampai unik (urutan nama tetap urutan waktu)
+        ms = int(t * 1000)
+        if self._segments:
+            last_name = os.path.basename(self._segments[-1].path)
+            ms = max(ms, int(last_name[len(SEGMENT_PREFIX):-len(SEGMENT_EXT)]) + 1)
+        path = os.path.join(self.directory, f"{SEGMENT_PREFIX}{ms:013d}{SEGMENT_EXT}")
+        while os.path.exists(path):
+            ms += 1
+            path = os.path.join(self.directory, f"{SEGMENT_PREFIX}{ms:013d}{SEGMENT_EXT}")
+        segment = _Segment(path, t)
+        self._segments.append(segment)
+        self._file = open(path, "ab")
+        self._index_file = open(segment.index_path, "wb")
+
+        # Retensi: hapus segmen tertua
+        while len(self._segments) > self.max_segments:
+            old = self._segments.pop(0)
+            for p in (old.path, old.index_path):
+                try:
+                    os.remove(p)
+                except OSError:
+                    pass
+        return segment
+
+    def append(self, data, t=None):
+        """Tambah satu record telemetry. Timestamp dipaksa tidak mundur."""
+        if self.read_only:
+            raise RuntimeError("Flight log dibuka read_only; hanya worker ingest yang menulis")
+        self.open()
+        with self._lock:
+            t = time.time() if t is None else float(t)
+            if self._latest is not None and t < self._latest[0]:
+                t = self._latest[0]
+
+            segment = self._segments[-1] if self._segments else None
+            if segment is None or self._file is None or segment.size >= self.max_segment_bytes:
+                segment = self._open_new_segment(t)
+
+            record = [t, data]
+            payload = msgpack.packb(record, use_bin_type=True)
+
+            if segment.count % self.index_every == 0:
+                segment.add_index(t, segment.size)
+                self._index_file.write(msgpack.packb([t, segment.size]))
+                self._index_file.flush()
+
+            self._file.write(payload)
+            self._file.flush()
+
+            segment.size += len(payload)
+            segment.count += 1
+            segment.last_t = t
+            self._latest = record
+
+    # ==============================================================
+    # Query
+    # ==============================================================
+
+    def latest(self):
+        """Record terakhir sebagai (t, data), atau None."""
+        self.open()
+        if self.read_only:
+            self._follow()
+        record = self._latest
+        return (record[0], record[1]) if record else None
+
+    def query(self, start=None, end=None, limit=None):
+        """Iterasi (t, data) dengan start <= t <= end, urut waktu."""
+        start = float("-inf") if start is None else start
+        end = float("inf") if end is None else end
+        self.open()
+        if self.read_only:
+            self._follow()
+
+        with self._lock:
+            segments = [s for s in self._segments if s.last_t >= start and s.first_t <= end]
+            # Snapshot ukuran agar record yang sedang ditulis tidak terbaca setengah
+            sizes = {s.path: s.size for s in segments}
+
+        count = 0
+        for segment in segments:
+            offset = segment.offset_for(start)
+            max_bytes = sizes[segment.path] - offset
+            try:
+                f = open(segment.path, "rb")
+            except FileNotFoundError:
+                continue  # segmen terhapus oleh retensi
+
+            with f:
+                f.seek(offset)
+                unpacker = msgpack.Unpacker(f, raw=False, read_size=64 * 1024)
+                for t, data in unpacker:
+                    if unpacker.tell() > max_bytes:
+                        break
+                    if t < start:
+                        continue
+                    if t > end:
+                        return
+                    yield t, data
+                    count += 1
+                    if limit and count >= limit:
+                        return
+
+    def get_stats(self):
+        self.open()
+        with self._lock:
+            return {
+                "directory": self.directory,
+                "segments": len(self._segments),
+                "records": sum(s.count for s in self._segments),
+                "bytes": sum(s.size for s in self._segments),
+                "first_t": self._segments[0].first_t if self._segments else None,
+                "last_t": self._latest[0] if self._latest else None,
+            }
+
+    # ==============================================================
+
+    def _close_files(self):
+        for f in (self._file, self._index_file):
+            if f:
+                try:
+                    f.close()
+                except Exception:
+                    pass
+        self._file = None
+        self._index_file = None
+
+    def close(self):
+        with self._lock:
+            self._close_files()
@@ -0,0 +1,404 @@
+# backend/utils/flight_summary.py
+import math
+import os
+import threading
+import time
+from datetime import datetime, timezone
+
+from firebase_admin import db
+
+from backend.utils.async_runtime import blocking_io
+from backend.utils.event_bus import event_bus
+
+# =====================================================
+# Segmentasi & Ringkasan Penerbangan
+# =====================================================
+# Sampel telemetry (hasil create_drone_data_from_pixhawk) dialirkan ke state
+# machine sederhana:
+#   - aktif  : armed == True, atau (jika status arm tidak diketahui)
+#              altitude > AIRBORNE_ALT / groundspeed > AIRBORNE_SPEED
+#   - mulai  : sampel aktif pertama
+#   - selesai: tidak aktif selama END_GRACE detik, atau tidak ada sampel
+#              selama MAX_GAP detik
+# Agregat (durasi, jarak, altitude maks, baterai, deteksi api) diperbarui
+# per sampel, sehingga ringkasan siap saat penerbangan selesai dan disimpan
+# sebagai satu record di /flight_logs/{flight_id}.
+
+AIRBORNE_ALT = 1.0          # meter
+AIRBORNE_SPEED = 1.0        # m/s
+MAX_STEP_SPEED = 60.0       # m/s; lompatan GPS lebih cepat dari ini diabaikan
+
+
+def _haversine(lat1, lon1, lat2, lon2):
+    p1, p2 = math.radians(lat1), math.radians(lat2)
+    dp, dl = p2 - p1, math.radians(lon2 - lon1)
+    a = math.sin(dp / 2) ** 2 + math.cos(p1) * math.cos(p2) * math.sin(dl / 2) ** 2
+    return 2 * 6371008.8 * math.asin(math.sqrt(min(a, 1.0)))
+
+
+def _num(value):
+    return value if isinstance(value, (int, float)) and not isinstance(value, bool) else None
+
+
+def format_duration(seconds):
+    seconds = int(round(seconds))
+    hours, rem = divmod(seconds, 3600)
+    minutes, secs = divmod(rem, 60)
+    if hours:
+        return f"{hours}j {minutes}m"
+    return f"{minutes}m {secs:02d}s"
+
+
+def _clock(ts):
+    return datetime.fromtimestamp(ts, tz=timezone.utc).strftime("%H:%M:%S")
+
+
+def sample_position(sample):
+    gps = sample.get("gps") or {}
+    lat, lon = _num(gps.get("latitude", sample.get("latitude"))), _num(gps.get("longitude", sample.get("longitude")))
+    if lat is None or lon is None or (lat == 0 and lon == 0):
+        return None
+    return lat, lon
+
+
+class _Flight:
+    """Agregat inkremental satu penerbangan."""
+
+    def __init__(self, t, sample):
+        self.start = t
+        self.end = t
+        self.last_active = t
+        self.samples = 0
+        self.distance = 0.0
+        self.max_altitude = None
+        self.max_groundspeed = None
+        self.battery_start = None
+        self.battery_end = None
+        self.start_position = None
+        self.last_position = None
+        self.last_position_t = None
+        self.modes = []
+        self.fire_detections = 0
+        self.fire_incidents = set()
+        self.add(t, sample)
+
+    def add(self, t, sample):
+        self.end = t
+        self.samples += 1
+
+        alt = _num(sample.get("altitude"))
+        if alt is not None:
+            self.max_altitude = alt if self.max_altitude is None else max(self.max_altitude, alt)
+
+        speed = _num(sample.get("groundspeed"))
+        if speed is not None:
+            self.max_groundspeed = speed if self.max_groundspeed is None else max(self.max_groundspeed, speed)
+
+        battery = _num(sample.get("battery"))
+        if battery is not None:
+            if self.battery_start is None:
+                self.battery_start = battery
+            self.battery_end = battery
+
+        mode = sample.get("mode")
+        if mode and (not self.modes or self.modes[-1] != mode):
+            self.modes.append(mode)
+
+        position = sample_position(sample)
+        if position:
+            if self.start_position is None:
+                self.start_position = position
+            if self.last_position is not None:
+                step = _haversine(*self.last_position, *position)
+                dt = max(t - self.last_position_t, 1e-3)
+                if step / dt <= MAX_STEP_SPEED:
+                    self.distance += step
+            self.last_position = position
+            self.last_position_t = t
+
+    def summary(self, in_progress=False):
+        duration = max(self.last_active - self.start, 0.0)
+        battery_used = (
+            round(self.battery_start - self.battery_end, 1)
+            if self.battery_start is not None and self.battery_end is not None else None
+        )
+        flight_id = f"flight-{int(self.start * 1000)}"
+        location = (
+            f"{self.start_position[0]:.5f}, {self.start_position[1]:.5f}"
+            if self.start_position else "-"
+        )
+
+        notes = [f"Drone aktif (ARM/lepas landas) pukul {_clock(self.start)} UTC."]
+        if len(self.modes) > 1:
+            notes.append(f"Mode penerbangan: {' → '.join(self.modes)}.")
+        elif self.modes:
+            notes.append(f"Mode penerbangan: {self.modes[0]}.")
+        if self.max_altitude is not None:
+            notes.append(f"Ketinggian maksimum {self.max_altitude:.1f} meter.")
+        notes.append(f"Jarak tempuh {self.distance / 1000.0:.2f} km.")
+        if battery_used is not None:
+            notes.append(f"Baterai {self.battery_start:.0f}% → {self.battery_end:.0f}% (terpakai {battery_used:.0f}%).")
+        if self.fire_detections:
+            notes.append(
+                f"{self.fire_detections} deteksi api dalam {len(self.fire_incidents)} incident."
+            )
+        else:
+            notes.append("Tidak ada deteksi api selama misi.")
+        if not in_progress:
+            notes.append(f"Penerbangan selesai pukul {_clock(self.last_active)} UTC.")
+
+        return {
+            "id": flight_id,
+            "start_ts": self.start,
+            "end_ts": self.last_active,
+            "start_time": datetime.fromtimestamp(self.start, tz=timezone.utc).strftime("%Y-%m-%d %H:%M:%S"),
+            "duration_s": round(duration, 1),
+            "duration": format_duration(duration),
+            "distance_m": round(self.distance, 1),
+            "max_altitude": self.max_altitude,
+            "max_groundspeed": self.max_groundspeed,
+            "battery_start": self.battery_start,
+            "battery_end": self.battery_end,
+            "battery_used": battery_used,
+            "battery": self.battery_end,
+            "location": location,
+            "start_position": (
+                {"latitude": self.start_position[0], "longitude": self.start_position[1]}
+                if self.start_position else None
+            ),
+            "modes": list(self.modes),
+            "samples": self.samples,
+            "fire_detections": self.fire_detections,
+            "fire_incidents": sorted(self.fire_incidents),
+            "fire_detected": self.fire_detections > 0,
+            "in_progress": in_progress,
+            "summary": notes,
+        }
+
+
+class FlightSummarizer:
+    def __init__(self, path="/flight_logs", end_grace=10.0, max_gap=60.0, min_duration=10.0,
+                 bus=event_bus, persist=True):
+        """
+        path         : node RealtimeDB tabel ringkasan penerbangan
+        end_grace    : detik tidak aktif sebelum penerbangan dianggap selesai
+        max_gap      : detik tanpa sampel sebelum penerbangan ditutup paksa
+        min_duration : detik; penerbangan lebih pendek diabaikan (mis. arm sebentar)
+        persist      : tulis ringkasan ke RTDB saat penerbangan selesai
+        """
+        self.path = path
+        self.end_grace = end_grace
+        self.max_gap = max_gap
+        self.min_duration = min_duration
+        self.persist = persist
+        self.bus = bus
+
+        self._lock = threading.RLock()
+        self._current = None
+        self._last_t = None
+        self._flights = {}          # flight_id → summary
+        self._loaded = False
+
+        # Statistik
+        self.samples = 0
+        self.flights_closed = 0
+        self.flights_discarded = 0
+
+        if bus:
+            bus.subscribe("fire_report", self.on_fire_report)
+            bus.subscribe("flight_closed", self.on_flight_closed)
+
+    # ==============================================================
+    # Segmentasi
+    # ==============================================================
+
+    @staticmethod
+    def is_active(sample):
+        armed = sample.get("armed")
+        if armed is not None:
+            return bool(armed)
+        alt = _num(sample.get("altitude")) or 0.0
+        speed = _num(sample.get("groundspeed")) or 0.0
+        return alt > AIRBORNE_ALT or speed > AIRBORNE_SPEED
+
+    def ingest(self, t, sample):
+        """Masukkan satu sampel telemetry (t = epoch detik, urut waktu)."""
+        if not isinstance(sample, dict) or t is None:
+            return None
+        closed = None
+        with self._lock:
+            if self._last_t is not None and t <= self._last_t:
+                return None
+            self.samples += 1
+
+            if self._current and t - self._last_t > self.max_gap:
+                closed = self._close()
+            self._last_t = t
+
+            active = self.is_active(sample)
+            if self._current is None:
+                if active:
+                    self._current = _Flight(t, sample)
+            else:
+                self._current.add(t, sample)
+                if active:
+                    self._current.last_active = t
+                elif t - self._current.last_active > self.end_grace:
+                    closed = self._close()
+        return closed
+
+    def check_timeout(self, now=None):
+        """Tutup penerbangan jika sampel berhenti datang (link putus)."""
+        now = time.time() if now is None else now
+        with self._lock:
+            if self._current and self._last_t and now - self._last_t > self.max_gap:
+                return self._close()
+        return None
+
+    def _close(self):
+        flight, self._current = self._current, None
+        duration = flight.last_active - flight.start
+        if duration < self.min_duration:
+            self.flights_discarded += 1
+            return None
+
+        summary = flight.summary()
+        self._flights[summary["id"]] = summary
+        self.flights_closed += 1
+        print(f"🛬 Penerbangan {summary['id']} selesai ({summary['duration']})")
+
+        if self.persist:
+            self._persist(summary)
+        if self.bus:
+            self.bus.publish("flight_closed", summary)
+        return summary
+
+    def _persist(self, summary):
+        try:
+            db.reference(self.path).child(summary["id"]).set(summary)
+        except Exception as e:
+            print(f"⚠️ Gagal menyimpan ringkasan penerbangan: {e}")
+
+    def on_fire_report(self, topic, result):
+        """Subscriber event bus 'fire_report': hitung deteksi api pada penerbangan aktif."""
+        if result.get("status") not in ("created", "merged"):
+            return
+        with self._lock:
+            if self._current is not None:
+                self._current.fire_detections += 1
+                self._current.fire_incidents.add(result.get("incident_id"))
+
+    def on_flight_closed(self, topic, summary):
+        """Subscriber 'flight_closed' (termasuk dari leader ingest lewat cluster bus)."""
+        if isinstance(summary, dict) and summary.get("id"):
+            with self._lock:
+                self._flights[summary["id"]] = summary
+
+    # ==============================================================
+    # Tabel ringkasan
+    # ==============================================================
+
+    def ensure_loaded(self):
+        """Muat tabel ringkasan dari RTDB sekali (ringkasan kecil, satu per penerbangan)."""
+        if self._loaded:
+            return
+        try:
+            data = blocking_io.run(db.reference(self.path).get) or {}
+        except Exception as e:
+            print(f"⚠️ Gagal memuat ringkasan penerbangan: {e}")
+            return
+        with self._lock:
+            for flight_id, summary in data.items():
+                if isinstance(summary, dict):
+                    self._flights.setdefault(flight_id, summary)
+            self._loaded = True
+
+    def backfill(self, records, skip_leading_partial=False):
+        """
+        Bangun ulang ringkasan dari riwayat (t, sample), mis. flight log lokal.
+        Memakai segmenter terpisah agar penerbangan yang sedang berjalan tidak terganggu;
+        segmen yang bertumpuk dengan penerbangan aktif dilewati (ditutup oleh ingest).
+        skip_leading_partial: riwayat dipotong di tengah (mis. query 'from') → penerbangan
+        yang sudah aktif di record pertama dilewati agar tidak tersimpan dengan ID lain.
+        """
+        replay = FlightSummarizer(
+            self.path, self.end_grace, self.max_gap, self.min_duration,
+            bus=None, persist=False,
+        )
+        partial_id = None
+        for t, sample in records:
+            if replay.samples == 0 and skip_leading_partial and replay.is_active(sample):
+                partial_id = f"flight-{int(t * 1000)}"
+            replay.ingest(t, sample)
+
+        with self._lock:
+            if replay._current is not None:
+                # Segmen terbuka = penerbangan aktif; tanpa penerbangan aktif, log terputus
+                if self._current is None:
+                    replay._close()
+            live_start = self._current.start if self._current is not None else None
+            rebuilt = [
+                summary for summary in replay._flights.values()
+                if (live_start is None or summary["end_ts"] < live_start)
+                and summary["id"] != partial_id
+            ]
+            for summary in rebuilt:
+                self._flights[summary["id"]] = summary
+
+        if self.persist:
+            for summary in rebuilt:
+                self._persist(summary)
+        return rebuilt
+
+    def list_flights(self, limit=50, include_current=True):
+        """Ringkasan terbaru lebih dulu (penerbangan aktif di paling atas)."""
+        self.ensure_loaded()
+        with self._lock:
+            flights = sorted(self._flights.values(), key=lambda f: f.get("start_ts", 0), reverse=True)
+            if include_current and self._current is not None:
+                flights.insert(0, self._current.summary(in_progress=True))
+        return flights[:limit]
+
+    def totals(self, include_current=True):
+        """Agregat seluruh penerbangan di tabel (bukan hanya satu halaman)."""
+        self.ensure_loaded()
+        with self._lock:
+            flights = list(self._flights.values())
+            if include_current and self._current is not None:
+                flights.append(self._current.summary(in_progress=True))
+        return {
+            "flights": len(flights),
+            "duration_s": round(sum(f.get("duration_s") or 0 for f in flights), 1),
+            "distance_m": round(sum(f.get("distance_m") or 0 for f in flights), 1),
+            "fire_detections": sum(f.get("fire_detections") or 0 for f in flights),
+        }
+
+    def get(self, flight_id):
+        self.ensure_loaded()
+        with self._lock:
+            if self._current is not None:
+                current = self._current.summary(in_progress=True)
+                if current["id"] == flight_id:
+                    return current
+            return self._flights.get(flight_id)
+
+    def get_stats(self):
+        return {
+            "samples": self.samples,
+            "flights": len(self._flights),
+            "flights_closed": self.flights_closed,
+            "flights_discarded": self.flights_discarded,
+            "in_flight": self._current is not None,
+        }
+
+
+FLIGHT_END_GRACE = float(os.getenv("FLIGHT_END_GRACE", "10"))
+FLIGHT_MAX_GAP = float(os.getenv("FLIGHT_MAX_GAP", "60"))
+FLIGHT_MIN_DURATION = float(os.getenv("FLIGHT_MIN_DURATION", "10"))
+
+# Instance bersama: diisi background autosave, dibaca blueprint flight logs
+flight_summarizer = FlightSummarizer(
+    end_grace=FLIGHT_END_GRACE,
+    max_gap=FLIGHT_MAX_GAP,
+    min_duration=FLIGHT_MIN_DURATION,
+)
@@ -0,0 +1,166 @@
+# backend/utils/frame_broadcaster.py
+import threading
+import time
+from collections import deque
+
+from backend.utils.async_runtime import blocking_io
+
+# =====================================================
+# Single-producer MJPEG fan-out
+# =====================================================
+# Satu thread producer per stream mengambil frame baru sekali, menyimpannya
+# di ring buffer, lalu semua subscriber (client MJPEG) membaca dari buffer
+# yang sama. Menambah viewer hanya menambah penulisan ke socket.
+
+
+class FrameStream:
+    def __init__(self, name, fetch_frame, interval=1.2, ring_size=8,
+                 idle_timeout=30.0, keepalive=5.0):
+        """
+        name         : nama stream (untuk log/statistik)
+        fetch_frame  : fungsi(last_key) → (key, jpeg_bytes) jika ada frame baru,
+                       atau None jika frame sumber belum berubah
+        interval     : detik antar pengecekan frame baru
+        ring_size    : jumlah frame terakhir yang disimpan
+        idle_timeout : detik tanpa subscriber sebelum producer berhenti
+        keepalive    : detik; frame terakhir dikirim ulang agar koneksi putus terdeteksi
+        """
+        self.name = name
+        self.fetch_frame = fetch_frame
+        self.interval = interval
+        self.idle_timeout = idle_timeout
+        self.keepalive = keepalive
+
+        self._ring = deque(maxlen=ring_size)    # [(seq, jpeg_bytes)]
+        self._cond = threading.Condition()
+        self._seq = 0
+        self._last_key = None
+        self._subscribers = 0
+        self._idle_since = None
+        self._thread = None
+
+        # Statistik
+        self.frames_produced = 0
+        self.frames_unchanged = 0
+        self.fetch_errors = 0
+
+    # ==============================================================
+    # Producer
+    # ==============================================================
+
+    def _ensure_producer(self):
+        # Dicek di bawah lock yang sama dengan keputusan berhenti di _produce
+        with self._cond:
+            if self._thread is not None:
+                return
+            self._thread = threading.Thread(
+                target=self._produce, name=f"mjpeg-{self.name}", daemon=True
+            )
+            self._thread.start()
+        print(f"🎥 Producer stream '{self.name}' aktif")
+
+    def _produce(self):
+        while True:
+            with self._cond:
+                if self._subscribers == 0:
+                    if self._idle_since and time.time() - self._idle_since > self.idle_timeout:
+                        self._thread = None
+                        print(f"⏸️ Producer stream '{self.name}' berhenti (tanpa viewer)")
+                        return
+
+            try:
+                # Download/encode di pool blocking → hub greenlet tetap melayani viewer
+                result = blocking_io.run(self.fetch_frame, self._last_key)
+                if result is None:
+                    self.frames_unchanged += 1
+                else:
+                    key, frame = result
+                    self.publish(frame, key)
+            except Exception as e:
+                self.fetch_errors += 1
+                print(f"[ERROR] producer stream '{self.name}': {e}")
+
+            time.sleep(self.interval)
+
+    def publish(self, frame, key=None):
+        with self._cond:
+            self._seq += 1
+            self._ring.append((self._seq, frame))
+            self._last_key = key
+            self.frames_produced += 1
+            self._cond.notify_all()
+
+    # ==============================================================
+    # Subscriber
+    # ==============================================================
+
+    def _next_frame(self, last_seq):
+        """Frame setelah last_seq jika masih di ring, kalau tertinggal → frame terbaru."""
+        if not self._ring or self._ring[-1][0] <= last_seq:
+            return None
+        if last_seq < self._ring[0][0] - 1:
+            return self._ring[-1]
+        for seq, frame in self._ring:
+            if seq > last_seq:
+                return seq, frame
+        return None
+
+    def subscribe(self):
+        """Generator frame JPEG untuk satu client."""
+        with self._cond:
+            self._subscribers += 1
+            self._idle_since = None
+            # Viewer baru langsung mulai dari frame terbaru
+            last_seq = self._ring[-1][0] - 1 if self._ring else 0
+        self._ensure_producer()
+
+        try:
+            while True:
+                with self._cond:
+                    entry = self._next_frame(last_seq)
+                    if entry is None:
+                        self._cond.wait(self.keepalive)
+                        entry = self._next_frame(last_seq)
+                    if entry is None and self._ring:
+                        entry = self._ring[-1]      # keepalive: kirim ulang frame terakhir
+
+                if entry is None:
+                    continue
+                last_seq, frame = entry
+                yield frame
+        finally:
+            with self._cond:
+                self._subscribers -= 1
+                if self._subscribers == 0:
+                    self._idle_since = time.time()
+
+    def get_stats(self):
+        return {
+            "subscribers": self._subscribers,
+            "seq": self._seq,
+            "frames_produced": self.frames_produced,
+            "frames_unchanged": self.frames_unchanged,
+            "fetch_errors": self.fetch_errors,
+            "producer_running": bool(self._thread and self._thread.is_alive()),
+        }
+
+
+# =====================================================
+# Registry stream (satu producer per nama stream)
+# =====================================================
+_streams = {}
+_streams_lock = threading.Lock()
+
+
+def get_stream(name, fetch_frame, **kwargs):
+    with _streams_lock:
+        stream = _streams.get(name)
+        if stream is None:
+            stream = FrameStream(name, fetch_frame, **kwargs)
+            _streams[name] = stream
+        return stream
+
+
+def get_streams_stats():
+    with _streams_lock:
+        return {name: stream.get_stats() for name, stream in _streams.items()}
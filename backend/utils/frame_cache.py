@@ -0,0 +1,180 @@
+# backend/utils/frame_cache.py
+import hashlib
+import os
+import threading
+from collections import OrderedDict
+
+from backend.utils.async_runtime import blocking_io
+
+# =====================================================
+# Content-addressed Frame Cache (memori + disk)
+# =====================================================
+# Hasil download_as_bytes() disimpan dengan key (nama blob, generation, md5).
+# Generation baru → key baru, jadi entri lama tidak pernah "basi", cukup
+# tergusur oleh LRU. Lapisan memori dan disk masing-masing punya batas byte.
+
+
+def blob_cache_key(blob):
+    """Key konten untuk blob, atau None jika metadata versi tidak tersedia."""
+    generation = getattr(blob, "generation", None)
+    md5 = getattr(blob, "md5_hash", None)
+    if generation is None and md5 is None:
+        return None
+    raw = f"{blob.name}:{generation}:{md5}".encode("utf-8")
+    return hashlib.sha1(raw).hexdigest()
+
+
+class FrameCache:
+    def __init__(self, directory, memory_budget=32 * 1024 * 1024,
+                 disk_budget=256 * 1024 * 1024):
+        """
+        directory     : folder file cache
+        memory_budget : byte maksimum cache di memori
+        disk_budget   : byte maksimum file cache di disk
+        """
+        self.directory = directory
+        self.memory_budget = memory_budget
+        self.disk_budget = disk_budget
+
+        self._lock = threading.Lock()
+        self._memory = OrderedDict()    # key → bytes (LRU)
+        self._memory_bytes = 0
+        self._disk = OrderedDict()      # key → size (LRU)
+        self._disk_bytes = 0
+
+        # Statistik
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.uncacheable = 0
+
+        os.makedirs(directory, exist_ok=True)
+        self._load_disk_index()
+
+    # ==============================================================
+
+    def _path(self, key):
+        return os.path.join(self.directory, f"{key}.bin")
+
+    def _load_disk_index(self):
+        entries = []
+        for name in os.listdir(self.directory):
+            if not name.endswith(".bin"):
+                continue
+            path = os.path.join(self.directory, name)
+            try:
+                st = os.stat(path)
+            except OSError:
+                continue
+            entries.append((st.st_mtime, name[:-4], st.st_size))
+
+        for _, key, size in sorted(entries):
+            self._disk[key] = size
+            self._disk_bytes += size
+        self._evict_disk()
+
+    def _remember_memory(self, key, data):
+        if len(data) > self.memory_budget:
+            return
+        old = self._memory.pop(key, None)
+        if old is not None:
+            self._memory_bytes -= len(old)
+        self._memory[key] = data
+        self._memory_bytes += len(data)
+        while self._memory_bytes > self.memory_budget:
+            _, evicted = self._memory.popitem(last=False)
+            self._memory_bytes -= len(evicted)
+
+    def _evict_disk(self):
+        while self._disk_bytes > self.disk_budget and self._disk:
+            key, size = self._disk.popitem(last=False)
+            self._disk_bytes -= size
+            try:
+                os.remove(self._path(key))
+            except OSError:
+                pass
+
+    def _read_disk(self, key):
+        """Baca file cache sekali baca (hasilnya juga dipromosikan ke lapisan memori)."""
+        with open(self._path(key), "rb", buffering=0) as f:
+            return f.read()
+
+    def _write_disk(self, key, data):
+        path = self._path(key)
+        tmp = f"{path}.{threading.get_ident()}.tmp"
+        with open(tmp, "wb") as f:
+            f.write(data)
+        os.replace(tmp, path)
+
+    # ==============================================================
+
+    def get_bytes(self, blob):
+        """Isi blob dari cache; download hanya jika (nama, generation, md5) belum ada."""
+        key = blob_cache_key(blob)
+        if key is None:
+            self.uncacheable += 1
+            return blocking_io.run(blob.download_as_bytes)
+
+        with self._lock:
+            data = self._memory.get(key)
+            if data is not None:
+                self._memory.move_to_end(key)
+                self.memory_hits += 1
+                return data
+            on_disk = key in self._disk
+            if on_disk:
+                self._disk.move_to_end(key)
+
+        if on_disk:
+            try:
+                data = self._read_disk(key)
+                with self._lock:
+                    self.disk_hits += 1
+                    self._remember_memory(key, data)
+                return data
+            except OSError:
+                with self._lock:
+                    size = self._disk.pop(key, 0)
+                    self._disk_bytes -= size
+
+        data = blocking_io.run(blob.download_as_bytes)
+        try:
+            self._write_disk(key, data)
+            with self._lock:
+                self.misses += 1
+                if key not in self._disk:
+                    self._disk[key] = len(data)
+                    self._disk_bytes += len(data)
+                self._remember_memory(key, data)
+                self._evict_disk()
+        except OSError as e:
+            print(f"⚠️ Gagal menulis frame cache: {e}")
+        return data
+
+    def get_stats(self):
+        with self._lock:
+            return {
+                "memory_entries": len(self._memory),
+                "memory_bytes": self._memory_bytes,
+                "disk_entries": len(self._disk),
+                "disk_bytes": self._disk_bytes,
+                "memory_hits": self.memory_hits,
+                "disk_hits": self.disk_hits,
+                "misses": self.misses,
+                "uncacheable": self.uncacheable,
+            }
+
+
+FRAME_CACHE_DIR = os.getenv(
+    "FRAME_CACHE_DIR",
+    os.path.join(os.path.dirname(__file__), "..", "frame_cache"),
+)
+FRAME_CACHE_MEMORY_MB = float(os.getenv("FRAME_CACHE_MEMORY_MB", "32"))
+FRAME_CACHE_DISK_MB = float(os.getenv("FRAME_CACHE_DISK_MB", "256"))
+
+# Instance bersama untuk video blueprint & firebase_helper
+frame_cache = FrameCache(
+    FRAME_CACHE_DIR,
+    memory_budget=int(FRAME_CACHE_MEMORY_MB * 1024 * 1024),
+    disk_budget=int(FRAME_CACHE_DISK_MB * 1024 * 1024),
+)
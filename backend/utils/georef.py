@@ -0,0 +1,382 @@
+# backend/utils/georef.py
+import copy
+import math
+import os
+import threading
+
+import numpy as np
+
+# =====================================================
+# Geo-referencing Hotspot (telemetry tersinkron)
+# =====================================================
+# TelemetryHistory menyimpan riwayat posisi & attitude drone dalam array
+# NumPy (kolom tetap, urut waktu). Untuk setiap deteksi:
+#   1. waktu frame dicari dengan np.searchsorted → interpolasi linear antar
+#      dua sampel telemetry (yaw dengan wrap-around)
+#   2. pusat fire_bbox → sinar kamera (pinhole, HFOV/VFOV) → rotasi
+#      body→NED (roll, pitch, yaw) → perpotongan dengan tanah datar
+#      setinggi sonar (jika valid) atau altitude relatif
+#   3. offset North/East (meter) → lat/lon
+# Semua langkah vectorized untuk N deteksi sekaligus (replay penerbangan).
+
+EARTH_RADIUS = 6378137.0
+
+# Kolom riwayat telemetry
+COL_LAT, COL_LON, COL_ALT, COL_SONAR, COL_ROLL, COL_PITCH, COL_YAW = range(7)
+N_COLS = 7
+
+
+def _num(value):
+    try:
+        return float(value) if value is not None else math.nan
+    except (TypeError, ValueError):
+        return math.nan
+
+
+def telemetry_row(data):
+    """Dict telemetry (snapshot Pixhawk / record flight log) → satu baris kolom."""
+    gps = data.get("gps") or {}
+    att = data.get("attitude") or {}
+
+    yaw = _num(att.get("yaw"))
+    if math.isnan(yaw) and data.get("heading") is not None:
+        yaw = math.radians(_num(data.get("heading")))
+
+    return (
+        _num(data.get("latitude", gps.get("latitude"))),
+        _num(data.get("longitude", gps.get("longitude"))),
+        _num(data.get("altitude", gps.get("altitude"))),
+        _num(data.get("sonar_range")),
+        _num(att.get("roll")),
+        _num(att.get("pitch")),
+        yaw,
+    )
+
+
+class TelemetryHistory:
+    def __init__(self, capacity=36000, max_gap=1.0):
+        """
+        capacity : jumlah sampel minimum yang disimpan (36000 ≈ 1 jam pada 10 Hz)
+        max_gap  : detik; deteksi yang berjarak lebih dari ini ke sampel
+                   terdekat tidak di-georeference
+        """
+        self.capacity = capacity
+        self.max_gap = max_gap
+
+        # Buffer 2x kapasitas: append O(1), dipadatkan saat penuh sehingga
+        # data valid selalu kontigu & terurut → bisa langsung searchsorted
+        self._t = np.empty(2 * capacity, dtype=np.float64)
+        self._v = np.empty((2 * capacity, N_COLS), dtype=np.float64)
+        self._start = 0
+        self._end = 0
+        self._lock = threading.Lock()
+
+        # Statistik
+        self.appended = 0
+        self.out_of_order = 0
+
+    @classmethod
+    def from_records(cls, records, max_gap=1.0):
+        """Bangun riwayat dari iterasi (t, data), mis. FlightLogStore.query()."""
+        rows = [(t, telemetry_row(data)) for t, data in records if isinstance(data, dict)]
+        history = cls(capacity=max(len(rows), 1), max_gap=max_gap)
+        if rows:
+            times = np.fromiter((t for t, _ in rows), dtype=np.float64, count=len(rows))
+            values = np.array([row for _, row in rows], dtype=np.float64)
+            history.extend(times, values)
+        return history
+
+    # ==============================================================
+
+    def _compact(self, incoming):
+        """Sisakan capacity - incoming sampel terakhir di awal buffer."""
+        keep = max(0, min(self._end - self._start, self.capacity - incoming))
+        src = self._end - keep
+        self._t[:keep] = self._t[src:self._end]
+        self._v[:keep] = self._v[src:self._end]
+        self._start, self._end = 0, keep
+
+    def append(self, t, data):
+        """Tambahkan satu snapshot telemetry (sampel mundur/duplikat diabaikan)."""
+        if t is None:
+            return False
+        row = telemetry_row(data)
+        with self._lock:
+            if self._end > self._start and t <= self._t[self._end - 1]:
+                self.out_of_order += 1
+                return False
+            if self._end == len(self._t):
+                self._compact(1)
+            self._t[self._end] = t
+            self._v[self._end] = row
+            self._end += 1
+            self.appended += 1
+        return True
+
+    def extend(self, times, values):
+        """Tambahkan banyak sampel terurut sekaligus (replay)."""
+        times = np.asarray(times, dtype=np.float64)[-self.capacity:]
+        values = np.asarray(values, dtype=np.float64)[-self.capacity:]
+        with self._lock:
+            if self._end > self._start:
+                fresh = times > self._t[self._end - 1]
+                self.out_of_order += int((~fresh).sum())
+                times, values = times[fresh], values[fresh]
+            n = len(times)
+            if self._end + n > len(self._t):
+                self._compact(n)
+            self._t[self._end:self._end + n] = times
+            self._v[self._end:self._end + n] = values
+            self._end += n
+            self.appended += n
+
+    def __len__(self):
+        return self._end - self._start
+
+    # ==============================================================
+
+    def sample(self, times):
+        """
+        Interpolasi telemetry pada waktu-waktu deteksi (epoch detik).
+        Return (values (N, 7), dt (N,)); baris NaN jika di luar riwayat / > max_gap.
+        """
+        times = np.atleast_1d(np.asarray(times, dtype=np.float64))
+        n = len(times)
+
+        with self._lock:
+            ts = self._t[self._start:self._end]
+            vs = self._v[self._start:self._end]
+            if len(ts) == 0:
+                return np.full((n, N_COLS), np.nan), np.full(n, np.inf)
+
+            idx = np.searchsorted(ts, times)
+            hi = np.minimum(idx, len(ts) - 1)
+            lo = np.maximum(idx - 1, 0)
+            t0, t1 = ts[lo], ts[hi]
+            v0, v1 = vs[lo], vs[hi]
+
+        span = t1 - t0
+        w = np.divide(times - t0, span, out=np.zeros(n), where=span > 0)
+        w = np.clip(w, 0.0, 1.0)[:, None]
+
+        diff = v1 - v0
+        # Yaw: interpolasi lewat jalur sudut terpendek
+        diff[:, COL_YAW] = (diff[:, COL_YAW] + math.pi) % (2 * math.pi) - math.pi
+        values = v0 + diff * w
+
+        dt = np.minimum(np.abs(times - t0), np.abs(times - t1))
+        values[dt > self.max_gap] = np.nan
+        return values, dt
+
+    def get_stats(self):
+        with self._lock:
+            span = (
+                [float(self._t[self._start]), float(self._t[self._end - 1])]
+                if self._end > self._start else None
+            )
+        return {
+            "samples": len(self),
+            "span": span,
+            "appended": self.appended,
+            "out_of_order": self.out_of_order,
+        }
+
+
+def parse_bbox(bbox):
+    """fire_bbox [x, y, w, h] atau {x, y, w|width, h|height} → tuple, atau None."""
+    if isinstance(bbox, dict):
+        bbox = (
+            bbox.get("x"), bbox.get("y"),
+            bbox.get("w", bbox.get("width")), bbox.get("h", bbox.get("height")),
+        )
+    if not isinstance(bbox, (list, tuple)) or len(bbox) != 4:
+        return None
+    try:
+        return tuple(float(v) for v in bbox)
+    except (TypeError, ValueError):
+        return None
+
+
+def parse_frame_shape(shape):
+    """frame_shape [h, w] → image_size (w, h), atau None jika tidak valid."""
+    if not isinstance(shape, (list, tuple)) or len(shape) != 2:
+        return None
+    try:
+        h, w = float(shape[0]), float(shape[1])
+    except (TypeError, ValueError):
+        return None
+    return (w, h) if w > 0 and h > 0 else None
+
+
+class Georeferencer:
+    def __init__(self, history, hfov=55.0, vfov=35.0, camera_tilt=0.0,
+                 sonar_min=0.2, sonar_max=7.0, image_size=(640, 480)):
+        """
+        history     : TelemetryHistory sumber posisi & attitude
+        hfov/vfov   : derajat, field of view kamera
+        camera_tilt : derajat kamera condong ke depan dari nadir (0 = tegak ke bawah)
+        sonar_*     : rentang meter sonar yang dipercaya sebagai tinggi di atas tanah
+        image_size  : (w, h) default jika deteksi tidak membawa ukuran frame
+        """
+        self.history = history
+        self.tan_half_h = math.tan(math.radians(hfov) / 2)
+        self.tan_half_v = math.tan(math.radians(vfov) / 2)
+        self.camera_tilt = math.radians(camera_tilt)
+        self.sonar_min = sonar_min
+        self.sonar_max = sonar_max
+        self.image_size = image_size
+
+        # Statistik
+        self.located = 0
+        self.unlocated = 0
+
+    def with_history(self, history):
+        """Salinan dengan parameter kamera yang sama, untuk riwayat lain (replay)."""
+        clone = copy.copy(self)
+        clone.history = history
+        clone.located = clone.unlocated = 0
+        return clone
+
+    def _rays_ned(self, u, v, roll, pitch, yaw):
+        """Koordinat piksel ternormalisasi (0..1) → vektor arah sinar di frame NED."""
+        # Frame kamera: x kanan, y bawah (gambar), z sumbu optik
+        cx = (2 * u - 1) * self.tan_half_h
+        cy = (2 * v - 1) * self.tan_half_v
+
+        # Kamera nadir → body (x depan, y kanan, z bawah), lalu tilt ke depan
+        ct, st = math.cos(self.camera_tilt), math.sin(self.camera_tilt)
+        bx = -cy * ct + st
+        by = cx
+        bz = cy * st + ct
+
+        cr, sr = np.cos(roll), np.sin(roll)
+        cp, sp = np.cos(pitch), np.sin(pitch)
+        cyw, syw = np.cos(yaw), np.sin(yaw)
+
+        # R = Rz(yaw) · Ry(pitch) · Rx(roll), dikalikan per elemen (N deteksi)
+        north = cp * cyw * bx + (sr * sp * cyw - cr * syw) * by + (cr * sp * cyw + sr * syw) * bz
+        east = cp * syw * bx + (sr * sp * syw + cr * cyw) * by + (cr * sp * syw - sr * cyw) * bz
+        down = -sp * bx + sr * cp * by + cr * cp * bz
+        return north, east, down
+
+    def locate_many(self, times, bboxes, image_sizes=None):
+        """
+        times       : (N,) epoch detik waktu frame
+        bboxes      : (N, 4) x, y, w, h (piksel, atau 0..1 jika ternormalisasi)
+        image_sizes : (N, 2) w, h; default self.image_size
+        Return dict array (N,): latitude, longitude, altitude_agl, sonar_used,
+        footprint_w, footprint_h, dt. Baris tanpa solusi berisi NaN.
+        """
+        bboxes = np.asarray(bboxes, dtype=np.float64).reshape(-1, 4)
+        n = len(bboxes)
+        if image_sizes is None:
+            image_sizes = np.tile(np.asarray(self.image_size, dtype=np.float64), (n, 1))
+        image_sizes = np.asarray(image_sizes, dtype=np.float64).reshape(-1, 2)
+
+        # bbox ternormalisasi (semua nilai <= 1) → ukuran frame 1x1
+        normalized = (bboxes <= 1.0).all(axis=1)
+        image_sizes = np.where(normalized[:, None], 1.0, image_sizes)
+
+        values, dt = self.history.sample(times)
+        u = (bboxes[:, 0] + bboxes[:, 2] / 2) / image_sizes[:, 0]
+        v = (bboxes[:, 1] + bboxes[:, 3] / 2) / image_sizes[:, 1]
+
+        sonar = values[:, COL_SONAR]
+        sonar_ok = (sonar >= self.sonar_min) & (sonar <= self.sonar_max)
+        height = np.where(sonar_ok, sonar, values[:, COL_ALT])
+
+        north, east, down = self._rays_ned(
+            u, v, values[:, COL_ROLL], values[:, COL_PITCH], values[:, COL_YAW]
+        )
+
+        # Sinar di atas horizon / tinggi tidak valid → tidak ada titik tanah
+        valid = (down > 1e-3) & (height > 0)
+        scale = np.where(valid, height / np.where(valid, down, 1.0), np.nan)
+        d_north = north * scale
+        d_east = east * scale
+
+        lat0 = values[:, COL_LAT]
+        lat = lat0 + np.degrees(d_north / EARTH_RADIUS)
+        lon = values[:, COL_LON] + np.degrees(
+            d_east / (EARTH_RADIUS * np.cos(np.radians(lat0)))
+        )
+
+        # Perkiraan ukuran area api di tanah (pendekatan nadir)
+        footprint_w = bboxes[:, 2] / image_sizes[:, 0] * 2 * height * self.tan_half_h
+        footprint_h = bboxes[:, 3] / image_sizes[:, 1] * 2 * height * self.tan_half_v
+
+        ok = int((np.isfinite(lat) & np.isfinite(lon)).sum())
+        self.located += ok
+        self.unlocated += n - ok
+
+        return {
+            "latitude": lat,
+            "longitude": lon,
+            "altitude_agl": height,
+            "sonar_used": sonar_ok,
+            "footprint_w": footprint_w,
+            "footprint_h": footprint_h,
+            "dt": dt,
+        }
+
+    def locate(self, t, bbox, image_size=None):
+        """Satu deteksi → dict lokasi untuk laporan, atau None."""
+        box = parse_bbox(bbox)
+        if box is None or t is None:
+            return None
+        result = self.locate_many([t], [box], [image_size] if image_size else None)
+        return location_at(result, 0)
+
+    def get_stats(self):
+        return {
+            "history": self.history.get_stats(),
+            "located": self.located,
+            "unlocated": self.unlocated,
+        }
+
+
+def location_at(result, i):
+    """Baris ke-i hasil locate_many → dict lokasi laporan (None jika tanpa solusi)."""
+    lat, lon = result["latitude"][i], result["longitude"][i]
+    if not (np.isfinite(lat) and np.isfinite(lon)):
+        return None
+    return {
+        "latitude": round(float(lat), 7),
+        "longitude": round(float(lon), 7),
+        "source": "georef",
+        "altitude_agl": round(float(result["altitude_agl"][i]), 2),
+        "height_source": "sonar" if result["sonar_used"][i] else "altitude",
+        "footprint_m": [
+            round(float(result["footprint_w"][i]), 2),
+            round(float(result["footprint_h"][i]), 2),
+        ],
+        "telemetry_dt": round(float(result["dt"][i]), 3),
+    }
+
+
+def _parse_size(value, default):
+    try:
+        w, h = value.lower().split("x")
+        return int(w), int(h)
+    except (AttributeError, ValueError):
+        return default
+
+
+TELEMETRY_HISTORY_SIZE = int(os.getenv("TELEMETRY_HISTORY_SIZE", "36000"))
+GEOREF_MAX_GAP = float(os.getenv("GEOREF_MAX_GAP", "1.0"))
+CAMERA_HFOV = float(os.getenv("CAMERA_HFOV", "55"))
+CAMERA_VFOV = float(os.getenv("CAMERA_VFOV", "35"))
+CAMERA_TILT = float(os.getenv("CAMERA_TILT", "0"))
+CAMERA_IMAGE_SIZE = _parse_size(os.getenv("CAMERA_IMAGE_SIZE"), (640, 480))
+SONAR_MAX_RANGE = float(os.getenv("SONAR_MAX_RANGE", "7.0"))
+
+# Instance bersama: diisi snapshot Pixhawk, dipakai fire pipeline
+telemetry_history = TelemetryHistory(capacity=TELEMETRY_HISTORY_SIZE, max_gap=GEOREF_MAX_GAP)
+georeferencer = Georeferencer(
+    telemetry_history,
+    hfov=CAMERA_HFOV,
+    vfov=CAMERA_VFOV,
+    camera_tilt=CAMERA_TILT,
+    sonar_max=SONAR_MAX_RANGE,
+    image_size=CAMERA_IMAGE_SIZE,
+)
@@ -1,15 +1,31 @@
 from dronekit import connect
 import time
 import json
+import threading
+from collections import namedtuple
 from pymavlink import mavutil
 
 _vehicle_connection = None
 
+# Snapshot telemetry immutable: dibuat ulang oleh thread ingest, dibaca tanpa lock
+TelemetrySnapshot = namedtuple("TelemetrySnapshot", ["version", "timestamp", "data"])
 
-class PixhawkHelper:
-    def __init__(self, device=None, baud=57600):
-        global _vehicle_connection
+INGEST_RECV_TIMEOUT = 0.1   # detik, batas blocking recv_match di thread ingest
+RATE_WINDOW = 1.0           # detik, jendela perhitungan message rate
 
+
+class PixhawkHelper:
+    def __init__(self, device=None, baud=57600, autoconnect=True, heartbeat_timeout=30):
+        """
+        autoconnect       : langsung konek di konstruktor (memblokir hingga
+                            heartbeat_timeout per port). False untuk proses yang
+                            tidak boleh memegang link MAVLink (mis. worker web)
+                            atau yang konek lewat connect_in_background().
+        heartbeat_timeout : detik menunggu heartbeat pertama per port
+        """
+        self.device = device
+        self.baud = baud
+        self.heartbeat_timeout = heartbeat_timeout
         self.vehicle = None
         self.master = None
         self.fallback_mode = False
@@ -28,6 +44,31 @@ class PixhawkHelper:
         self._last_alt = None
         self._last_sonar = None  # ✅ FIX: inisialisasi sonar
 
+        # Thread ingest MAVLink + snapshot terbaru
+        self._ingest_thread = None
+        self._ingest_stop = threading.Event()
+        self._msg_rate = 0.0
+        self._snapshot = TelemetrySnapshot(0, None, None)
+        self._snapshot_listeners = []
+
+        # Thread koneksi background (retry dengan exponential backoff)
+        self._connect_thread = None
+        self._connect_stop = threading.Event()
+        self.connect_state = "idle"
+        self.connect_attempts = 0
+        self.next_retry_at = None
+        self.connected_at = None
+
+        if autoconnect:
+            self.connect()
+
+    def connect(self):
+        """Coba konek ke Pixhawk; jika gagal aktifkan fallback. Return True jika terhubung."""
+        global _vehicle_connection
+
+        device, baud = self.device, self.baud
+        self.fallback_mode = False
+
         # ============================================================
         # 🔥 FIX: hanya gunakan dua port ini
         # ============================================================
@@ -47,7 +88,7 @@ class PixhawkHelper:
                 _vehicle_connection = connect(
                     dev,
                     wait_ready=False,
-                    heartbeat_timeout=30,
+                    heartbeat_timeout=self.heartbeat_timeout,
                     baud=baud
                 )
 
@@ -66,7 +107,11 @@ class PixhawkHelper:
         if not connected:
             print("🟡 Tidak ada koneksi aktif. Mode fallback aktif.")
             self.fallback_mode = True
-            return
+            self.connect_state = "fallback"
+            return False
+
+        self.connect_state = "connected"
+        self.connected_at = time.time()
 
         # ============================================================
         # Backup MAVLink manual jika diperlukan
@@ -78,8 +123,100 @@ class PixhawkHelper:
             except Exception as e:
                 print(f"⚠️ Tidak bisa fallback: {e}")
                 self.master = None
+        return True
 
     # ==============================================================
+    # Koneksi background (server tidak menunggu heartbeat)
+    # ==============================================================
+
+    def connect_in_background(self, initial_backoff=1.0, max_backoff=60.0):
+        """
+        Coba connect() di thread terpisah; jika gagal ulangi dengan jeda
+        initial_backoff, 2x, 4x, ... maksimal max_backoff detik. Setelah
+        terhubung thread ingest langsung dijalankan. Aman dipanggil berulang kali.
+        """
+        if self._connect_thread and self._connect_thread.is_alive():
+            return
+        if self.vehicle:
+            self.start_ingest()
+            return
+
+        self._connect_stop.clear()
+        self.connect_state = "connecting"
+        self._connect_thread = threading.Thread(
+            target=self._connect_loop, args=(initial_backoff, max_backoff),
+            name="mavlink-connect", daemon=True,
+        )
+        self._connect_thread.start()
+
+    def _connect_loop(self, initial_backoff, max_backoff):
+        backoff = initial_backoff
+        while not self._connect_stop.is_set():
+            self.connect_attempts += 1
+            self.connect_state = "connecting"
+            self.next_retry_at = None
+            try:
+                connected = self.connect()
+            except Exception as e:
+                print(f"⚠️ Error koneksi Pixhawk: {e}")
+                connected = False
+
+            if connected:
+                self.start_ingest()
+                return
+
+            self.connect_state = "retrying"
+            self.next_retry_at = time.time() + backoff
+            print(f"🔁 Koneksi Pixhawk dicoba lagi dalam {backoff:g}s (percobaan ke-{self.connect_attempts})")
+            self._connect_stop.wait(backoff)
+            backoff = min(backoff * 2, max_backoff)
+
+    def stop_connecting(self, timeout=1.0):
+        self._connect_stop.set()
+        if self._connect_thread:
+            self._connect_thread.join(timeout)
+        self._connect_thread = None
+
+    def get_connection_state(self):
+        """State koneksi untuk /api/ready (tanpa I/O)."""
+        return {
+            "state": self.connect_state,
+            "device": self.device,
+            "attempts": self.connect_attempts,
+            "next_retry_in": (
+                round(max(self.next_retry_at - time.time(), 0), 1)
+                if self.next_retry_at else None
+            ),
+            "connected_at": self.connected_at,
+            "ingesting": self.is_ingesting(),
+        }
+
+    # ==============================================================
+
+    def _handle_message(self, msg):
+        mtype = msg.get_type()
+        self.msgs_in_interval += 1
+
+        # -------------------------------
+        # HEARTBEAT
+        # -------------------------------
+        if mtype == "HEARTBEAT":
+            self._last_hb_seen = time.time()
+
+        # -------------------------------
+        # GPS FIX
+        # -------------------------------
+        if mtype == "GLOBAL_POSITION_INT":
+            self._last_lat = msg.lat / 1e7
+            self._last_lon = msg.lon / 1e7
+            self._last_alt = msg.relative_alt / 1000.0  # mm → meter
+
+        # ✅ SONAR / DISTANCE SENSOR (FIXED)
+        if mtype == "DISTANCE_SENSOR":
+            dist = getattr(msg, "current_distance", None)
+            if dist is not None:
+                # cm → meter
+                self._last_sonar = dist / 100.0
 
     def _poll_incoming_messages(self):
         if not self.master:
@@ -90,34 +227,101 @@ class PixhawkHelper:
                 msg = self.master.recv_match(blocking=False)
                 if msg is None:
                     break
-
-                mtype = msg.get_type()
-                self.msgs_in_interval += 1
-
-                # -------------------------------
-                # HEARTBEAT
-                # -------------------------------
-                if mtype == "HEARTBEAT":
-                    self._last_hb_seen = time.time()
-
-                # -------------------------------
-                # GPS FIX
-                # -------------------------------
-                if mtype == "GLOBAL_POSITION_INT":
-                    self._last_lat = msg.lat / 1e7
-                    self._last_lon = msg.lon / 1e7
-                    self._last_alt = msg.relative_alt / 1000.0  # mm → meter
-
-                # ✅ SONAR / DISTANCE SENSOR (FIXED)
-                if mtype == "DISTANCE_SENSOR":
-                    dist = getattr(msg, "current_distance", None)
-                    if dist is not None:
-                        # cm → meter
-                        self._last_sonar = dist / 100.0
+                self._handle_message(msg)
 
         except Exception as e:
             print("⚠️ _poll_incoming_messages error:", e)
 
+    # ==============================================================
+    # Thread ingest MAVLink
+    # ==============================================================
+
+    def start_ingest(self):
+        """
+        Jalankan satu thread penerima MAVLink yang membaca recv_match terus-menerus
+        dan mempublikasikan snapshot telemetry. Aman dipanggil berulang kali.
+        """
+        if self.fallback_mode or not self.vehicle:
+            return False
+        if self._ingest_thread and self._ingest_thread.is_alive():
+            return True
+
+        self._ingest_stop.clear()
+        self._ingest_thread = threading.Thread(
+            target=self._ingest_loop, name="mavlink-ingest", daemon=True
+        )
+        self._ingest_thread.start()
+        print("✅ Thread ingest MAVLink aktif")
+        return True
+
+    def stop_ingest(self, timeout=2.0):
+        self._ingest_stop.set()
+        if self._ingest_thread:
+            self._ingest_thread.join(timeout)
+        self._ingest_thread = None
+
+    def is_ingesting(self):
+        return bool(self._ingest_thread and self._ingest_thread.is_alive())
+
+    def _ingest_loop(self):
+        while not self._ingest_stop.is_set():
+            try:
+                if self.master:
+                    # Blocking singkat agar thread tidak busy-loop, lalu kuras sisa antrean
+                    msg = self.master.recv_match(blocking=True, timeout=INGEST_RECV_TIMEOUT)
+                    while msg is not None:
+                        self._handle_message(msg)
+                        msg = self.master.recv_match(blocking=False)
+                else:
+                    time.sleep(INGEST_RECV_TIMEOUT)
+
+                if time.time() - self.last_time >= RATE_WINDOW:
+                    self._msg_rate = self._calculate_message_rate()
+
+                self._publish_snapshot()
+
+            except Exception as e:
+                print("⚠️ Error thread ingest MAVLink:", e)
+                time.sleep(0.5)
+
+    def _publish_snapshot(self):
+        """Bangun dict telemetry baru; versi hanya naik jika isinya berubah."""
+        data = self._build_telemetry()
+        current = self._snapshot
+        if data == current.data:
+            return current
+
+        # Penggantian referensi atomik → pembaca tidak perlu lock
+        snapshot = TelemetrySnapshot(current.version + 1, time.time(), data)
+        self._snapshot = snapshot
+
+        for listener in self._snapshot_listeners:
+            try:
+                listener(snapshot)
+            except Exception as e:
+                print(f"⚠️ Error listener snapshot telemetry: {e}")
+        return snapshot
+
+    def add_snapshot_listener(self, callback):
+        """callback(snapshot) dipanggil di thread ingest untuk setiap snapshot baru."""
+        self._snapshot_listeners.append(callback)
+
+    def get_snapshot(self):
+        """Snapshot telemetry terakhir (version, timestamp, data) dalam O(1)."""
+        return self._snapshot
+
+    def get_link_stats(self):
+        """Statistik kualitas link MAVLink dari thread ingest."""
+        stats = self._get_mavlink_stats()
+        return {
+            "msg_rate": self._msg_rate,
+            "packet_loss": stats.get("packet_loss") or self.current_packet_loss,
+            "rx_rate": stats.get("rx_rate"),
+            "tx_rate": stats.get("tx_rate"),
+            "heartbeat_delay": self._compute_heartbeat_delay(),
+            "snapshot_version": self._snapshot.version,
+        }
+
     # ==============================================================
 
     def _calculate_message_rate(self):
@@ -150,52 +354,58 @@ class PixhawkHelper:
     # ==============================================================
 
     def get_telemetry(self):
+        """
+        Telemetry terbaru. Jika thread ingest berjalan, kembalikan snapshot
+        tanpa menyentuh socket (jangan dimodifikasi oleh pemanggil).
+        """
         if self.fallback_mode or not self.vehicle:
             return None
 
+        if self.is_ingesting():
+            return self._snapshot.data
+
         try:
             self._poll_incoming_messages()
-
-            msg_rate = self._calculate_message_rate()
-            stats = self._get_mavlink_stats()
-
-            packet_loss = stats.get("packet_loss") or self.current_packet_loss
-            hb_delay = self._compute_heartbeat_delay()
-
-            gps = getattr(self.vehicle, "gps_0", None)
-            att = getattr(self.vehicle, "attitude", None)
-            bat = getattr(self.vehicle, "battery", None)
-
-            def safe_round(v, nd=6):
-                try:
-                    return round(v, nd)
-                except:
-                    return None
-
-            return {
-                "source": "pixhawk",
-                "latitude": self._last_lat,
-                "longitude": self._last_lon,
-                "altitude": self._last_alt,
-                "sonar_range": self._last_sonar,  # ✅ dikirim ke API
-
-                "battery": safe_round(getattr(bat, "level", None)) if bat else None,
-                "heading": safe_round(getattr(self.vehicle, "heading", None)),
-                "airspeed": safe_round(getattr(self.vehicle, "airspeed", None)),
-                "groundspeed": safe_round(getattr(self.vehicle, "groundspeed", None)),
-
-                "attitude": {
-                    "roll": safe_round(getattr(att, "roll", None)),
-                    "pitch": safe_round(getattr(att, "pitch", None)),
-                    "yaw": safe_round(getattr(att, "yaw", None)),
-                } if att else {},
-
-                "gps": {
-                    "fix_type": getattr(gps, "fix_type", None),
-                    "satellites_visible": getattr(gps, "satellites_visible", None),
-                }
-            }
+            self._msg_rate = self._calculate_message_rate()
+            return self._publish_snapshot().data
 
         except Exception as e:
             print("⚠️ Error telemetry:", e)
             return None
+
+    def _build_telemetry(self):
+        gps = getattr(self.vehicle, "gps_0", None)
+        att = getattr(self.vehicle, "attitude", None)
+        bat = getattr(self.vehicle, "battery", None)
+
+        def safe_round(v, nd=6):
+            try:
+                return round(v, nd)
+            except:
+                return None
+
+        return {
+            "source": "pixhawk",
+            "latitude": self._last_lat,
+            "longitude": self._last_lon,
+            "altitude": self._last_alt,
+            "sonar_range": self._last_sonar,  # ✅ dikirim ke API
+
+            "battery": safe_round(getattr(bat, "level", None)) if bat else None,
+            "heading": safe_round(getattr(self.vehicle, "heading", None)),
+            "airspeed": safe_round(getattr(self.vehicle, "airspeed", None)),
+            "groundspeed": safe_round(getattr(self.vehicle, "groundspeed", None)),
+            "armed": getattr(self.vehicle, "armed", None),
+            "mode": getattr(getattr(self.vehicle, "mode", None), "name", None),
+
+            "attitude": {
+                "roll": safe_round(getattr(att, "roll", None)),
+                "pitch": safe_round(getattr(att, "pitch", None)),
+                "yaw": safe_round(getattr(att, "yaw", None)),
+            } if att else {},
+
+            "gps": {
+                "fix_type": getattr(gps, "fix_type", None),
+                "satellites_visible": getattr(gps, "satellites_visible", None),
+            }
+        }
@@ -0,0 +1,190 @@
+# backend/utils/profile_images.py
+import base64
+import hashlib
+import os
+import re
+import threading
+from collections import OrderedDict
+
+import cv2
+import numpy as np
+
+from backend.database.db import default_bucket
+from backend.utils.async_runtime import blocking_io
+
+# =====================================================
+# Profile Image Store (content-addressed, Firebase Storage)
+# =====================================================
+# Foto profil tidak lagi disimpan sebagai data: base64 di /users/{id}.
+# Upload di-hash (sha256) → image_id; setiap ukuran disimpan sebagai objek
+# immutable profile_images/<image_id>/<size>.jpg. Foto yang sama (dari user
+# mana pun) hanya diupload sekali. Record user cukup menyimpan profileImageId.
+
+IMAGE_ID_PATTERN = re.compile(r"^[0-9a-f]{32}$")
+IMMUTABLE_CACHE_CONTROL = "public, max-age=31536000, immutable"
+
+# Nama ukuran → sisi (px). Thumbnail dipotong persegi dari tengah,
+# "full" mempertahankan rasio dengan sisi terpanjang maksimum.
+SIZES = {"64": 64, "256": 256, "full": 1024}
+THUMBNAIL_SIZES = ("64", "256")
+
+
+class InvalidImageError(ValueError):
+    pass
+
+
+def decode_data_url(data_url):
+    """'data:image/png;base64,...' → bytes (None jika bukan data URL)."""
+    if not isinstance(data_url, str) or not data_url.startswith("data:"):
+        return None
+    try:
+        return base64.b64decode(data_url.split(",", 1)[1])
+    except (IndexError, ValueError):
+        return None
+
+
+def _center_square(img):
+    h, w = img.shape[:2]
+    side = min(h, w)
+    y, x = (h - side) // 2, (w - side) // 2
+    return img[y:y + side, x:x + side]
+
+
+def render_sizes(data, quality=85):
+    """Decode gambar upload lalu hasilkan JPEG untuk setiap ukuran di SIZES."""
+    img = cv2.imdecode(np.frombuffer(data, dtype=np.uint8), cv2.IMREAD_UNCHANGED)
+    if img is None:
+        raise InvalidImageError("File bukan gambar yang valid")
+
+    if img.ndim == 2:
+        img = cv2.cvtColor(img, cv2.COLOR_GRAY2BGR)
+    elif img.shape[2] == 4:
+        # Latar transparan → putih
+        alpha = img[:, :, 3:4].astype(np.float32) / 255.0
+        img = (img[:, :, :3] * alpha + 255 * (1 - alpha)).astype(np.uint8)
+    if img.dtype != np.uint8:
+        img = cv2.convertScaleAbs(img, alpha=255.0 / max(float(img.max()), 1.0))
+
+    rendered = {}
+    for name, side in SIZES.items():
+        src = _center_square(img) if name in THUMBNAIL_SIZES else img
+        h, w = src.shape[:2]
+        scale = side / float(max(h, w))
+        if scale < 1.0:
+            src = cv2.resize(src, (max(1, round(w * scale)), max(1, round(h * scale))),
+                             interpolation=cv2.INTER_AREA)
+        ok, buf = cv2.imencode(".jpg", src, [cv2.IMWRITE_JPEG_QUALITY, quality])
+        if not ok:
+            raise InvalidImageError("Gagal meng-encode gambar")
+        rendered[name] = buf.tobytes()
+    return rendered
+
+
+class ProfileImageStore:
+    def __init__(self, prefix="profile_images", max_upload_bytes=5 * 1024 * 1024,
+                 memory_budget=8 * 1024 * 1024, bucket_factory=None):
+        """
+        prefix           : folder objek di Firebase Storage
+        max_upload_bytes : ukuran upload maksimum
+        memory_budget    : byte maksimum cache bytes gambar di memori (LRU)
+        """
+        self.prefix = prefix
+        self.max_upload_bytes = max_upload_bytes
+        self.memory_budget = memory_budget
+        self._bucket_factory = bucket_factory
+        self._bucket = None
+
+        self._lock = threading.Lock()
+        self._memory = OrderedDict()    # (image_id, size) → bytes
+        self._memory_bytes = 0
+
+        # Statistik
+        self.uploads = 0
+        self.dedup_hits = 0
+        self.memory_hits = 0
+        self.downloads = 0
+
+    def _get_bucket(self):
+        if self._bucket is None:
+            self._bucket = (self._bucket_factory or default_bucket)()
+        return self._bucket
+
+    def _path(self, image_id, size):
+        return f"{self.prefix}/{image_id}/{size}.jpg"
+
+    def _remember(self, key, data):
+        with self._lock:
+            if key in self._memory or len(data) > self.memory_budget:
+                return
+            self._memory[key] = data
+            self._memory_bytes += len(data)
+            while self._memory_bytes > self.memory_budget:
+                _, evicted = self._memory.popitem(last=False)
+                self._memory_bytes -= len(evicted)
+
+    # ==============================================================
+
+    def save(self, data):
+        """Simpan gambar upload; return image_id (sama untuk konten yang sama)."""
+        if not data:
+            raise InvalidImageError("File gambar kosong")
+        if len(data) > self.max_upload_bytes:
+            raise InvalidImageError(
+                f"Ukuran gambar maksimal {self.max_upload_bytes // (1024 * 1024)} MB"
+            )
+
+        image_id = hashlib.sha256(data).hexdigest()[:32]
+        bucket = self._get_bucket()
+
+        # Objek "full" ditulis terakhir → keberadaannya menandakan semua ukuran lengkap
+        if blocking_io.run(bucket.blob(self._path(image_id, "full")).exists):
+            self.dedup_hits += 1
+            return image_id
+
+        rendered = blocking_io.run(render_sizes, data)
+        for name in sorted(rendered, key=lambda n: n == "full"):
+            blob = bucket.blob(self._path(image_id, name))
+            blob.cache_control = IMMUTABLE_CACHE_CONTROL
+            blocking_io.run(blob.upload_from_string, rendered[name], content_type="image/jpeg")
+            self._remember((image_id, name), rendered[name])
+        self.uploads += 1
+        return image_id
+
+    def get_bytes(self, image_id, size="256"):
+        """Bytes JPEG untuk ukuran tertentu, atau None jika tidak ada."""
+        if not IMAGE_ID_PATTERN.match(image_id or "") or size not in SIZES:
+            return None
+
+        key = (image_id, size)
+        with self._lock:
+            data = self._memory.get(key)
+            if data is not None:
+                self._memory.move_to_end(key)
+                self.memory_hits += 1
+                return data
+
+        blob = self._get_bucket().blob(self._path(image_id, size))
+        try:
+            data = blocking_io.run(blob.download_as_bytes)
+        except Exception as e:
+            # google.api_core NotFound, dll.
+            print(f"⚠️ Gagal mengambil foto profil {image_id}/{size}: {e}")
+            return None
+        self.downloads += 1
+        self._remember(key, data)
+        return data
+
+    def get_stats(self):
+        return {
+            "uploads": self.uploads,
+            "dedup_hits": self.dedup_hits,
+            "memory_hits": self.memory_hits,
+            "downloads": self.downloads,
+            "memory_bytes": self._memory_bytes,
+        }
+
+
+PROFILE_IMAGE_MAX_MB = float(os.getenv("PROFILE_IMAGE_MAX_MB", "5"))
+
+# Instance bersama untuk user blueprint
+profile_images = ProfileImageStore(max_upload_bytes=int(PROFILE_IMAGE_MAX_MB * 1024 * 1024))
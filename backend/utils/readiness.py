@@ -0,0 +1,66 @@
+# backend/utils/readiness.py
+import threading
+import time
+
+# =====================================================
+# Readiness subsystem (GET /api/ready)
+# =====================================================
+# Server bind secepatnya; Firebase, GCS, link MAVLink, dan sensor ingest
+# disiapkan di background / saat pertama dipakai. Setiap subsystem mendaftarkan
+# probe murah (tanpa I/O) yang mengembalikan state-nya:
+#   pending  : belum dicoba (lazy, menunggu pemakaian pertama)
+#   starting : sedang diinisialisasi / mencoba konek
+#   ready    : siap dipakai
+#   degraded : berjalan dengan fallback (mis. Pixhawk belum terhubung)
+#   failed   : gagal, akan dicoba ulang
+#   disabled : tidak dijalankan di proses ini (mis. worker web)
+# /api/ready = 200 jika semua subsystem wajib (required) berstatus ready.
+
+PENDING = "pending"
+STARTING = "starting"
+READY = "ready"
+DEGRADED = "degraded"
+FAILED = "failed"
+DISABLED = "disabled"
+
+
+class Readiness:
+    def __init__(self):
+        self._probes = {}
+        self._lock = threading.Lock()
+        self.started_at = time.time()
+
+    def register(self, name, probe, required=True):
+        """
+        probe    : fungsi tanpa argumen → dict dengan minimal key "state"
+        required : subsystem wajib ready agar proses dianggap ready
+        """
+        with self._lock:
+            self._probes[name] = (probe, required)
+
+    def get_status(self):
+        with self._lock:
+            probes = list(self._probes.items())
+
+        subsystems = {}
+        ready = True
+        for name, (probe, required) in probes:
+            try:
+                status = dict(probe() or {})
+            except Exception as e:
+                status = {"state": FAILED, "error": str(e)}
+            status.setdefault("state", PENDING)
+            status["required"] = required
+            subsystems[name] = status
+            if required and status["state"] != READY:
+                ready = False
+
+        return {
+            "ready": ready,
+            "uptime": round(time.time() - self.started_at, 3),
+            "subsystems": subsystems,
+        }
+
+
+# Instance bersama untuk seluruh proses
+readiness = Readiness()
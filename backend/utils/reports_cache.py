@@ -0,0 +1,240 @@
+# backend/utils/reports_cache.py
+import bisect
+import hashlib
+import math
+import threading
+import time
+
+from firebase_admin import db
+
+from backend.utils.async_runtime import blocking_io
+
+from backend.utils.fire_pipeline import parse_timestamp
+from backend.utils.spatial_index import SpatialIndex, get_lat_lon
+
+# =====================================================
+# Server-side cache untuk /fire_reports
+# =====================================================
+# Tree /fire_reports hanya diunduh saat cache kosong/invalid atau TTL habis.
+# Laporan baru dari fire pipeline di-upsert langsung (write-through) lewat
+# event bus, dan setiap perubahan menaikkan versi yang dipakai sebagai ETag.
+# Laporan berlokasi juga masuk spatial index (query radius & clustering).
+
+
+def report_time(report):
+    dt = parse_timestamp(report.get("timestamp")) if isinstance(report, dict) else None
+    return dt.timestamp() if dt else 0.0
+
+
+class ReportsCache:
+    def __init__(self, path="/fire_reports", ttl=300.0, cell_m=250.0, wait_timeout=30.0):
+        """
+        path         : node RealtimeDB laporan
+        ttl          : detik; reload penuh berkala untuk menangkap penulisan dari luar backend
+        cell_m       : ukuran sel grid spatial index (meter)
+        wait_timeout : detik; batas tunggu request yang menumpang reload lain
+        """
+        self.path = path
+        self.ttl = ttl
+        self.wait_timeout = wait_timeout
+        self.spatial = SpatialIndex(cell_m)
+        self._clusters = {}     # (version, radius) → hasil clusters()
+
+        self._lock = threading.RLock()
+        self._reports = {}      # report_id → report
+        self._index = []        # [(timestamp_epoch, report_id)] urut naik
+        self._loaded_at = None
+        self._loading = None    # threading.Event selama reload berjalan
+        self.version = 0
+
+        # Statistik
+        self.loads = 0
+        self.coalesced = 0
+        self.upserts = 0
+
+    # ==============================================================
+
+    def _is_fresh(self):
+        return self._loaded_at is not None and time.time() - self._loaded_at < self.ttl
+
+    def ensure_loaded(self):
+        if self._is_fresh():
+            return
+
+        # Single-flight: saat TTL habis hanya satu request yang mengunduh ulang tree
+        with self._lock:
+            if self._is_fresh():
+                return
+            loading = self._loading
+            leader = loading is None
+            if leader:
+                loading = self._loading = threading.Event()
+            else:
+                self.coalesced += 1
+
+        if not leader:
+            if not loading.wait(self.wait_timeout) and self._loaded_at is None:
+                raise TimeoutError(f"Timeout menunggu unduhan {self.path} ({self.wait_timeout:g}s)")
+            if self._loaded_at is None:
+                raise RuntimeError(f"Gagal memuat {self.path}")
+            return
+
+        try:
+            try:
+                data = blocking_io.run(db.reference(self.path).get) or {}
+            except Exception as e:
+                if self._loaded_at is None:
+                    raise
+                # Reload gagal → tetap sajikan data lama, dicoba lagi pada request berikutnya
+                print(f"⚠️ Gagal memuat ulang {self.path}, memakai cache lama: {e}")
+                return
+
+            with self._lock:
+                self._reports = {k: v for k, v in data.items() if isinstance(v, dict)}
+                self._index = sorted((report_time(v), k) for k, v in self._reports.items())
+                self.spatial.rebuild(
+                    (k, *latlon) for k, latlon in
+                    ((k, get_lat_lon(v)) for k, v in self._reports.items()) if latlon
+                )
+                self._loaded_at = time.time()
+                self.version += 1
+                self.loads += 1
+        finally:
+            with self._lock:
+                self._loading = None
+            loading.set()
+
+    def invalidate(self):
+        with self._lock:
+            self._loaded_at = None
+
+    def upsert(self, report_id, report):
+        """Masukkan/perbarui satu laporan tanpa mengunduh ulang seluruh tree."""
+        with self._lock:
+            if self._loaded_at is None:
+                return  # reload berikutnya sudah akan memuat laporan ini
+
+            old = self._reports.get(report_id)
+            if old is not None:
+                entry = (report_time(old), report_id)
+                i = bisect.bisect_left(self._index, entry)
+                if i < len(self._index) and self._index[i] == entry:
+                    self._index.pop(i)
+
+            self._reports[report_id] = report
+            bisect.insort(self._index, (report_time(report), report_id))
+
+            latlon = get_lat_lon(report)
+            if latlon:
+                self.spatial.upsert(report_id, *latlon)
+            else:
+                self.spatial.remove(report_id)
+            self.version += 1
+            self.upserts += 1
+
+    def on_fire_report(self, topic, result):
+        """Subscriber event bus 'fire_report'."""
+        if result.get("report") is not None and result.get("status") != "duplicate":
+            self.upsert(result["incident_id"], result["report"])
+
+    # ==============================================================
+
+    def query(self, limit=50, before=None, after=None, since=None, until=None,
+              severities=None):
+        """
+        Laporan terbaru lebih dulu. Return (items, next_cursor, total_match).
+        before/after : cursor (timestamp_epoch, report_id) atau timestamp epoch saja (eksklusif)
+        since/until  : jendela waktu epoch (inklusif)
+        next_cursor  : (timestamp_epoch, report_id) item terakhir → 'before' halaman berikutnya.
+                       Laporan dengan timestamp sama di batas halaman tidak terlewat.
+        """
+        self.ensure_loaded()
+
+        with self._lock:
+            index = self._index
+            # Posisi [lo, hi) di index urut (timestamp, report_id)
+            hi, lo = len(index), 0
+            if before is not None:
+                key = before if isinstance(before, tuple) else (before,)
+                hi = min(hi, bisect.bisect_left(index, key))
+            if until is not None:
+                hi = min(hi, bisect.bisect_left(index, (math.nextafter(until, math.inf),)))
+            if since is not None:
+                lo = max(lo, bisect.bisect_left(index, (since,)))
+            if after is not None:
+                if isinstance(after, tuple):
+                    lo = max(lo, bisect.bisect_right(index, after))
+                else:
+                    lo = max(lo, bisect.bisect_left(index, (math.nextafter(after, math.inf),)))
+
+            items = []
+            total = 0
+            next_cursor = None
+            for i in range(hi - 1, lo - 1, -1):
+                ts, report_id = index[i]
+                report = self._reports[report_id]
+                if severities and report.get("severity") not in severities:
+                    continue
+                total += 1
+                if len(items) < limit:
+                    items.append((report_id, report))
+                    next_cursor = (ts, report_id)
+            has_more = total > len(items)
+
+        return items, (next_cursor if has_more else None), total
+
+    def recent(self, limit=50):
+        """[(report_id, report)] terbaru lebih dulu (recovery incident aktif)."""
+        items, _, _ = self.query(limit=limit)
+        return items
+
+    def get(self, report_id):
+        self.ensure_loaded()
+        return self._reports.get(report_id)
+
+    def nearby(self, lat, lon, radius_m, limit=50, since=None, severities=None):
+        """
+        Laporan dalam radius (meter) dari titik, terdekat lebih dulu.
+        Return list (report_id, report, jarak_m).
+        """
+        self.ensure_loaded()
+        items = []
+        for report_id, dist in self.spatial.nearby(lat, lon, radius_m):
+            report = self._reports.get(report_id)
+            if report is None:
+                continue
+            if severities and report.get("severity") not in severities:
+                continue
+            if since is not None and report_time(report) < since:
+                continue
+            items.append((report_id, report, dist))
+            if len(items) >= limit:
+                break
+        return items
+
+    def clusters(self, radius_m):
+        """Kelompok laporan yang saling berdekatan (di-cache per versi data)."""
+        self.ensure_loaded()
+        key = (self.version, radius_m)
+        cached = self._clusters.get(key)
+        if cached is None:
+            cached = self.spatial.clusters(radius_m)
+            self._clusters = {key: cached}
+        return cached
+
+    def etag(self, *query_args):
+        raw = f"{self.version}|{self._loaded_at}|{query_args}".encode("utf-8")
+        return hashlib.sha1(raw).hexdigest()[:20]
+
+    def get_stats(self):
+        return {
+            "reports": len(self._reports),
+            "version": self.version,
+            "loads": self.loads,
+            "coalesced": self.coalesced,
+            "upserts": self.upserts,
+            "spatial": self.spatial.get_stats(),
+        }
+
+
+reports_cache = ReportsCache()
@@ -0,0 +1,173 @@
+# backend/utils/sensor_ingest.py
+import os
+import threading
+from abc import ABC, abstractmethod
+
+from firebase_admin import firestore
+
+from backend.utils.event_bus import event_bus
+from backend.utils.firestore_cache import get_firestore, latest_docs
+
+# =====================================================
+# Sensor Ingest (Firestore → Event Bus)
+# =====================================================
+# Sumber data sensor mempublikasikan dokumen terbaru ke event bus dengan
+# topic = nama collection dan payload {"id": doc_id, "data": dict}.
+#   - listener : Firestore on_snapshot (push, tanpa polling)
+#   - poll     : query berkala via cache TTL (mode lama)
+#   - fake     : sumber lokal untuk pengujian/development tanpa Firestore
+#   - relay    : worker non-leader, event diteruskan leader lewat cluster bus
+
+SENSOR_COLLECTIONS = ("sensors_thermal", "sensors_env")
+
+
+class _BaseSource(ABC):
+    mode = None
+
+    def __init__(self, collections=SENSOR_COLLECTIONS, bus=event_bus):
+        self.collections = collections
+        self.bus = bus
+        self.active = False
+        self._last = {}
+
+    def _emit(self, collection, doc_id, data):
+        """Publish hanya jika dokumen terbaru (id atau isinya) berubah."""
+        if data is None or self._last.get(collection) == (doc_id, data):
+            return False
+        self._last[collection] = (doc_id, data)
+        latest_docs.put(collection, doc_id, data)
+        self.bus.publish(collection, {"id": doc_id, "data": data})
+        return True
+
+    @abstractmethod
+    def start(self):
+        """Mulai menerima dokumen; set self.active = True jika berhasil."""
+
+    def stop(self):
+        self.active = False
+
+
+class FirestoreListenerSource(_BaseSource):
+    mode = "listener"
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._watches = []
+
+    def start(self):
+        fs = get_firestore()
+        for collection in self.collections:
+            query = (
+                fs.collection(collection)
+                .order_by("timestamp", direction=firestore.Query.DESCENDING)
+                .limit(1)
+            )
+            self._watches.append(query.on_snapshot(self._make_callback(collection)))
+        self.active = True
+        print(f"👂 Firestore snapshot listener aktif: {', '.join(self.collections)}")
+
+    def _make_callback(self, collection):
+        def on_snapshot(docs, changes, read_time):
+            if docs:
+                self._emit(collection, docs[0].id, docs[0].to_dict())
+        return on_snapshot
+
+    def stop(self):
+        for watch in self._watches:
+            try:
+                watch.unsubscribe()
+            except Exception as e:
+                print(f"⚠️ Gagal unsubscribe listener Firestore: {e}")
+        self._watches = []
+        super().stop()
+
+
+class PollingSource(_BaseSource):
+    mode = "poll"
+
+    def __init__(self, *args, interval=30.0, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.interval = interval
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="sensor-poll", daemon=True)
+        self._thread.start()
+        self.active = True
+        print(f"🔁 Polling Firestore tiap {self.interval:g}s: {', '.join(self.collections)}")
+
+    def _run(self):
+        while not self._stop.is_set():
+            for collection in self.collections:
+                try:
+                    latest = latest_docs.get_latest(collection)
+                    if latest:
+                        self._emit(collection, *latest)
+                except Exception as e:
+                    print(f"⚠️ Error polling {collection}: {e}")
+            self._stop.wait(self.interval)
+
+    def stop(self):
+        self._stop.set()
+        super().stop()
+
+
+class FakeListenerSource(_BaseSource):
+    """Sumber lokal: panggil push() untuk mensimulasikan snapshot Firestore."""
+    mode = "fake"
+
+    def start(self):
+        self.active = True
+
+    def push(self, collection, doc_id, data):
+        return self._emit(collection, doc_id, data)
+
+
+class RelaySource(_BaseSource):
+    """
+    Worker non-leader: dokumen sensor datang dari leader ingest lewat event
+    bridge (cluster) dan sudah dipublish ke event bus lokal; tidak ada query.
+    """
+    mode = "relay"
+
+    def start(self):
+        self.active = True
+
+
+def create_sensor_source(mode=None, **kwargs):
+    mode = mode or os.getenv("SENSOR_INGEST_MODE", "listener")
+    if mode == "listener":
+        return FirestoreListenerSource(**kwargs)
+    if mode == "poll":
+        interval = float(os.getenv("SENSOR_POLL_INTERVAL", "30"))
+        return PollingSource(interval=interval, **kwargs)
+    if mode == "fake":
+        return FakeListenerSource(**kwargs)
+    if mode == "relay":
+        return RelaySource(**kwargs)
+    raise ValueError(f"SENSOR_INGEST_MODE tidak dikenal: {mode}")
+
+
+# =====================================================
+# Pembacaan "latest" untuk endpoint HTTP
+# =====================================================
+_source = None
+
+
+def set_active_source(source):
+    global _source
+    _source = source
+
+
+def get_latest_sensor_doc(collection):
+    """
+    (doc_id, data) terbaru. Jika sumber push aktif, ambil dari event bus;
+    jika belum ada event, jatuh ke cache TTL Firestore.
+    """
+    if _source is not None and _source.active:
+        event = event_bus.last(collection)
+        if event:
+            return event["id"], event["data"]
+    return latest_docs.get_latest(collection)
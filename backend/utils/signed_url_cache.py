@@ -0,0 +1,186 @@
+# backend/utils/signed_url_cache.py
+import datetime
+import os
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+from backend.database.db import default_bucket
+from backend.utils.async_runtime import blocking_io
+
+# =====================================================
+# Cache Signed URL Firebase Storage
+# =====================================================
+# generate_signed_url() = operasi tanda tangan RSA dengan key service account.
+# URL disimpan per nama blob beserta waktu kedaluwarsanya:
+#   - sisa umur > RENEW_MARGIN → langsung pakai URL cache (tanpa kripto)
+#   - sisa umur <= RENEW_MARGIN → URL lama tetap dikembalikan, perpanjangan
+#     dikerjakan di background
+#   - belum ada / sudah kedaluwarsa → ditandatangani saat itu juga
+#   - signing gagal (key/IAM rusak) → diingat per blob selama FAILURE_TTL,
+#     request berikutnya langsung mendapat None tanpa mencoba RSA lagi
+# sign_many() menandatangani semua miss dalam satu halaman secara paralel.
+
+
+def public_url(bucket_name, blob_name):
+    """URL publik GCS (fallback jika signing gagal, mis. kredensial tanpa private key)."""
+    return f"https://storage.googleapis.com/{bucket_name}/{blob_name}"
+
+
+class SignedUrlCache:
+    def __init__(self, ttl=3600.0, renew_margin=600.0, max_entries=5000,
+                 workers=4, bucket_factory=None, failure_ttl=30.0):
+        """
+        ttl          : detik; masa berlaku signed URL
+        renew_margin : detik sebelum kedaluwarsa saat URL mulai diperpanjang
+        max_entries  : jumlah URL maksimum di cache (LRU)
+        workers      : thread untuk signing paralel (sign_many & perpanjangan)
+        failure_ttl  : detik; signing yang gagal tidak diulang untuk blob yang sama
+        """
+        self.ttl = ttl
+        self.renew_margin = min(renew_margin, ttl / 2)
+        self.failure_ttl = failure_ttl
+        self.max_entries = max_entries
+        self._bucket_factory = bucket_factory
+        self._bucket = None
+
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()   # blob_name → (url, expires_at)
+        self._failures = OrderedDict()  # blob_name → retry_at (negative cache)
+        self._renewing = set()
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="url-sign")
+
+        # Statistik
+        self.hits = 0
+        self.misses = 0
+        self.renewals = 0
+        self.sign_errors = 0
+        self.negative_hits = 0
+
+    # ==============================================================
+
+    def _get_bucket(self):
+        if self._bucket is None:
+            self._bucket = (self._bucket_factory or default_bucket)()
+        return self._bucket
+
+    @property
+    def bucket_name(self):
+        return self._get_bucket().name
+
+    def _sign(self, blob_name):
+        """Tanda tangani satu URL lalu simpan ke cache. Return URL atau None."""
+        now = time.time()
+        with self._lock:
+            retry_at = self._failures.get(blob_name)
+            if retry_at is not None:
+                if retry_at > now:
+                    self.negative_hits += 1
+                    return None
+                del self._failures[blob_name]
+
+        expires_at = now + self.ttl
+        try:
+            url = blocking_io.run(
+                self._get_bucket().blob(blob_name).generate_signed_url,
+                expiration=datetime.timedelta(seconds=self.ttl),
+                method="GET",
+            )
+        except Exception as e:
+            with self._lock:
+                self.sign_errors += 1
+                self._failures[blob_name] = time.time() + self.failure_ttl
+                self._failures.move_to_end(blob_name)
+                while len(self._failures) > self.max_entries:
+                    self._failures.popitem(last=False)
+            print(f"⚠️ Gagal membuat signed URL '{blob_name}': {e}")
+            return None
+
+        with self._lock:
+            self._entries[blob_name] = (url, expires_at)
+            self._entries.move_to_end(blob_name)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return url
+
+    def _renew(self, blob_name):
+        try:
+            if self._sign(blob_name) is not None:
+                with self._lock:
+                    self.renewals += 1
+        finally:
+            with self._lock:
+                self._renewing.discard(blob_name)
+
+    def _lookup(self, blob_name, now):
+        """URL cache yang masih berlaku (jadwalkan perpanjangan bila perlu), atau None."""
+        with self._lock:
+            entry = self._entries.get(blob_name)
+            if entry is None or entry[1] <= now:
+                self.misses += 1
+                return None
+
+            url, expires_at = entry
+            self._entries.move_to_end(blob_name)
+            self.hits += 1
+            if expires_at - now > self.renew_margin or blob_name in self._renewing:
+                return url
+            self._renewing.add(blob_name)
+
+        self._executor.submit(self._renew, blob_name)
+        return url
+
+    # ==============================================================
+
+    def get_url(self, blob_name):
+        """Signed URL untuk satu blob (None jika signing gagal)."""
+        url = self._lookup(blob_name, time.time())
+        if url is not None:
+            return url
+        return self._sign(blob_name)
+
+    def get_url_or_public(self, blob_name):
+        """Signed URL, atau URL publik jika signing tidak tersedia."""
+        return self.get_url(blob_name) or public_url(self.bucket_name, blob_name)
+
+    def sign_many(self, blob_names):
+        """Signed URL untuk satu halaman blob → {nama: url}; miss ditandatangani paralel."""
+        now = time.time()
+        urls = {}
+        missing = []
+        for name in blob_names:
+            url = self._lookup(name, now)
+            if url is None:
+                missing.append(name)
+            else:
+                urls[name] = url
+
+        if missing:
+            for name, url in zip(missing, self._executor.map(self._sign, missing)):
+                urls[name] = url
+        return urls
+
+    def get_stats(self):
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "hits": self.hits,
+                "misses": self.misses,
+                "renewals": self.renewals,
+                "sign_errors": self.sign_errors,
+                "negative_hits": self.negative_hits,
+                "failing_blobs": len(self._failures),
+            }
+
+
+SIGNED_URL_TTL = float(os.getenv("SIGNED_URL_TTL", "3600"))
+SIGNED_URL_RENEW_MARGIN = float(os.getenv("SIGNED_URL_RENEW_MARGIN", "600"))
+SIGNED_URL_FAILURE_TTL = float(os.getenv("SIGNED_URL_FAILURE_TTL", "30"))
+
+# Instance bersama untuk video blueprint & firebase_helper
+signed_urls = SignedUrlCache(
+    ttl=SIGNED_URL_TTL,
+    renew_margin=SIGNED_URL_RENEW_MARGIN,
+    failure_ttl=SIGNED_URL_FAILURE_TTL,
+)
@@ -0,0 +1,197 @@
+# backend/utils/spatial_index.py
+import math
+import threading
+from collections import defaultdict
+
+import numpy as np
+
+# =====================================================
+# Spatial Index (grid lat/lon) untuk laporan kebakaran
+# =====================================================
+# Titik dikelompokkan ke sel grid berukuran ±CELL_M meter. Query radius hanya
+# memeriksa sel yang bersinggungan dengan bounding box lingkaran, lalu jarak
+# kandidat dihitung sekaligus (haversine NumPy). Insert/hapus O(1), sehingga
+# index bisa diperbarui inkremental setiap ada laporan baru.
+
+EARTH_RADIUS = 6371008.8
+METERS_PER_DEG_LAT = 111320.0
+
+
+def haversine_m(lat1, lon1, lat2, lon2):
+    """Jarak (meter) antar titik; menerima skalar atau array NumPy."""
+    lat1, lon1, lat2, lon2 = map(np.radians, (lat1, lon1, lat2, lon2))
+    a = (
+        np.sin((lat2 - lat1) / 2) ** 2
+        + np.cos(lat1) * np.cos(lat2) * np.sin((lon2 - lon1) / 2) ** 2
+    )
+    return 2 * EARTH_RADIUS * np.arcsin(np.sqrt(np.minimum(a, 1.0)))
+
+
+def get_lat_lon(report):
+    """(lat, lon) dari field location laporan, atau None."""
+    loc = report.get("location") if isinstance(report, dict) else None
+    if not isinstance(loc, dict):
+        return None
+    try:
+        lat, lon = float(loc["latitude"]), float(loc["longitude"])
+    except (KeyError, TypeError, ValueError):
+        return None
+    if not (-90 <= lat <= 90 and -180 <= lon <= 180) or (lat == 0 and lon == 0):
+        return None
+    return lat, lon
+
+
+class SpatialIndex:
+    def __init__(self, cell_m=250.0):
+        """cell_m : ukuran sel grid (meter); sebaiknya setara radius query umum"""
+        self.cell_m = cell_m
+        self.cell_deg = cell_m / METERS_PER_DEG_LAT
+
+        self._lock = threading.Lock()
+        self._cells = defaultdict(set)      # (i, j) → {id}
+        self._points = {}                   # id → (lat, lon, cell)
+
+    def _cell(self, lat, lon):
+        return (math.floor(lat / self.cell_deg), math.floor(lon / self.cell_deg))
+
+    # ==============================================================
+
+    def upsert(self, item_id, lat, lon):
+        cell = self._cell(lat, lon)
+        with self._lock:
+            old = self._points.get(item_id)
+            if old is not None and old[2] != cell:
+                self._discard(item_id, old[2])
+            self._points[item_id] = (lat, lon, cell)
+            self._cells[cell].add(item_id)
+
+    def remove(self, item_id):
+        with self._lock:
+            old = self._points.pop(item_id, None)
+            if old is not None:
+                self._discard(item_id, old[2])
+
+    def _discard(self, item_id, cell):
+        members = self._cells.get(cell)
+        if members is not None:
+            members.discard(item_id)
+            if not members:
+                del self._cells[cell]
+
+    def rebuild(self, points):
+        """Ganti seluruh isi index dari iterasi (id, lat, lon)."""
+        cells = defaultdict(set)
+        index = {}
+        for item_id, lat, lon in points:
+            cell = self._cell(lat, lon)
+            index[item_id] = (lat, lon, cell)
+            cells[cell].add(item_id)
+        with self._lock:
+            self._cells, self._points = cells, index
+
+    def __len__(self):
+        return len(self._points)
+
+    # ==============================================================
+
+    def _candidates(self, lat, lon, radius_m):
+        dlat = radius_m / METERS_PER_DEG_LAT
+        dlon = radius_m / (METERS_PER_DEG_LAT * max(math.cos(math.radians(lat)), 1e-6))
+        i0, j0 = self._cell(lat - dlat, lon - dlon)
+        i1, j1 = self._cell(lat + dlat, lon + dlon)
+
+        # Radius sangat besar → lebih murah memindai semua titik
+        if (i1 - i0 + 1) * (j1 - j0 + 1) > len(self._cells):
+            return list(self._points.keys())
+
+        ids = []
+        for i in range(i0, i1 + 1):
+            for j in range(j0, j1 + 1):
+                members = self._cells.get((i, j))
+                if members:
+                    ids.extend(members)
+        return ids
+
+    def nearby(self, lat, lon, radius_m, limit=None):
+        """[(id, jarak_m)] dalam radius, urut dari yang terdekat."""
+        with self._lock:
+            ids = self._candidates(lat, lon, radius_m)
+            if not ids:
+                return []
+            coords = np.array([self._points[i][:2] for i in ids], dtype=np.float64)
+
+        dist = haversine_m(lat, lon, coords[:, 0], coords[:, 1])
+        inside = np.flatnonzero(dist <= radius_m)
+        order = inside[np.argsort(dist[inside], kind="stable")]
+        if limit is not None:
+            order = order[:limit]
+        return [(ids[k], float(dist[k])) for k in order]
+
+    def clusters(self, radius_m):
+        """
+        Kelompokkan titik yang saling berjarak <= radius_m (single-linkage).
+        Return list cluster (list id), terbesar lebih dulu.
+
+        Titik dibagi ke grid sementara dengan sel >= radius_m, sehingga pasangan
+        hanya perlu dicari di sel sendiri + 4 sel tetangga "maju"; jarak dihitung
+        per blok sel (NumPy) dan komponen dicari dengan propagasi label vektor.
+        """
+        with self._lock:
+            ids = list(self._points.keys())
+            coords = np.array([self._points[i][:2] for i in ids], dtype=np.float64)
+        n = len(ids)
+        if n == 0:
+            return []
+        lat, lon = coords[:, 0], coords[:, 1]
+
+        cell_lat = radius_m / METERS_PER_DEG_LAT
+        max_lat = min(float(np.abs(lat).max()), 89.9)
+        cell_lon = cell_lat / max(math.cos(math.radians(max_lat)), 1e-6)
+        ci = np.floor(lat / cell_lat).astype(np.int64)
+        cj = np.floor(lon / cell_lon).astype(np.int64)
+
+        order = np.lexsort((cj, ci))
+        change = np.flatnonzero((np.diff(ci[order]) != 0) | (np.diff(cj[order]) != 0)) + 1
+        starts = np.concatenate(([0], change))
+        ends = np.concatenate((change, [n]))
+        cells = {
+            (int(ci[order[s]]), int(cj[order[s]])): order[s:e]
+            for s, e in zip(starts, ends)
+        }
+
+        src, dst = [], []
+        for (i, j), members in cells.items():
+            blocks = [cells.get((i + di, j + dj)) for di, dj in ((0, 0), (0, 1), (1, -1), (1, 0), (1, 1))]
+            others = np.concatenate([b for b in blocks if b is not None])
+            dist = haversine_m(
+                lat[members][:, None], lon[members][:, None],
+                lat[others][None, :], lon[others][None, :],
+            )
+            a, b = np.nonzero(dist <= radius_m)
+            src.append(members[a])
+            dst.append(others[b])
+
+        # Label komponen = indeks terkecil; min sepanjang edge + pointer jumping
+        labels = np.arange(n)
+        src, dst = np.concatenate(src), np.concatenate(dst)
+        while True:
+            edge_min = np.minimum(labels[src], labels[dst])
+            updated = labels.copy()
+            np.minimum.at(updated, src, edge_min)
+            np.minimum.at(updated, dst, edge_min)
+            updated = updated[updated]
+            if np.array_equal(updated, labels):
+                break
+            labels = updated
+
+        groups = defaultdict(list)
+        for k, label in enumerate(labels.tolist()):
+            groups[label].append(ids[k])
+        return sorted(groups.values(), key=len, reverse=True)
+
+    def get_stats(self):
+        return {
+            "points": len(self._points),
+            "cells": len(self._cells),
+            "cell_m": self.cell_m,
+        }
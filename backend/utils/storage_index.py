@@ -0,0 +1,212 @@
+# backend/utils/storage_index.py
+import heapq
+import os
+import threading
+import time
+
+from backend.database.db import default_bucket
+from backend.utils.async_runtime import blocking_io
+
+# =====================================================
+# Index "blob terbaru per prefix" untuk Firebase Storage
+# =====================================================
+# Menggantikan list(bucket.list_blobs(prefix=...)) di setiap request.
+# Thread background memperbarui index secara inkremental:
+#   - tiap REFRESH_INTERVAL: list_blobs(start_offset=<nama terbesar>) → hanya
+#     objek dengan nama >= nama terakhir (nama file berbasis waktu)
+#   - tiap FULL_SYNC_INTERVAL: listing penuh per halaman (page token) untuk
+#     menangkap upload dengan nama tidak berurutan / penghapusan
+# Pembaca cukup mengambil blob terbaru dari dict (O(1)).
+
+LIST_FIELDS = "items(name,updated,generation,md5Hash,size,contentType,timeCreated),nextPageToken"
+
+
+class _PrefixState:
+    def __init__(self):
+        self.latest = None          # blob dengan updated terbesar
+        self.recent = []            # blob terbaru (urut turun), maks recent_limit
+        self.max_name = None        # nama terbesar (leksikografis) yang pernah terlihat
+        self.count = 0              # jumlah objek pada full sync terakhir
+        self.last_full_sync = 0.0
+        self.last_refresh = 0.0
+
+
+def _blob_order(blob):
+    return (blob.updated, blob.generation or 0)
+
+
+def _merge_recent(recent, blobs, limit):
+    """Gabungkan blob baru ke daftar recent (unik per nama, urut turun)."""
+    by_name = {b.name: b for b in recent}
+    for blob in blobs:
+        old = by_name.get(blob.name)
+        if old is None or _blob_order(blob) > _blob_order(old):
+            by_name[blob.name] = blob
+    return heapq.nlargest(limit, by_name.values(), key=_blob_order)
+
+
+def _newer(a, b):
+    """True jika blob a lebih baru dari b (berdasarkan updated, lalu generation)."""
+    if b is None:
+        return True
+    return (a.updated, a.generation or 0) > (b.updated, b.generation or 0)
+
+
+class BlobIndex:
+    def __init__(self, refresh_interval=1.0, full_sync_interval=60.0, bucket_factory=None,
+                 recent_limit=100):
+        self.refresh_interval = refresh_interval
+        self.recent_limit = recent_limit
+        self.full_sync_interval = full_sync_interval
+        self._bucket_factory = bucket_factory
+        self._bucket = None
+
+        self._lock = threading.Lock()
+        self._prefixes = {}         # prefix → _PrefixState
+        self._thread = None
+
+        # Statistik
+        self.full_syncs = 0
+        self.incremental_syncs = 0
+        self.objects_listed = 0
+
+    # ==============================================================
+
+    def _get_bucket(self):
+        if self._bucket is None:
+            self._bucket = (self._bucket_factory or default_bucket)()
+        return self._bucket
+
+    def _full_sync(self, prefix, state):
+        latest = None
+        max_name = None
+        count = 0
+        recent = []
+
+        # Iterasi per halaman (page token) tanpa menampung semua blob di memori
+        for page in self._get_bucket().list_blobs(prefix=prefix, fields=LIST_FIELDS).pages:
+            page_blobs = list(page)
+            for blob in page_blobs:
+                count += 1
+                if _newer(blob, latest):
+                    latest = blob
+                if max_name is None or blob.name > max_name:
+                    max_name = blob.name
+            recent = _merge_recent(recent, page_blobs, self.recent_limit)
+
+        with self._lock:
+            state.latest = latest
+            state.recent = recent
+            state.max_name = max_name
+            state.count = count
+            state.last_full_sync = state.last_refresh = time.time()
+            self.full_syncs += 1
+            self.objects_listed += count
+
+    def _incremental_sync(self, prefix, state):
+        if state.max_name is None:
+            return self._full_sync(prefix, state)
+
+        latest = state.latest
+        max_name = state.max_name
+        new_blobs = []
+
+        for blob in self._get_bucket().list_blobs(
+            prefix=prefix, start_offset=state.max_name, fields=LIST_FIELDS
+        ):
+            new_blobs.append(blob)
+            if _newer(blob, latest):
+                latest = blob
+            if blob.name > max_name:
+                max_name = blob.name
+        listed = len(new_blobs)
+
+        with self._lock:
+            state.latest = latest
+            state.recent = _merge_recent(state.recent, new_blobs, self.recent_limit)
+            state.max_name = max_name
+            state.last_refresh = time.time()
+            self.incremental_syncs += 1
+            self.objects_listed += listed
+
+    def refresh(self, prefix):
+        with self._lock:
+            state = self._prefixes.get(prefix)
+        if state is None:
+            # Prefix baru didaftarkan hanya setelah full sync pertama berhasil;
+            # jika gagal (error GCS sementara), request berikutnya mencoba lagi
+            state = _PrefixState()
+            self._full_sync(prefix, state)
+            with self._lock:
+                self._prefixes.setdefault(prefix, state)
+        elif time.time() - state.last_full_sync >= self.full_sync_interval:
+            self._full_sync(prefix, state)
+        else:
+            self._incremental_sync(prefix, state)
+
+    # ==============================================================
+
+    def _run(self):
+        while True:
+            with self._lock:
+                prefixes = list(self._prefixes.keys())
+            for prefix in prefixes:
+                try:
+                    blocking_io.run(self.refresh, prefix)
+                except Exception as e:
+                    print(f"⚠️ Error refresh blob index '{prefix}': {e}")
+            time.sleep(self.refresh_interval)
+
+    def _ensure_thread(self):
+        if self._thread and self._thread.is_alive():
+            return
+        self._thread = threading.Thread(target=self._run, name="blob-index", daemon=True)
+        self._thread.start()
+
+    def _state(self, folder_name):
+        prefix = f"{folder_name.rstrip('/')}/"
+        state = self._prefixes.get(prefix)
+
+        if state is None:
+            # Prefix baru: sinkron sekali di request pertama, lalu diurus thread
+            try:
+                self.refresh(prefix)
+            finally:
+                # Prefix lain yang sudah terdaftar tetap di-refresh walau sync ini gagal
+                self._ensure_thread()
+            state = self._prefixes[prefix]
+        return state
+
+    def latest(self, folder_name):
+        """Blob terbaru di folder (mis. 'detected_fire'), atau None."""
+        return self._state(folder_name).latest
+
+    def recent(self, folder_name, limit=20, offset=0):
+        """Halaman blob terbaru (urut turun) dari index, maks recent_limit item."""
+        return self._state(folder_name).recent[offset:offset + limit]
+
+    def get_stats(self):
+        with self._lock:
+            return {
+                "prefixes": {
+                    prefix: {
+                        "latest": state.latest.name if state.latest else None,
+                        "objects": state.count,
+                        "last_refresh": state.last_refresh,
+                    }
+                    for prefix, state in self._prefixes.items()
+                },
+                "full_syncs": self.full_syncs,
+                "incremental_syncs": self.incremental_syncs,
+                "objects_listed": self.objects_listed,
+            }
+
+
+BLOB_INDEX_REFRESH = float(os.getenv("BLOB_INDEX_REFRESH", "1.0"))
+BLOB_INDEX_FULL_SYNC = float(os.getenv("BLOB_INDEX_FULL_SYNC", "60"))
+
+# Instance bersama untuk video blueprint & firebase_helper
+blob_index = BlobIndex(
+    refresh_interval=BLOB_INDEX_REFRESH,
+    full_sync_interval=BLOB_INDEX_FULL_SYNC,
+)
@@ -0,0 +1,145 @@
+# backend/utils/telemetry_broadcaster.py
+import threading
+import time
+
+from flask import request
+
+# =====================================================
+# Telemetry Broadcaster (Socket.IO)
+# =====================================================
+# Menggabungkan perubahan atribut Pixhawk menjadi frame dengan rate tetap,
+# sehingga jumlah emit tidak bergantung pada frekuensi stream MAVLink.
+# Perubahan dideteksi dari versi snapshot PixhawkHelper (naik hanya jika isi berubah).
+# Client yang baru connect langsung menerima frame penuh terakhir (basis delta),
+# tidak menunggu keyframe berikutnya.
+
+
+def diff_telemetry(previous, current):
+    """Field level-atas yang berubah antara dua dict telemetry."""
+    if not previous:
+        return dict(current)
+    return {
+        k: v for k, v in current.items()
+        if previous.get(k) != v
+    }
+
+
+class TelemetryBroadcaster:
+    def __init__(self, socketio, pixhawk, rate_hz=10, delta=False,
+                 keyframe_interval=5.0, event="telemetry"):
+        """
+        socketio           : instance Flask-SocketIO
+        pixhawk            : PixhawkHelper (sumber snapshot)
+        rate_hz            : frame maksimum per detik (mis. 5/10/20)
+        delta              : kirim hanya field yang berubah (event '<event>_delta')
+        keyframe_interval  : detik, frame penuh berkala saat mode delta
+        """
+        self.socketio = socketio
+        self.pixhawk = pixhawk
+        self.rate_hz = max(float(rate_hz), 0.1)
+        self.delta = delta
+        self.keyframe_interval = keyframe_interval
+        self.event = event
+
+        self._last_version = None
+        self._last_sent = None
+        self._last_keyframe = 0.0
+        # Emit frame + update _last_sent atomik terhadap frame awal client baru
+        self._lock = threading.Lock()
+        self._handlers_registered = False
+
+        # Statistik
+        self.frames_sent = 0
+        self.frames_skipped = 0
+        self.initial_frames_sent = 0
+
+    # ==============================================================
+
+    def _current_snapshot(self):
+        # Tanpa thread ingest, get_telemetry() yang menguras socket & publish snapshot
+        if not self.pixhawk.is_ingesting():
+            self.pixhawk.get_telemetry()
+        return self.pixhawk.get_snapshot()
+
+    def tick(self):
+        """Kirim satu frame jika ada perubahan. Return True jika terjadi emit."""
+        if not self.pixhawk or not self.pixhawk.vehicle:
+            return False
+
+        snapshot = self._current_snapshot()
+        if snapshot is None or not snapshot.data:
+            return False
+
+        telemetry = snapshot.data
+        if telemetry.get("source") != "pixhawk":
+            return False
+
+        # Versi snapshot hanya naik jika isi berubah → skip tanpa diff
+        if snapshot.version == self._last_version:
+            self.frames_skipped += 1
+            return False
+
+        now = time.time()
+        need_keyframe = (now - self._last_keyframe) >= self.keyframe_interval
+
+        with self._lock:
+            if self.delta and not need_keyframe and self._last_sent is not None:
+                changes = diff_telemetry(self._last_sent, telemetry)
+                if not changes:
+                    self._last_version = snapshot.version
+                    self.frames_skipped += 1
+                    return False
+                self.socketio.emit(f"{self.event}_delta", {
+                    "version": snapshot.version,
+                    "changes": changes,
+                })
+            else:
+                self.socketio.emit(self.event, telemetry)
+                self._last_keyframe = now
+
+            self._last_version = snapshot.version
+            self._last_sent = telemetry
+        self.frames_sent += 1
+        return True
+
+    # ==============================================================
+
+    def on_connect(self, auth=None):
+        """Frame penuh terakhir ke client baru, supaya delta berikutnya punya basis."""
+        with self._lock:
+            if self._last_sent is None:
+                return
+            self.socketio.emit(self.event, self._last_sent, to=request.sid)
+        self.initial_frames_sent += 1
+
+    def register_handlers(self):
+        if self._handlers_registered:
+            return
+        self.socketio.on_event("connect", self.on_connect)
+        self._handlers_registered = True
+
+    def run(self):
+        """Loop background: maksimal satu frame per periode rate_hz."""
+        period = 1.0 / self.rate_hz
+        print(f"📡 Telemetry broadcaster aktif ({self.rate_hz:g} Hz, delta={self.delta})")
+
+        while True:
+            started = time.time()
+            try:
+                self.tick()
+            except Exception as e:
+                print(f"⚠️ Error telemetry broadcaster: {e}")
+
+            remaining = period - (time.time() - started)
+            if remaining > 0:
+                self.socketio.sleep(remaining)
+
+    def get_stats(self):
+        return {
+            "rate_hz": self.rate_hz,
+            "delta": self.delta,
+            "frames_sent": self.frames_sent,
+            "frames_skipped": self.frames_skipped,
+            "initial_frames_sent": self.initial_frames_sent,
+            "last_version": self._last_version,
+        }
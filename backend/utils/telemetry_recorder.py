@@ -0,0 +1,177 @@
+# backend/utils/telemetry_recorder.py
+import queue
+import random
+import threading
+import time
+
+from firebase_admin import db
+
+# =====================================================
+# Push ID (format Firebase, kronologis)
+# =====================================================
+# firebase_admin Reference.push() melakukan round trip ke server hanya untuk
+# membuat key, jadi key dibuat lokal dengan algoritma push ID Firebase.
+PUSH_CHARS = "-0123456789ABCDEFGHIJKLMNOPQRSTUVWXYZ_abcdefghijklmnopqrstuvwxyz"
+
+_push_lock = threading.Lock()
+_last_push_time = 0
+_last_rand_chars = [0] * 12
+
+
+def generate_push_id(now_ms=None):
+    """Buat key 20 karakter yang terurut waktu seperti ref.push().key."""
+    global _last_push_time, _last_rand_chars
+
+    with _push_lock:
+        now = int(now_ms if now_ms is not None else time.time() * 1000)
+        duplicate = now == _last_push_time
+        _last_push_time = now
+
+        time_chars = []
+        for _ in range(8):
+            time_chars.append(PUSH_CHARS[now % 64])
+            now //= 64
+        push_id = "".join(reversed(time_chars))
+
+        if not duplicate:
+            _last_rand_chars = [random.randrange(64) for _ in range(12)]
+        else:
+            # Timestamp sama → increment bagian acak agar tetap unik & terurut
+            i = 11
+            while i >= 0 and _last_rand_chars[i] == 63:
+                _last_rand_chars[i] = 0
+                i -= 1
+            if i >= 0:
+                _last_rand_chars[i] += 1
+
+        return push_id + "".join(PUSH_CHARS[c] for c in _last_rand_chars)
+
+
+# =====================================================
+# Write-behind Telemetry Recorder
+# =====================================================
+class TelemetryRecorder:
+    def __init__(self, path="/drone_data", max_batch=50, flush_interval=10.0,
+                 max_queue=1000, put_timeout=0.5):
+        """
+        path           : node RealtimeDB tujuan
+        max_batch      : flush jika jumlah sampel di buffer mencapai nilai ini
+        flush_interval : detik, flush berkala walau batch belum penuh
+        max_queue      : batas antrean; jika penuh, record() menunggu (backpressure)
+        put_timeout    : detik maksimum record() menunggu sebelum sampel dibuang
+        """
+        self.path = path
+        self.max_batch = max_batch
+        self.flush_interval = flush_interval
+        self.put_timeout = put_timeout
+
+        self._queue = queue.Queue(maxsize=max_queue)
+        self._pending = {}
+        self._thread = None
+        self._stop = threading.Event()
+        self._flush_now = threading.Event()
+
+        # Statistik
+        self.samples_recorded = 0
+        self.samples_dropped = 0
+        self.flush_count = 0
+        self.flush_errors = 0
+
+    # ==============================================================
+
+    def start(self):
+        if self._thread and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(
+            target=self._run, name="telemetry-recorder", daemon=True
+        )
+        self._thread.start()
+        print(f"✅ Telemetry recorder aktif → {self.path} "
+              f"(batch={self.max_batch}, interval={self.flush_interval}s)")
+
+    def stop(self, timeout=5.0):
+        """Hentikan thread dan flush sisa buffer."""
+        self._stop.set()
+        self._flush_now.set()
+        if self._thread:
+            self._thread.join(timeout)
+        self._thread = None
+
+    def record(self, sample, key=None):
+        """
+        Masukkan satu sampel (DroneData atau dict) ke antrean.
+        Return key RTDB sampel, atau None jika antrean penuh dan sampel dibuang.
+        """
+        data = sample.to_dict() if hasattr(sample, "to_dict") else dict(sample)
+        key = key or generate_push_id()
+
+        try:
+            self._queue.put((key, data), timeout=self.put_timeout)
+        except queue.Full:
+            self.samples_dropped += 1
+            print("⚠️ Antrean telemetry recorder penuh, sampel dibuang.")
+            return None
+
+        self.samples_recorded += 1
+        if self._queue.qsize() >= self.max_batch:
+            self._flush_now.set()
+        return key
+
+    def flush(self):
+        """Tulis semua sampel di buffer sebagai satu multi-path update()."""
+        while len(self._pending) < self.max_batch:
+            try:
+                key, data = self._queue.get_nowait()
+            except queue.Empty:
+                break
+            self._pending[key] = data
+
+        if not self._pending:
+            return 0
+
+        count = len(self._pending)
+        db.reference(self.path).update(self._pending)
+        self._pending = {}
+        self.flush_count += 1
+        return count
+
+    # ==============================================================
+
+    def _run(self):
+        backoff = 1.0
+        last_flush = time.time()
+
+        while True:
+            timeout = max(self.flush_interval - (time.time() - last_flush), 0)
+            self._flush_now.wait(timeout)
+            self._flush_now.clear()
+
+            try:
+                # Kuras antrean dalam beberapa batch jika menumpuk
+                while self.flush() >= self.max_batch:
+                    pass
+                last_flush = time.time()
+                backoff = 1.0
+            except Exception as e:
+                # Batch tetap di _pending dan dicoba lagi; antrean penuh → backpressure
+                self.flush_errors += 1
+                print(f"⚠️ Gagal flush telemetry ke Firebase: {e}")
+                if self._stop.is_set():
+                    break
+                self._stop.wait(backoff)
+                backoff = min(backoff * 2, 30.0)
+                continue
+
+            if self._stop.is_set() and self._queue.empty():
+                break
+
+    def get_stats(self):
+        return {
+            "queued": self._queue.qsize(),
+            "pending": len(self._pending),
+            "samples_recorded": self.samples_recorded,
+            "samples_dropped": self.samples_dropped,
+            "flush_count": self.flush_count,
+            "flush_errors": self.flush_errors,
+        }
@@ -0,0 +1,384 @@
+# backend/utils/thermal_analysis.py
+import math
+import os
+import re
+import threading
+import time
+from collections import OrderedDict
+from urllib.parse import unquote, urlsplit
+
+import cv2
+import numpy as np
+
+from backend.database.db import default_bucket
+from backend.utils.async_runtime import blocking_io
+from backend.utils.frame_cache import blob_cache_key, frame_cache
+
+# =====================================================
+# Analisis Frame Thermal (hotspot, vectorized)
+# =====================================================
+# Frame suhu (°C) → mask piksel >= HOTSPOT_TEMP → connected components
+# (OpenCV) → statistik per hotspot dengan satu pass NumPy:
+#   - area, mean suhu, centroid : np.bincount(label, weights=...)
+#   - max suhu, bbox            : argsort label + np.maximum/minimum.reduceat
+# Frame besar: komponen dicari pada mask yang di-max-pool (hotspot kecil tidak
+# hilang), lalu area & suhu diukur di resolusi asli. Tidak ada loop Python per
+# piksel/per hotspot, sehingga frame 640x512 tetap di bawah beberapa ms di CPU.
+#
+# Sumber frame (hanya data radiometrik yang dipakai sebagai suhu):
+#   - thermal_frame pada dokumen sensors_thermal (list suhu, 1D/2D), jika ada
+#   - gambar di Storage yang ditunjuk image_url dokumen: hanya 16-bit
+#     radiometrik (centi-Kelvin, mis. FLIR Lepton). Gambar 8-bit/berwarna
+#     di-auto-range kamera per frame → bukan suhu, tidak dianalisis.
+
+# Resolusi sensor umum untuk frame 1D tanpa frame_shape
+KNOWN_SHAPES = {
+    192: (12, 16),        # MLX90641
+    768: (24, 32),        # MLX90640
+    4800: (60, 80),       # Lepton 2.x
+    19200: (120, 160),    # Lepton 3.x
+}
+
+
+def raw_to_celsius(raw, scale=0.01, offset=-273.15):
+    """Nilai radiometrik (default centi-Kelvin) → °C."""
+    return raw.astype(np.float32) * scale + offset
+
+
+def frame_to_temperatures(frame, shape=None, unit="celsius"):
+    """List/array frame dari dokumen sensor → array 2D float32 (°C)."""
+    arr = np.asarray(frame)
+    if arr.ndim == 1:
+        shape = tuple(shape) if shape else KNOWN_SHAPES.get(arr.size)
+        if shape is None:
+            raise ValueError(f"Ukuran frame {arr.size} tidak dikenal, sertakan frame_shape")
+        arr = arr.reshape(shape)
+    if arr.ndim != 2:
+        raise ValueError(f"Frame thermal harus 2D, bukan {arr.shape}")
+    if arr.dtype == np.uint16 or unit == "centikelvin":
+        return raw_to_celsius(arr)
+    return arr.astype(np.float32, copy=False)
+
+
+def image_to_temperatures(data):
+    """
+    Bytes gambar thermal radiometrik 16-bit → array 2D float32 (°C).
+    None untuk gambar non-radiometrik (8-bit/berwarna, skala per frame).
+    """
+    img = cv2.imdecode(np.frombuffer(data, dtype=np.uint8), cv2.IMREAD_UNCHANGED)
+    if img is None:
+        raise ValueError("Gambar thermal tidak bisa didecode")
+    if img.dtype != np.uint16 or img.ndim != 2:
+        return None
+    return raw_to_celsius(img)
+
+
+_FIREBASE_URL_PATH = re.compile(r"^/v0/b/([^/]+)/o/(.+)$")
+
+
+def storage_path_from_url(url, bucket_name):
+    """
+    Path objek di bucket dari image_url dokumen (gs://, storage.googleapis.com,
+    <bucket>.storage.googleapis.com, firebasestorage.googleapis.com; signed URL
+    juga didukung). None jika URL bukan milik bucket ini.
+    """
+    if not isinstance(url, str) or not url:
+        return None
+    parts = urlsplit(url)
+    host = parts.netloc.lower()
+
+    if parts.scheme == "gs":
+        bucket, path = parts.netloc, parts.path.lstrip("/")
+    elif host == "firebasestorage.googleapis.com":
+        match = _FIREBASE_URL_PATH.match(parts.path)
+        if not match:
+            return None
+        bucket, path = match.group(1), match.group(2)
+    elif host == "storage.googleapis.com":
+        bucket, _, path = parts.path.lstrip("/").partition("/")
+    elif host.endswith(".storage.googleapis.com"):
+        bucket, path = parts.netloc[:-len(".storage.googleapis.com")], parts.path.lstrip("/")
+    else:
+        return None
+
+    path = unquote(path)
+    if bucket != bucket_name or not path:
+        return None
+    return path
+
+
+# =====================================================
+# Ekstraksi Hotspot
+# =====================================================
+def _pool_mask(mask, factor):
+    """Max-pool mask boolean dengan blok factor x factor (sisi tepi di-pad False)."""
+    h, w = mask.shape
+    ph, pw = -(-h // factor) * factor, -(-w // factor) * factor
+    if (ph, pw) != (h, w):
+        mask = np.pad(mask, ((0, ph - h), (0, pw - w)))
+    return mask.reshape(ph // factor, factor, pw // factor, factor).any(axis=(1, 3))
+
+
+def _empty_hotspots():
+    empty = np.empty(0, dtype=np.float32)
+    return {
+        "bbox": np.empty((0, 4), dtype=np.int64), "area": np.empty(0, dtype=np.int64),
+        "centroid": np.empty((0, 2)), "max_temp": empty, "mean_temp": empty,
+    }
+
+
+def find_hotspots(temps, threshold=60.0, min_area=4, connectivity=8, pool=1):
+    """
+    Hotspot = komponen terhubung dengan suhu >= threshold.
+    pool > 1: komponen dicari pada mask max-pool (pool x pool), statistik tetap
+    dihitung dari piksel resolusi asli.
+    Return dict array per hotspot (urut max_temp turun):
+    bbox (N,4: x,y,w,h), area (N,), centroid (N,2: x,y), max_temp (N,), mean_temp (N,)
+    """
+    h, w = temps.shape
+    mask = temps >= threshold
+    if pool > 1:
+        n, small = cv2.connectedComponents(
+            _pool_mask(mask, pool).astype(np.uint8), connectivity=connectivity, ltype=cv2.CV_32S
+        )
+        # Label blok → piksel asli; hanya piksel yang benar-benar panas
+        labels = np.repeat(np.repeat(small, pool, axis=0), pool, axis=1)[:h, :w] * mask
+    else:
+        n, labels = cv2.connectedComponents(
+            mask.astype(np.uint8), connectivity=connectivity, ltype=cv2.CV_32S
+        )
+    if n <= 1:
+        return _empty_hotspots()
+
+    # Statistik hanya untuk piksel foreground (label > 0); setiap label punya >= 1 piksel
+    flat_labels = labels.ravel()
+    fg = np.flatnonzero(flat_labels)
+    fg_labels = flat_labels[fg]
+    fg_temps = temps.ravel()[fg]
+    ys, xs = np.divmod(fg, w)
+
+    area = np.bincount(fg_labels, minlength=n)[1:]
+    sums = np.bincount(fg_labels, weights=fg_temps, minlength=n)[1:]
+    cx = np.bincount(fg_labels, weights=xs, minlength=n)[1:] / area
+    cy = np.bincount(fg_labels, weights=ys, minlength=n)[1:] / area
+
+    order = np.argsort(fg_labels, kind="stable")
+    starts = np.concatenate(([0], np.cumsum(area)[:-1]))
+    maxs = np.maximum.reduceat(fg_temps[order], starts)
+    x0 = np.minimum.reduceat(xs[order], starts)
+    x1 = np.maximum.reduceat(xs[order], starts)
+    y0 = np.minimum.reduceat(ys[order], starts)
+    y1 = np.maximum.reduceat(ys[order], starts)
+
+    keep = area >= min_area
+    result = {
+        "bbox": np.stack([x0, y0, x1 - x0 + 1, y1 - y0 + 1], axis=1)[keep],
+        "area": area[keep],
+        "centroid": np.stack([cx, cy], axis=1)[keep],
+        "max_temp": maxs[keep],
+        "mean_temp": (sums / area)[keep],
+    }
+    rank = np.argsort(-result["max_temp"], kind="stable")
+    return {k: v[rank] for k, v in result.items()}
+
+
+class ThermalAnalyzer:
+    def __init__(self, threshold=60.0, min_area=4, max_side=320, max_hotspots=10,
+                 analyze_images=True, bucket_factory=None, cache_size=64, url_ttl=60.0):
+        """
+        threshold     : °C minimum piksel hotspot
+        min_area      : piksel minimum satu hotspot (di resolusi asli)
+        max_side      : frame lebih besar dicari komponennya pada mask max-pool
+                        (area & suhu tetap diukur di resolusi asli)
+        max_hotspots  : jumlah hotspot terpanas yang disertakan di laporan
+        analyze_images: analisis gambar Storage (image_url) jika dokumen tanpa frame
+        url_ttl       : detik; hasil per image_url dipakai ulang tanpa lookup blob
+        """
+        self.threshold = threshold
+        self.min_area = min_area
+        self.max_side = max_side
+        self.max_hotspots = max_hotspots
+        self.analyze_images = analyze_images
+        self._bucket_factory = bucket_factory
+        self._bucket = None
+
+        self._lock = threading.Lock()
+        self._blob_results = OrderedDict()     # blob_cache_key → analysis
+        self._url_results = OrderedDict()      # image_url → (expires_at, analysis)
+        self.cache_size = cache_size
+        self.url_ttl = url_ttl
+
+        # Statistik
+        self.frames_analyzed = 0
+        self.images_analyzed = 0
+        self.images_skipped = 0
+        self.url_hits = 0
+        self.errors = 0
+
+    def _get_bucket(self):
+        if self._bucket is None:
+            self._bucket = (self._bucket_factory or default_bucket)()
+        return self._bucket
+
+    # ==============================================================
+
+    def analyze(self, temps):
+        """Frame suhu 2D (°C) → ringkasan + daftar hotspot (resolusi asli)."""
+        h, w = temps.shape
+        pool = 1
+        if self.max_side and max(h, w) > self.max_side:
+            pool = math.ceil(max(h, w) / float(self.max_side))
+
+        spots = find_hotspots(temps, self.threshold, self.min_area, pool=pool)
+        area = spots["area"]
+        hot_area = int(area.sum())
+
+        hotspots = [
+            {
+                "bbox": [int(v) for v in spots["bbox"][i]],
+                "area": int(area[i]),
+                "centroid": [round(float(c), 1) for c in spots["centroid"][i]],
+                "max_temp": round(float(spots["max_temp"][i]), 2),
+                "mean_temp": round(float(spots["mean_temp"][i]), 2),
+            }
+            for i in range(min(len(area), self.max_hotspots))
+        ]
+
+        # Suhu maks tanpa piksel panas yang bukan hotspot (noise < min_area)
+        if len(area):
+            clean_max = float(spots["max_temp"][0])
+        else:
+            background = temps[temps < self.threshold]
+            clean_max = float(background.max()) if background.size else None
+
+        self.frames_analyzed += 1
+        return {
+            "frame_shape": [h, w],
+            "max_temp": round(float(temps.max()), 2),
+            "clean_max_temp": round(clean_max, 2) if clean_max is not None else None,
+            "mean_temp": round(float(temps.mean()), 2),
+            "hotspot_count": int(len(area)),
+            "hot_area": hot_area,
+            "hot_fraction": round(hot_area / float(h * w), 5),
+            "hotspots": hotspots,
+        }
+
+    def analyze_blob(self, blob):
+        """
+        Analisis gambar thermal di Storage; hasil di-cache per (nama, generation).
+        None jika gambar tidak radiometrik.
+        """
+        key = blob_cache_key(blob)
+        with self._lock:
+            if key is not None and key in self._blob_results:
+                self._blob_results.move_to_end(key)
+                return self._blob_results[key]
+
+        temps = image_to_temperatures(frame_cache.get_bytes(blob))
+        if temps is None:
+            self.images_skipped += 1
+            analysis = None
+        else:
+            analysis = self.analyze(temps)
+            self.images_analyzed += 1
+
+        if key is not None:
+            with self._lock:
+                self._blob_results[key] = analysis
+                while len(self._blob_results) > self.cache_size:
+                    self._blob_results.popitem(last=False)
+        return analysis
+
+    def analyze_document(self, thermal):
+        """Analisis untuk dokumen sensors_thermal, atau None tanpa data radiometrik."""
+        frame = thermal.get("thermal_frame")
+        if frame is not None:
+            temps = frame_to_temperatures(
+                frame, thermal.get("frame_shape"), thermal.get("frame_unit", "celsius")
+            )
+            return self.analyze(temps)
+
+        if not self.analyze_images:
+            return None
+        url = thermal.get("image_url")
+        now = time.time()
+        with self._lock:
+            cached = self._url_results.get(url)
+            if cached is not None and cached[0] > now:
+                self.url_hits += 1
+                return cached[1]
+
+        bucket = self._get_bucket()
+        path = storage_path_from_url(url, bucket.name)
+        if path is None:
+            return None
+        blob = blocking_io.run(bucket.get_blob, path)
+        analysis = self.analyze_blob(blob) if blob is not None else None
+
+        with self._lock:
+            self._url_results[url] = (now + self.url_ttl, analysis)
+            self._url_results.move_to_end(url)
+            while len(self._url_results) > self.cache_size:
+                self._url_results.popitem(last=False)
+        return analysis
+
+    def enrich(self, thermal):
+        """
+        Tambahkan hasil analisis ke dokumen thermal (salinan) untuk fire pipeline.
+        Nilai dari perangkat (max_temp, fire_detected, fire_bbox) tetap dihormati.
+        """
+        if not thermal:
+            return thermal
+        try:
+            analysis = self.analyze_document(thermal)
+        except Exception as e:
+            self.errors += 1
+            print(f"⚠️ Analisis thermal gagal: {e}")
+            return thermal
+        if analysis is None:
+            return thermal
+
+        enriched = dict(thermal)
+        enriched.pop("thermal_frame", None)
+        enriched["hotspots"] = analysis["hotspots"]
+        enriched["hot_fraction"] = analysis["hot_fraction"]
+        enriched["frame_shape"] = analysis["frame_shape"]
+
+        # Piksel panas tunggal (< min_area) dianggap noise, bukan suhu api:
+        # tanpa hotspot nilai perangkat dipertahankan
+        hotspots = analysis["hotspots"]
+        device_max = thermal.get("max_temp")
+        if hotspots:
+            frame_max = hotspots[0]["max_temp"]
+            enriched["max_temp"] = frame_max if device_max is None else max(device_max, frame_max)
+        elif device_max is None:
+            enriched["max_temp"] = analysis["clean_max_temp"]
+        if analysis["hotspot_count"]:
+            enriched["fire_detected"] = True
+            if not thermal.get("fire_bbox"):
+                enriched["fire_bbox"] = analysis["hotspots"][0]["bbox"]
+        return enriched
+
+    def get_stats(self):
+        return {
+            "frames_analyzed": self.frames_analyzed,
+            "images_analyzed": self.images_analyzed,
+            "images_skipped": self.images_skipped,
+            "url_hits": self.url_hits,
+            "errors": self.errors,
+            "cached_images": len(self._blob_results),
+        }
+
+
+HOTSPOT_TEMP = float(os.getenv("HOTSPOT_TEMP", "60"))
+HOTSPOT_MIN_AREA = int(os.getenv("HOTSPOT_MIN_AREA", "4"))
+THERMAL_ANALYSIS_MAX_SIDE = int(os.getenv("THERMAL_ANALYSIS_MAX_SIDE", "320"))
+THERMAL_ANALYZE_IMAGES = os.getenv("THERMAL_ANALYZE_IMAGES", "1") == "1"
+
+# Instance bersama untuk fire pipeline & video blueprint
+thermal_analyzer = ThermalAnalyzer(
+    threshold=HOTSPOT_TEMP,
+    min_area=HOTSPOT_MIN_AREA,
+    max_side=THERMAL_ANALYSIS_MAX_SIDE,
+    analyze_images=THERMAL_ANALYZE_IMAGES,
+)
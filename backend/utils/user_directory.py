@@ -0,0 +1,245 @@
+# backend/utils/user_directory.py
+import os
+import threading
+import time
+
+from firebase_admin import db
+
+from backend.utils.async_runtime import blocking_io
+
+# =====================================================
+# User Directory (index email → user key di memori)
+# =====================================================
+# Menyimpan record user ringan (tanpa profileImage base64) dan index email,
+# sehingga login/register/daftar admin tidak perlu query /users tiap request.
+# Sinkronisasi:
+#   - listener : RTDB listen() → satu unduhan awal, lalu hanya event perubahan
+#   - ttl      : reload penuh setelah USER_DIRECTORY_TTL detik
+# Penulisan dari backend sendiri langsung di-write-through lewat put()/update().
+
+# Field yang disimpan di memori; field lain (profileImage, preferences, ...)
+# tetap hanya di RTDB
+LIGHT_FIELDS = (
+    "username", "email", "password", "phone", "role", "department",
+    "profileImageId", "created_at", "updated_at",
+)
+
+
+def light_record(user):
+    """Salinan record user tanpa field berat."""
+    if not isinstance(user, dict):
+        return None
+    record = {k: user[k] for k in LIGHT_FIELDS if k in user}
+    record["has_profile_image"] = bool(user.get("profileImage") or user.get("profileImageId"))
+    return record
+
+
+class UserDirectory:
+    def __init__(self, path="/users", mode="listener", ttl=300.0, ready_timeout=10.0):
+        """
+        path          : node RealtimeDB user
+        mode          : 'listener' (RTDB listen) atau 'ttl' (reload berkala)
+        ttl           : detik; umur data pada mode ttl
+        ready_timeout : detik menunggu unduhan awal sebelum fallback ke query RTDB
+        """
+        self.path = path
+        self.mode = mode
+        self.ttl = ttl
+        self.ready_timeout = ready_timeout
+
+        self._lock = threading.RLock()
+        self._users = {}            # user_key → light record
+        self._by_email = {}         # email → user_key
+        self._loaded_at = None
+        self._ready = threading.Event()
+        self._waited = False
+        self._listener = None
+        self._start_lock = threading.Lock()
+
+        # Statistik
+        self.loads = 0
+        self.events = 0
+        self.fallback_queries = 0
+
+    # ==============================================================
+    # Sinkronisasi
+    # ==============================================================
+
+    def _replace_all(self, data):
+        users = {}
+        by_email = {}
+        for key, user in (data or {}).items():
+            record = light_record(user)
+            if record is None:
+                continue
+            users[key] = record
+            if record.get("email"):
+                by_email[record["email"]] = key
+        with self._lock:
+            self._users, self._by_email = users, by_email
+            self._loaded_at = time.time()
+            self.loads += 1
+        self._ready.set()
+
+    def _set_user(self, key, record):
+        with self._lock:
+            old = self._users.get(key)
+            if old and old.get("email") and self._by_email.get(old["email"]) == key:
+                del self._by_email[old["email"]]
+            if record is None:
+                self._users.pop(key, None)
+                return
+            self._users[key] = record
+            if record.get("email"):
+                self._by_email[record["email"]] = key
+
+    def _on_event(self, event):
+        """Event listen(): put/patch pada path relatif terhadap /users."""
+        self.events += 1
+        parts = [p for p in (event.path or "/").split("/") if p]
+        data = event.data
+
+        if not parts:
+            if event.event_type == "put":
+                self._replace_all(data)
+            else:
+                for key, user in (data or {}).items():
+                    self._set_user(key, light_record(user))
+            return
+
+        key, field_path = parts[0], parts[1:]
+        if not field_path:
+            if event.event_type == "put":
+                self._set_user(key, light_record(data))
+            else:
+                self.update(key, data or {})
+        elif len(field_path) == 1:
+            self.update(key, {field_path[0]: data})
+        # Perubahan lebih dalam (mis. preferences/...) tidak memengaruhi record ringan
+
+    def start(self):
+        """Mulai listener RTDB (mode listener) sekali; aman dipanggil berulang."""
+        with self._start_lock:
+            if self.mode != "listener" or self._listener is not None:
+                return
+            try:
+                self._listener = db.reference(self.path).listen(self._on_event)
+                print(f"👂 User directory listener aktif ({self.path})")
+            except Exception as e:
+                print(f"⚠️ Gagal memulai listener user directory, pakai mode ttl: {e}")
+                self.mode = "ttl"
+
+    def stop(self):
+        if self._listener is not None:
+            try:
+                self._listener.close()
+            except Exception as e:
+                print(f"⚠️ Gagal menutup listener user directory: {e}")
+            self._listener = None
+
+    def ensure_loaded(self):
+        """True jika data directory bisa dipakai (sudah dimuat & belum kedaluwarsa)."""
+        if self.mode == "listener":
+            self.start()
+        if self.mode == "listener":
+            # Hanya request pertama yang menunggu unduhan awal listener
+            if self._ready.is_set() or self._waited:
+                return self._ready.is_set()
+            self._waited = True
+            return self._ready.wait(self.ready_timeout)
+
+        if self._loaded_at is None or time.time() - self._loaded_at >= self.ttl:
+            try:
+                self._replace_all(blocking_io.run(db.reference(self.path).get))
+            except Exception as e:
+                print(f"⚠️ Gagal memuat user directory: {e}")
+                return self._loaded_at is not None
+        return True
+
+    def invalidate(self):
+        with self._lock:
+            self._loaded_at = None
+
+    # ==============================================================
+    # Write-through
+    # ==============================================================
+
+    def put(self, key, user):
+        self._set_user(key, light_record(user))
+
+    def update(self, key, changes):
+        with self._lock:
+            current = self._users.get(key)
+            if current is None:
+                return
+            record = dict(current)
+            for field, value in changes.items():
+                if field in LIGHT_FIELDS:
+                    if value is None:
+                        record.pop(field, None)
+                    else:
+                        record[field] = value
+                if field in ("profileImage", "profileImageId"):
+                    record["has_profile_image"] = bool(
+                        value or record.get("profileImageId")
+                    )
+            self._set_user(key, record)
+
+    # ==============================================================
+    # Lookup
+    # ==============================================================
+
+    def _query_email(self, email):
+        """Fallback: query terindeks RTDB untuk satu email."""
+        self.fallback_queries += 1
+        result = blocking_io.run(db.reference(self.path).order_by_child("email").equal_to(email).get)
+        if not result:
+            return None
+        key, user = next(iter(result.items()))
+        self.put(key, user)
+        return key, self._users.get(key)
+
+    def find_by_email(self, email):
+        """(user_key, record) atau None."""
+        if not self.ensure_loaded():
+            return self._query_email(email)
+
+        with self._lock:
+            key = self._by_email.get(email)
+            record = self._users.get(key) if key else None
+        if record is not None:
+            return key, record
+
+        # Mode ttl bisa tertinggal dari penulisan proses lain → cek langsung
+        if self.mode != "listener":
+            return self._query_email(email)
+        return None
+
+    def get(self, key):
+        if not self.ensure_loaded():
+            return light_record(db.reference(f"{self.path}/{key}").get())
+        return self._users.get(key)
+
+    def list_users(self):
+        """[(user_key, record)] dari memori (tanpa mengunduh /users)."""
+        if not self.ensure_loaded():
+            self._replace_all(blocking_io.run(db.reference(self.path).get))
+        with self._lock:
+            return list(self._users.items())
+
+    def get_stats(self):
+        return {
+            "mode": self.mode,
+            "users": len(self._users),
+            "ready": self._ready.is_set() or self._loaded_at is not None,
+            "loads": self.loads,
+            "events": self.events,
+            "fallback_queries": self.fallback_queries,
+        }
+
+
+USER_DIRECTORY_MODE = os.getenv("USER_DIRECTORY_MODE", "listener")
+USER_DIRECTORY_TTL = float(os.getenv("USER_DIRECTORY_TTL", "300"))
+
+# Instance bersama untuk auth & user blueprint (listener dimulai saat dipakai)
+user_directory = UserDirectory(mode=USER_DIRECTORY_MODE, ttl=USER_DIRECTORY_TTL)
@@ -0,0 +1,3 @@
+# conftest.py
+# Root repo masuk sys.path (pytest rootdir) sehingga test bisa `import backend...`
+# tanpa menginstal paket. Jalankan dari root repo: python -m pytest backend/tests
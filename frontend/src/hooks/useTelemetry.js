@@ -18,6 +18,11 @@ export default function useTelemetry() {
     setTelemetry(data);
     });
 
+    // Mode delta (TELEMETRY_BROADCAST_DELTA=1): gabungkan field yang berubah
+    socket.on("telemetry_delta", ({ changes }) => {
+      setTelemetry((prev) => ({ ...(prev || {}), ...changes }));
+    });
+
     socket.on("disconnect", () => {
       console.log("❌ Disconnected from telemetry socket");
     });
@@ -67,16 +67,25 @@ const sampleLogs = [
   },
 ];
 
+// Format durasi total (detik) → "42 jam 15m"
+const formatTotalDuration = (seconds) => {
+  const minutes = Math.round((seconds || 0) / 60);
+  const hours = Math.floor(minutes / 60);
+  return hours ? `${hours} jam ${minutes % 60}m` : `${minutes}m`;
+};
+
 const Analytics = () => {
   const [flightLogs, setFlightLogs] = useState([]);
+  const [totals, setTotals] = useState(null);
   const [selectedLog, setSelectedLog] = useState(null);
-  const USE_DUMMY_DATA = true;
+  const USE_DUMMY_DATA = false;
 
+  // Statistik utama dari totals API (seluruh penerbangan, bukan hanya halaman ini)
   const stats = {
-    firesDetected: 132,
-    avgResponse: "3m 12s",
-    topArea: "Kecamatan Banyumanik",
-    totalFlightTime: "42 jam 15m",
+    firesDetected: totals ? totals.fire_detections : "-",
+    totalFlights: totals ? totals.flights : "-",
+    totalDistance: totals ? `${(totals.distance_m / 1000).toFixed(1)} km` : "-",
+    totalFlightTime: totals ? formatTotalDuration(totals.duration_s) : "-",
   };
 
   const fireTrendData = [
@@ -110,6 +119,7 @@ const Analytics = () => {
         } else {
           const res = await api.get("/flight-logs");
           setFlightLogs(res.data.logs);
+          setTotals(res.data.totals);
         }
       } catch (err) {
         console.warn("⚠️ Gagal ambil data API, fallback ke dummy.");
@@ -140,13 +150,13 @@ const Analytics = () => {
             color: "text-red-500",
           },
           {
-            label: "🕒 Waktu Respons Rata-rata",
-            value: stats.avgResponse,
+            label: "🛫 Jumlah Penerbangan",
+            value: stats.totalFlights,
             color: "text-yellow-500",
           },
           {
-            label: "📍 Area Terbanyak",
-            value: stats.topArea,
+            label: "📍 Jarak Tempuh",
+            value: stats.totalDistance,
             color: "text-green-600",
           },
           {
@@ -12,6 +12,9 @@ import VideoStream from "../components/VideoStream";
 import FlightLog from "../components/FlightLog";
 import api from "../utils/api";
 
+// Interval polling REST selama Socket.IO belum subscribe (gagal konek/subscribe)
+const POLL_INTERVAL_MS = 15000;
+
 const Dashboard = () => {
   const [telemetryData, setTelemetryData] = useState(null);
   const [sensorData, setSensorData] = useState(null);
@@ -50,19 +53,22 @@ const fetchSensorData = async () => {
 };
 
 
+  const sortAlerts = (alerts) =>
+    alerts.sort((a, b) => new Date(b.timestamp) - new Date(a.timestamp));
+
+  const setAlertsFromMap = (reports) => {
+    const data = Object.keys(reports || {}).map((key) => ({
+      id: key,
+      ...reports[key],
+    }));
+    setFireAlerts(sortAlerts(data));
+  };
+
+  // Fallback (polling lambat) selama Socket.IO belum subscribe
   const fetchFireAlerts = async () => {
     try {
       const res = await api.get("/reports");
-      if (res.data) {
-        const data = Object.keys(res.data).map((key) => ({
-          id: key,
-          ...res.data[key],
-        }));
-        const sorted = data.sort(
-          (a, b) => new Date(b.timestamp) - new Date(a.timestamp)
-        );
-        setFireAlerts(sorted);
-      }
+      if (res.data) setAlertsFromMap(res.data);
     } catch (err) {
       console.error("Gagal ambil data fire alerts:", err);
     }
@@ -71,11 +77,7 @@ const fetchSensorData = async () => {
   // ========= SETUP SOCKET.IO (REAL-TIME TELEMETRY) =========
   useEffect(() => {
     const loadInitial = async () => {
-      await Promise.all([
-        fetchTelemetryData(),
-        fetchSensorData(),
-        fetchFireAlerts(),
-      ]);
+      await fetchTelemetryData();
       setIsLoading(false);
     };
 
@@ -86,27 +88,96 @@ const fetchSensorData = async () => {
       transports: ["websocket"],
     });
 
+    // Channel yang sedang ter-subscribe; selebihnya di-poll lambat lewat REST
+    const subscribed = { sensors_env: false, fire_report: false };
+    // Update live yang sudah diterima sejak subscribe → snapshot yang datang
+    // belakangan tidak boleh menimpanya
+    let liveSensor = false;
+    let liveReportIds = new Set();
+
+    const pollUnsubscribed = () => {
+      if (!subscribed.sensors_env) fetchSensorData();
+      if (!subscribed.fire_report) fetchFireAlerts();
+    };
+    const pollTimer = setInterval(pollUnsubscribed, POLL_INTERVAL_MS);
+
     socket.on("connect", () => {
       console.log("🔌 Socket.IO terhubung ke backend");
+      // Subscribe ulang setiap (re)connect → server kirim snapshot terbaru
+      liveSensor = false;
+      liveReportIds = new Set();
+      subscribed.sensors_env = true;
+      subscribed.fire_report = true;
+      socket.emit("subscribe", {
+        channels: ["sensors_env", "fire_report"],
+        token: localStorage.getItem("token"),
+      });
+    });
+
+    let usedFallback = false;
+    socket.on("connect_error", () => {
+      subscribed.sensors_env = false;
+      subscribed.fire_report = false;
+      if (usedFallback) return;
+      usedFallback = true;
+      pollUnsubscribed();
     });
 
     socket.on("telemetry", (data) => {
-      // ⏱ update setiap ~0.5 detik
+      // ⏱ frame dari broadcaster (TELEMETRY_BROADCAST_HZ)
       setTelemetryData(data);
     });
 
+    // Mode delta: backend hanya mengirim field yang berubah
+    socket.on("telemetry_delta", ({ changes }) => {
+      setTelemetryData((prev) => ({ ...(prev || {}), ...changes }));
+    });
+
+    // 🌡️ Sensor lingkungan: snapshot saat subscribe, lalu push setiap perubahan
+    socket.on("sensors_env_snapshot", (data) => {
+      if (!liveSensor) setSensorData(data);
+    });
+    socket.on("sensors_env", (data) => {
+      liveSensor = true;
+      setSensorData(data);
+    });
+
+    // 🔥 Fire report: snapshot laporan terbaru, lalu incident baru/merge
+    socket.on("fire_report_snapshot", (reports) => {
+      const live = liveReportIds;
+      if (!live.size) {
+        setAlertsFromMap(reports);
+        return;
+      }
+      setFireAlerts((prev) => {
+        const kept = prev.filter((a) => live.has(a.id));
+        const fromSnapshot = Object.keys(reports || {})
+          .filter((key) => !live.has(key))
+          .map((key) => ({ id: key, ...reports[key] }));
+        return sortAlerts([...kept, ...fromSnapshot]);
+      });
+    });
+    socket.on("fire_report", ({ id, report }) => {
+      liveReportIds.add(id);
+      setFireAlerts((prev) =>
+        sortAlerts([{ id, ...report }, ...prev.filter((a) => a.id !== id)])
+      );
+    });
+
+    socket.on("subscribe_error", ({ channel, error }) => {
+      console.warn(`⚠️ Subscribe ${channel} gagal: ${error}`);
+      if (channel in subscribed) subscribed[channel] = false;
+      pollUnsubscribed();
+    });
+
     socket.on("disconnect", () => {
       console.log("⚠️ Socket.IO terputus");
+      subscribed.sensors_env = false;
+      subscribed.fire_report = false;
     });
 
-    // Polling untuk sensor & fire setiap 5 detik
-    const interval = setInterval(() => {
-      fetchSensorData();
-      fetchFireAlerts();
-    }, 5000);
-
     return () => {
-      clearInterval(interval);
+      clearInterval(pollTimer);
       socket.disconnect();
     };
   }, []);